@@ -32,6 +32,16 @@ def setup_agile():
     # Create default workflow scheme
     create_default_workflow_scheme()
     
+    # Grants of existing tasks and projects for the Task permission query
+    from erpnext_agile.erpnext_agile.doctype.agile_project_visibility.agile_project_visibility import (
+        rebuild_project_visibility,
+    )
+    from erpnext_agile.erpnext_agile.doctype.agile_task_visibility.agile_task_visibility import (
+        rebuild_task_visibility,
+    )
+    rebuild_task_visibility()
+    rebuild_project_visibility()
+    
     print("ERPNext Agile setup completed successfully!")
 
 def create_agile_custom_fields():
@@ -130,6 +140,31 @@ def create_agile_custom_fields():
                 'insert_after': 'story_points',
                 'depends_on': 'eval:doc.is_agile==1'
             },
+            {
+                'fieldname': 'backlog_rank',
+                'label': 'Backlog Rank',
+                'fieldtype': 'Int',
+                'insert_after': 'is_agile',
+                'hidden': 1
+            },
+            {
+                'fieldname': 'subtask_count',
+                'label': 'Subtask Count',
+                'fieldtype': 'Int',
+                'insert_after': 'backlog_rank',
+                'read_only': 1,
+                'hidden': 1,
+                'no_copy': 1
+            },
+            {
+                'fieldname': 'completed_subtask_count',
+                'label': 'Completed Subtask Count',
+                'fieldtype': 'Int',
+                'insert_after': 'subtask_count',
+                'read_only': 1,
+                'hidden': 1,
+                'no_copy': 1
+            },
             {
                 'fieldname': 'column_break_planning',
                 'fieldtype': 'Column Break',
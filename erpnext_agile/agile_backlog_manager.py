@@ -69,6 +69,13 @@ class AgileBacklogManager:
             self.create_backlog_rank_field()
         
         task_doc.db_set('backlog_rank', new_rank)
+
+        # Ranks are set directly, so the board change is recorded here
+        from erpnext_agile.erpnext_agile.doctype.agile_board_change.agile_board_change import (
+            make_change, on_board, record_board_changes,
+        )
+        if on_board(task_doc):
+            record_board_changes([make_change(task_doc, 'updated', to_status=task_doc.issue_status)])
         
         return {'success': True, 'new_rank': new_rank}
     
@@ -105,18 +112,14 @@ class AgileBacklogManager:
     def log_estimation_activity(self, task_doc, old_points, new_points, method):
         """Log estimation activity"""
         try:
-            activity_doc = frappe.get_doc({
-                'doctype': 'Agile Issue Activity',
-                'issue': task_doc.name,
-                'activity_type': 'estimation_changed',
-                'user': frappe.session.user,
-                'data': json.dumps({
-                    'old_points': old_points,
-                    'new_points': new_points,
-                    'method': method
-                })
+            from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+                buffer_activity,
+            )
+            buffer_activity(task_doc.name, 'estimation_changed', {
+                'old_points': old_points,
+                'new_points': new_points,
+                'method': method
             })
-            activity_doc.insert()
         except:
             pass  # Fail silently if activity logging fails
     
@@ -2,6 +2,13 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 import json
+from erpnext_agile.agile_board_query import AgileBoardQuery, BACKLOG_PAGE_LENGTH
+from erpnext_agile.erpnext_agile.doctype.agile_board_change.agile_board_change import (
+    get_board_version,
+)
+
+# Beyond this many changes a client is told to reload the board instead
+MAX_BOARD_CHANGES = 500
 
 class AgileBoardManager:
     """Core class for managing Agile Boards (Kanban/Scrum boards)"""
@@ -11,57 +18,23 @@ class AgileBoardManager:
         self.sprint = sprint
     
     @frappe.whitelist()
-    def get_board_data(self, project, sprint=None, view_type='sprint'):
+    def get_board_data(self, project, sprint=None, view_type='sprint', filters=None, start=0, page_length=None):
         """Get board data for Kanban/Scrum board visualization"""
         
+        # Read the version first so changes made while loading are replayed later
+        version = get_board_version(project)
+
         # Get project workflow statuses
         workflow_statuses = self.get_workflow_statuses(project)
         
-        # Build filters based on view type
-        filters = {
-            'project': project,
-            'is_agile': 1,
-            'status': ['!=', 'Cancelled']
-        }
-        
-        if view_type == 'sprint' and sprint:
-            filters['current_sprint'] = sprint
-        elif view_type == 'backlog':
-            filters['current_sprint'] = ['in', ['', None]]
-        # Get all issues
-        issues = frappe.get_all('Task',
-            filters=filters,
-            fields=[
-                'name', 'subject', 'issue_key', 'issue_type', 'issue_priority',
-                'issue_status', 'story_points',
-                'reporter', 'github_issue_number', 'github_pr_number'
-            ]
-        )
-        
-        # Organize issues by status (columns)
-        board_columns = {}
-        for status in workflow_statuses:
-            board_columns[status['name']] = {
-                'status': status,
-                'issues': [],
-                'total_points': 0
-            }
-        
-        # Distribute issues into columns
-        for issue in issues:
-            status = issue.get('issue_status')
-            if status and status in board_columns:
-                # Get assignees
-                assignees = frappe.get_all('Assigned To Users',
-                    filters={'parent': issue['name']},
-                    fields=['user'],
-                    pluck='user'
-                )
-                issue['assignees'] = assignees
-                
-                board_columns[status]['issues'].append(issue)
-                story_points = issue.get('story_points') or 0
-                board_columns[status]['total_points'] += int(float(story_points))
+        # The backlog is always paged, further cards are loaded per column
+        if view_type == 'backlog' and not page_length:
+            page_length = BACKLOG_PAGE_LENGTH
+
+        # Filters, column totals and card pages are resolved in SQL
+        board_query = AgileBoardQuery(project, sprint, view_type, filters,
+            statuses=[status['name'] for status in workflow_statuses])
+        board_columns = board_query.get_columns(workflow_statuses, start, page_length)
         
         active_sprint = frappe.get_all('Agile Sprint',
             filters={'project': project, 'sprint_state': 'Active'},
@@ -76,20 +49,90 @@ class AgileBoardManager:
             'view_type': view_type,
             'project': project,
             'sprint': sprint,
-            'active_sprint': active_sprint
+            'active_sprint': active_sprint,
+            'version': version
         }
+
+    @frappe.whitelist()
+    def get_board_column(self, project, status, sprint=None, view_type='sprint', filters=None,
+        cursor=None, page_length=BACKLOG_PAGE_LENGTH):
+        """Load one board column lazily, a page at a time"""
+        board_query = AgileBoardQuery(project, sprint, view_type, filters)
+        return board_query.get_column(status, cursor, page_length)
+
+    @frappe.whitelist()
+    def get_board_changes(self, project, sprint=None, since_version=0, view_type='sprint', filters=None):
+        """Cards added, removed, moved or updated on the board since a version"""
+        since_version = frappe.utils.cint(since_version)
+        version = get_board_version(project)
+
+        if not since_version or version <= since_version:
+            return {'version': version, 'reset': not since_version, 'changes': []}
+
+        conditions = ["project = %(project)s", "board_version > %(since)s", "board_version <= %(version)s"]
+        values = {'project': project, 'since': since_version, 'version': version,
+            'limit': MAX_BOARD_CHANGES + 1}
+        if view_type == 'sprint' and sprint:
+            conditions.append("sprint = %(sprint)s")
+            values['sprint'] = sprint
+        elif view_type == 'backlog':
+            conditions.append("IFNULL(sprint, '') = ''")
+
+        rows = frappe.db.sql(f"""
+            SELECT task, change_type, from_status, to_status
+            FROM `tabAgile Board Change`
+            WHERE {" AND ".join(conditions)}
+            ORDER BY board_version, name
+            LIMIT %(limit)s
+        """, values, as_dict=True)
+
+        if len(rows) > MAX_BOARD_CHANGES:
+            return {'version': version, 'reset': True, 'changes': []}
+
+        # Collapse the log to one change per card
+        collapsed = {}
+        for row in rows:
+            change = collapsed.get(row.task)
+            if not change:
+                collapsed[row.task] = {
+                    'task': row.task,
+                    'change_type': row.change_type,
+                    'from_status': row.from_status
+                }
+            elif row.change_type == 'moved' and change['change_type'] == 'updated':
+                change['change_type'] = 'moved'
+                change['from_status'] = row.from_status
+
+        # Current state decides whether a card is still on this view of the board
+        cards = {}
+        if collapsed:
+            board_query = AgileBoardQuery(project, sprint, view_type, filters,
+                task_names=list(collapsed))
+            cards = {card.name: card for card in board_query.get_cards()}
+
+        changes = []
+        for task, change in collapsed.items():
+            card = cards.get(task)
+            if not card:
+                if change['change_type'] == 'added':
+                    continue
+                change.update({'change_type': 'removed', 'to_status': None, 'card': None})
+            else:
+                if change['change_type'] == 'removed':
+                    change['change_type'] = 'updated'
+                change.update({'to_status': card.issue_status, 'card': card})
+            changes.append(change)
+
+        return {'version': version, 'reset': False, 'changes': changes}
     
     def get_workflow_statuses(self, project):
         """Get workflow statuses for the project"""
-        project_doc = frappe.get_doc('Project', project)
-        workflow_scheme = project_doc.get('workflow_scheme')
+        workflow_scheme = frappe.get_cached_value('Project', project, 'workflow_scheme')
         
         if workflow_scheme:
             # Get statuses from workflow scheme
-            statuses = frappe.get_all('Agile Issue Status',
-                fields=['name', 'status_name', 'status_category', 'color', 'sort_order'],
-                order_by='sort_order'
-            )
+            from erpnext_agile.agile_metadata import get_statuses
+            statuses = get_statuses()
         else:
             # Use default statuses
             statuses = [
@@ -150,119 +193,37 @@ class AgileBoardManager:
         }
     
     @frappe.whitelist()
-    def filter_board(self, project, sprint=None, filters=None):
-        """Filter board by various criteria"""
-        
-        if not filters:
-            filters = {}
-        
-        board_data = self.get_board_data(project, sprint)
-        
-        # Apply filters
-        if filters.get('assignee'):
-            assignee = filters['assignee']
-            for status, column in board_data['columns'].items():
-                column['issues'] = [
-                    issue for issue in column['issues']
-                    if assignee in issue.get('assignees', [])
-                ]
-        
-        if filters.get('issue_type'):
-            issue_type = filters['issue_type']
-            for status, column in board_data['columns'].items():
-                column['issues'] = [
-                    issue for issue in column['issues']
-                    if issue.get('issue_type') == issue_type
-                ]
-        
-        if filters.get('priority'):
-            priority = filters['priority']
-            for status, column in board_data['columns'].items():
-                column['issues'] = [
-                    issue for issue in column['issues']
-                    if issue.get('issue_priority') == priority
-                ]
-        
-        return board_data
+    def filter_board(self, project, sprint=None, filters=None, start=0, page_length=None):
+        """Filter board by assignee, type, priority, label or component"""
+        return self.get_board_data(project, sprint, filters=filters or {},
+            start=start, page_length=page_length)
     
     @frappe.whitelist()
-    def get_swimlane_data(self, project, sprint=None, swimlane_by='issue_type'):
+    def get_swimlane_data(self, project, sprint=None, swimlane_by='issue_type', filters=None,
+        start=0, page_length=None):
         """Get board data organized by swimlanes"""
         
-        board_data = self.get_board_data(project, sprint)
-        
-        # Organize by swimlanes
-        swimlanes = {}
-        
-        for status, column in board_data['columns'].items():
-            for issue in column['issues']:
-                swimlane_key = issue.get(swimlane_by) or 'Unassigned'
-                
-                if swimlane_key not in swimlanes:
-                    swimlanes[swimlane_key] = {}
-                
-                if status not in swimlanes[swimlane_key]:
-                    swimlanes[swimlane_key][status] = {
-                        'issues': [],
-                        'total_points': 0
-                    }
-                
-                swimlanes[swimlane_key][status]['issues'].append(issue)
-                swimlanes[swimlane_key][status]['total_points'] += float(issue.get('story_points', 0))
+        workflow_statuses = self.get_workflow_statuses(project)
+        board_query = AgileBoardQuery(project, sprint, filters=filters,
+            statuses=[status['name'] for status in workflow_statuses])
         
         return {
-            'swimlanes': swimlanes,
-            'statuses': board_data['statuses'],
+            'swimlanes': board_query.get_swimlanes(swimlane_by, start, page_length),
+            'statuses': workflow_statuses,
             'swimlane_by': swimlane_by
         }
     
     @frappe.whitelist()
-    def get_board_metrics(self, project, sprint=None):
+    def get_board_metrics(self, project, sprint=None, filters=None):
         """Get board metrics for visualization"""
         
-        board_data = self.get_board_data(project, sprint)
-        
-        metrics = {
-            'total_issues': 0,
-            'total_points': 0,
-            'by_status_category': {
-                'To Do': {'count': 0, 'points': 0},
-                'In Progress': {'count': 0, 'points': 0},
-                'Done': {'count': 0, 'points': 0}
-            },
-            'by_type': {},
-            'by_priority': {},
-            'blocked_issues': 0,
-            'unassigned_issues': 0
-        }
+        workflow_statuses = self.get_workflow_statuses(project)
+        board_query = AgileBoardQuery(project, sprint, filters=filters,
+            statuses=[status['name'] for status in workflow_statuses])
         
-        for status, column in board_data['columns'].items():
-            status_category = column['status'].get('status_category', 'To Do')
-            
-            for issue in column['issues']:
-                metrics['total_issues'] += 1
-                metrics['total_points'] += float(issue.get('story_points', 0))
-                
-                # By status category
-                metrics['by_status_category'][status_category]['count'] += 1
-                metrics['by_status_category'][status_category]['points'] += float(issue.get('story_points', 0))
-                
-                # By type
-                issue_type = issue.get('issue_type') or 'Untyped'
-                if issue_type not in metrics['by_type']:
-                    metrics['by_type'][issue_type] = {'count': 0, 'points': 0}
-                metrics['by_type'][issue_type]['count'] += 1
-                metrics['by_type'][issue_type]['points'] += float(issue.get('story_points', 0))
-                
-                # By priority
-                priority = issue.get('issue_priority') or 'Unassigned'
-                if priority not in metrics['by_priority']:
-                    metrics['by_priority'][priority] = 0
-                metrics['by_priority'][priority] += 1
-                
-                # Unassigned
-                if not issue.get('assignees'):
-                    metrics['unassigned_issues'] += 1
+        metrics = board_query.get_metrics({
+            status['name']: status.get('status_category') for status in workflow_statuses
+        })
         
         # Calculate cycle time and throughput if sprint
         if sprint:
@@ -273,40 +234,9 @@ class AgileBoardManager:
     
     def calculate_cycle_time(self, sprint):
         """Calculate average cycle time for sprint"""
-        # Cycle time: time from "In Progress" to "Done"
-        
-        done_statuses = [status.name for status in frappe.get_all(
-            'Agile Issue Status',
-            filters={'status_category': 'Done'},
-            fields=['name']
-        )]
-        
-        # Get issues completed in sprint
-        completed_issues = frappe.get_all('Task',
-            filters={
-                'current_sprint': sprint,
-                'is_agile': 1,
-                'issue_status': ['in', done_statuses]
-            },
-            fields=['name', 'creation', 'modified']
-        )
-        
-        if not completed_issues:
-            return {'average_days': 0, 'count': 0}
-        
-        # Simplified cycle time calculation
-        # In real implementation, track status transition timestamps
-        total_days = 0
-        for issue in completed_issues:
-            days = frappe.utils.date_diff(issue['modified'], issue['creation'])
-            total_days += days
-        
-        average_days = total_days / len(completed_issues)
-        
-        return {
-            'average_days': round(average_days, 1),
-            'count': len(completed_issues)
-        }
+        # Cycle time: time from first entering "In Progress" to "Done"
+        from erpnext_agile.agile_flow_metrics import AgileFlowMetrics
+        return AgileFlowMetrics(sprint=sprint).get_cycle_time()
     
     def calculate_throughput(self, sprint):
         """Calculate throughput (issues completed per day)"""
@@ -316,62 +246,23 @@ class AgileBoardManager:
         if sprint_doc.sprint_state != 'Active':
             return {'issues_per_day': 0, 'points_per_day': 0}
         
-        days_elapsed = frappe.utils.date_diff(
-            frappe.utils.today(),
-            sprint_doc.actual_start_date or sprint_doc.start_date
-        ) or 1
-        
-        done_statuses = [status.name for status in frappe.get_all(
-            'Agile Issue Status',
-            filters={'status_category': 'Done'},
-            fields=['name']
-        )]
-        
-        completed = frappe.get_all('Task',
-            filters={
-                'current_sprint': sprint,
-                'is_agile': 1,
-                'issue_status': ['in', done_statuses]
-            },
-            fields=['story_points']
-        )
+        start_date = sprint_doc.actual_start_date or sprint_doc.start_date
+        days_elapsed = frappe.utils.date_diff(frappe.utils.today(), start_date) or 1
         
-        completed_count = len(completed)
-        completed_points = sum(float(issue.get('story_points', 0)) for issue in completed)
+        from erpnext_agile.agile_flow_metrics import AgileFlowMetrics
+        throughput = AgileFlowMetrics(sprint=sprint, from_date=start_date).get_throughput()
         
         return {
-            'issues_per_day': round(completed_count / days_elapsed, 2),
-            'points_per_day': round(completed_points / days_elapsed, 2),
+            'issues_per_day': round(throughput['issues'] / days_elapsed, 2),
+            'points_per_day': round(throughput['points'] / days_elapsed, 2),
             'days_elapsed': days_elapsed
         }
     
     @frappe.whitelist()
-    def bulk_move_issues(self, issue_keys, to_status):
+    def bulk_move_issues(self, issue_keys, to_status, comment=None):
         """Bulk move multiple issues to a status"""
-        
-        moved_count = 0
-        errors = []
-        
-        for issue_key in issue_keys:
-            try:
-                task_name = frappe.db.get_value('Task', {'issue_key': issue_key}, 'name')
-                if task_name:
-                    task_doc = frappe.get_doc('Task', task_name)
-                    from_status = task_doc.issue_status
-                    
-                    self.move_issue(task_name, from_status, to_status)
-                    moved_count += 1
-            except Exception as e:
-                errors.append({
-                    'issue_key': issue_key,
-                    'error': str(e)
-                })
-        
-        return {
-            'success': True,
-            'moved': moved_count,
-            'errors': errors
-        }
+        from erpnext_agile.agile_bulk_transition import AgileBulkTransition
+        return AgileBulkTransition(to_status, comment).run(issue_keys=issue_keys)
     
     @frappe.whitelist()
     def configure_board(self, project, board_config):
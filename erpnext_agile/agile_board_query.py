@@ -0,0 +1,358 @@
+# erpnext_agile/agile_board_query.py
+"""
+Board query layer shared by the board, filter, swimlane and metrics endpoints.
+
+Filters are pushed into SQL, groupings and metrics are computed with GROUP BY
+aggregates and only the requested page of cards per column is hydrated.
+Columns are paged with a (backlog_rank, name) keyset cursor so any column can be
+loaded lazily without scanning the cards before it.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+# Story points is a Select field, so it is stored as text
+POINTS_SQL = "IFNULL(CAST(NULLIF(t.story_points, '') AS DECIMAL(10, 2)), 0)"
+
+BLOCKED_STATUSES = ('Blocked',)
+
+CARD_FIELDS = [
+    'name', 'subject', 'issue_key', 'issue_type', 'issue_priority', 'issue_status',
+    'story_points', 'reporter', 'github_issue_number', 'github_pr_number', 'backlog_rank'
+]
+
+# Cards are ordered by rank, name is the unique tie breaker of the keyset
+CARD_ORDER = "t.backlog_rank, t.name"
+
+# Backlog columns are paged by default, a backlog can hold tens of thousands of cards
+BACKLOG_PAGE_LENGTH = 50
+
+# Swimlane keys mapped to the SQL expression they group on
+SWIMLANE_FIELDS = {
+    'issue_type': 't.issue_type',
+    'type': 't.issue_type',
+    'issue_priority': 't.issue_priority',
+    'priority': 't.issue_priority',
+    'reporter': 't.reporter',
+    'parent_issue': 't.parent_issue',
+    'current_sprint': 't.current_sprint',
+    'assignee': 'atu.user',
+}
+
+
+class AgileBoardQuery:
+    """SQL-backed view over the cards of one project board"""
+
+    def __init__(self, project, sprint=None, view_type='sprint', filters=None, statuses=None,
+        task_names=None):
+        self.project = project
+        self.sprint = sprint
+        self.view_type = view_type
+        self.filters = filters or {}
+        self.statuses = statuses
+        self.task_names = task_names
+        self.conditions, self.values = self.build_conditions()
+
+    def build_conditions(self):
+        """Translate board scope and filters into a WHERE clause"""
+        conditions = [
+            "t.project = %(project)s",
+            "t.is_agile = 1",
+            "t.status != 'Cancelled'"
+        ]
+        values = {'project': self.project}
+
+        if self.view_type == 'sprint' and self.sprint:
+            conditions.append("t.current_sprint = %(sprint)s")
+            values['sprint'] = self.sprint
+        elif self.view_type == 'backlog':
+            conditions.append("IFNULL(t.current_sprint, '') = ''")
+
+        if self.statuses:
+            conditions.append("t.issue_status IN %(statuses)s")
+            values['statuses'] = tuple(self.statuses)
+
+        if self.task_names:
+            conditions.append("t.name IN %(task_names)s")
+            values['task_names'] = tuple(self.task_names)
+
+        if assignee := self.filters.get('assignee'):
+            conditions.append("""EXISTS (
+                SELECT 1 FROM `tabAssigned To Users` f_atu
+                WHERE f_atu.parent = t.name AND f_atu.parenttype = 'Task'
+                AND f_atu.user IN %(assignee)s
+            )""")
+            values['assignee'] = as_tuple(assignee)
+
+        if issue_type := self.filters.get('issue_type'):
+            conditions.append("t.issue_type IN %(issue_type)s")
+            values['issue_type'] = as_tuple(issue_type)
+
+        if priority := self.filters.get('priority') or self.filters.get('issue_priority'):
+            conditions.append("t.issue_priority IN %(priority)s")
+            values['priority'] = as_tuple(priority)
+
+        if label := self.filters.get('label'):
+            conditions.append("""EXISTS (
+                SELECT 1 FROM `tabLabel` f_lbl
+                WHERE f_lbl.parent = t.name AND f_lbl.parenttype = 'Task'
+                AND f_lbl.label IN %(label)s
+            )""")
+            values['label'] = as_tuple(label)
+
+        if component := self.filters.get('component'):
+            conditions.append("""EXISTS (
+                SELECT 1 FROM `tabComponent` f_cmp
+                WHERE f_cmp.parent = t.name AND f_cmp.parenttype = 'Task'
+                AND f_cmp.component IN %(component)s
+            )""")
+            values['component'] = as_tuple(component)
+
+        return " AND ".join(conditions), values
+
+    def get_column_totals(self):
+        """Card count and story points per status"""
+        rows = frappe.db.sql(f"""
+            SELECT t.issue_status, COUNT(*) AS total_count, SUM({POINTS_SQL}) AS total_points
+            FROM `tabTask` t
+            WHERE {self.conditions}
+            GROUP BY t.issue_status
+        """, self.values, as_dict=True)
+
+        return {row.issue_status: row for row in rows}
+
+    def get_cards(self, start=0, page_length=None, lane_field=None, join=''):
+        """Fetch a page of cards per status (and swimlane, if given) in one query"""
+        fields = ", ".join(f"t.{field}" for field in CARD_FIELDS)
+        partition_by = "t.issue_status"
+        if lane_field:
+            fields += f", IFNULL({lane_field}, '') AS lane"
+            partition_by = f"IFNULL({lane_field}, ''), t.issue_status"
+        order_by = CARD_ORDER
+
+        if not page_length:
+            cards = frappe.db.sql(f"""
+                SELECT {fields}
+                FROM `tabTask` t {join}
+                WHERE {self.conditions}
+                ORDER BY {order_by}
+            """, self.values, as_dict=True)
+        else:
+            values = dict(self.values, start=cint(start), end=cint(start) + cint(page_length))
+            cards = frappe.db.sql(f"""
+                SELECT * FROM (
+                    SELECT {fields},
+                        ROW_NUMBER() OVER (PARTITION BY {partition_by} ORDER BY {order_by}) AS row_no
+                    FROM `tabTask` t {join}
+                    WHERE {self.conditions}
+                ) cards
+                WHERE cards.row_no > %(start)s AND cards.row_no <= %(end)s
+                ORDER BY cards.row_no
+            """, values, as_dict=True)
+
+            for card in cards:
+                card.pop('row_no', None)
+
+        self.attach_assignees(cards)
+        return cards
+
+    def attach_assignees(self, cards):
+        """Load assignees for the hydrated cards with a single query"""
+        if not cards:
+            return
+
+        assignees = {}
+        for row in frappe.get_all('Assigned To Users',
+            filters={'parent': ['in', list({card.name for card in cards})], 'parenttype': 'Task'},
+            fields=['parent', 'user'],
+            order_by='idx asc'
+        ):
+            assignees.setdefault(row.parent, []).append(row.user)
+
+        for card in cards:
+            card['assignees'] = assignees.get(card.name, [])
+
+    def get_columns(self, workflow_statuses, start=0, page_length=None):
+        """Board columns with totals from aggregates and a page of hydrated cards"""
+        totals = self.get_column_totals()
+
+        columns = {}
+        for status in workflow_statuses:
+            column_total = totals.get(status['name']) or {}
+            columns[status['name']] = {
+                'status': status,
+                'issues': [],
+                'total_count': cint(column_total.get('total_count')),
+                'total_points': flt(column_total.get('total_points'))
+            }
+
+        for card in self.get_cards(start, page_length):
+            column = columns.get(card.issue_status)
+            if column is not None:
+                column['issues'].append(card)
+
+        for column in columns.values():
+            loaded = cint(start) + len(column['issues'])
+            column['next_cursor'] = None
+            if page_length and column['issues'] and loaded < column['total_count']:
+                column['next_cursor'] = make_cursor(column['issues'][-1])
+
+        return columns
+
+    def get_column(self, status, cursor=None, page_length=BACKLOG_PAGE_LENGTH):
+        """Next page of one column after a keyset cursor"""
+        page_length = cint(page_length) or BACKLOG_PAGE_LENGTH
+        conditions = [self.conditions, "t.issue_status = %(column_status)s"]
+        values = dict(self.values, column_status=status, limit=page_length + 1)
+
+        if cursor:
+            values['cursor_rank'], values['cursor_name'] = parse_cursor(cursor)
+            conditions.append("""(t.backlog_rank > %(cursor_rank)s
+                OR (t.backlog_rank = %(cursor_rank)s AND t.name > %(cursor_name)s))""")
+
+        fields = ", ".join(f"t.{field}" for field in CARD_FIELDS)
+        cards = frappe.db.sql(f"""
+            SELECT {fields}
+            FROM `tabTask` t
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {CARD_ORDER}
+            LIMIT %(limit)s
+        """, values, as_dict=True)
+
+        has_more = len(cards) > page_length
+        cards = cards[:page_length]
+        self.attach_assignees(cards)
+
+        column = {
+            'status': status,
+            'issues': cards,
+            'next_cursor': make_cursor(cards[-1]) if has_more else None
+        }
+
+        # Totals only need to be sent with the first page
+        if not cursor:
+            column_total = self.get_column_totals().get(status) or {}
+            column['total_count'] = cint(column_total.get('total_count'))
+            column['total_points'] = flt(column_total.get('total_points'))
+
+        return column
+
+    def get_swimlanes(self, swimlane_by='issue_type', start=0, page_length=None):
+        """Cards and aggregates grouped by swimlane and status"""
+        lane_field = SWIMLANE_FIELDS.get(swimlane_by)
+        if not lane_field:
+            frappe.throw(_("Cannot group board by {0}").format(swimlane_by))
+
+        join = ""
+        if lane_field.startswith('atu.'):
+            join = """LEFT JOIN `tabAssigned To Users` atu
+                ON atu.parent = t.name AND atu.parenttype = 'Task'"""
+
+        totals = frappe.db.sql(f"""
+            SELECT IFNULL({lane_field}, '') AS lane, t.issue_status,
+                COUNT(*) AS total_count, SUM({POINTS_SQL}) AS total_points
+            FROM `tabTask` t {join}
+            WHERE {self.conditions}
+            GROUP BY lane, t.issue_status
+        """, self.values, as_dict=True)
+
+        swimlanes = {}
+        for row in totals:
+            lane = row.lane or 'Unassigned'
+            swimlanes.setdefault(lane, {})[row.issue_status] = {
+                'issues': [],
+                'count': cint(row.total_count),
+                'total_points': flt(row.total_points)
+            }
+
+        for card in self.get_cards(start, page_length, lane_field=lane_field, join=join):
+            lane = card.pop('lane') or 'Unassigned'
+            cell = swimlanes.get(lane, {}).get(card.issue_status)
+            if cell is not None:
+                cell['issues'].append(card)
+
+        return swimlanes
+
+    def get_metrics(self, status_categories):
+        """Board metrics from one grouped aggregate"""
+        metrics = {
+            'total_issues': 0,
+            'total_points': 0,
+            'by_status_category': {
+                'To Do': {'count': 0, 'points': 0},
+                'In Progress': {'count': 0, 'points': 0},
+                'Done': {'count': 0, 'points': 0}
+            },
+            'by_type': {},
+            'by_priority': {},
+            'blocked_issues': 0,
+            'unassigned_issues': 0
+        }
+
+        groups = frappe.db.sql(f"""
+            SELECT t.issue_status, t.issue_type, t.issue_priority,
+                NOT EXISTS (
+                    SELECT 1 FROM `tabAssigned To Users` m_atu
+                    WHERE m_atu.parent = t.name AND m_atu.parenttype = 'Task'
+                ) AS unassigned,
+                COUNT(*) AS total_count, SUM({POINTS_SQL}) AS total_points
+            FROM `tabTask` t
+            WHERE {self.conditions}
+            GROUP BY t.issue_status, t.issue_type, t.issue_priority, unassigned
+        """, self.values, as_dict=True)
+
+        for group in groups:
+            count = cint(group.total_count)
+            points = flt(group.total_points)
+
+            metrics['total_issues'] += count
+            metrics['total_points'] += points
+
+            category = status_categories.get(group.issue_status) or 'To Do'
+            bucket = metrics['by_status_category'].setdefault(category, {'count': 0, 'points': 0})
+            bucket['count'] += count
+            bucket['points'] += points
+
+            issue_type = group.issue_type or 'Untyped'
+            by_type = metrics['by_type'].setdefault(issue_type, {'count': 0, 'points': 0})
+            by_type['count'] += count
+            by_type['points'] += points
+
+            priority = group.issue_priority or 'Unassigned'
+            metrics['by_priority'][priority] = metrics['by_priority'].get(priority, 0) + count
+
+            if group.issue_status in BLOCKED_STATUSES:
+                metrics['blocked_issues'] += count
+            if cint(group.unassigned):
+                metrics['unassigned_issues'] += count
+
+        return metrics
+
+
+def make_cursor(card):
+    """Keyset cursor pointing just after a card"""
+    return [cint(card.backlog_rank), card.name]
+
+
+def parse_cursor(cursor):
+    """Read a cursor sent back by the client as a list or a JSON string"""
+    if isinstance(cursor, str):
+        try:
+            cursor = json.loads(cursor)
+        except ValueError:
+            frappe.throw(_("Invalid board cursor"))
+
+    if not isinstance(cursor, (list, tuple)) or len(cursor) != 2:
+        frappe.throw(_("Invalid board cursor"))
+
+    return cint(cursor[0]), cursor[1]
+
+
+def as_tuple(value):
+    """Normalise a single filter value or a list of values for an IN clause"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(value)
+    return (value,)
@@ -0,0 +1,371 @@
+# erpnext_agile/agile_bulk_transition.py
+"""
+Bulk transition engine for multi-select board actions.
+
+Each distinct (workflow scheme, from status) pair is validated once against the
+compiled workflow graph, tasks are updated with one statement per source status,
+activity rows are written in one multi-row insert and notifications are
+coalesced into a single background job.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import flt, get_url, now_datetime
+
+from erpnext_agile.erpnext_agile.doctype.agile_board_change.agile_board_change import (
+    record_board_changes,
+)
+from erpnext_agile.erpnext_agile.doctype.agile_issue_status_interval.agile_issue_status_interval import (
+    record_status_intervals,
+)
+from erpnext_agile.erpnext_agile.doctype.agile_sprint_event.agile_sprint_event import (
+    make_event,
+    record_sprint_events,
+)
+from erpnext_agile.agile_metadata import is_done_status, status_exists
+from erpnext_agile.agile_permissions import filter_permitted
+from erpnext_agile.agile_sprint_metrics import apply_sprint_delta
+from erpnext_agile.agile_sprint_report import bump_sprint_versions
+from erpnext_agile.agile_subtask_progress import apply_parent_delta
+from erpnext_agile.agile_workflow_conditions import ConditionEvaluator
+from erpnext_agile.erpnext_agile.doctype.agile_notification.agile_notification import queue_notification
+from erpnext_agile.agile_workflow_graph import get_project_workflow
+from erpnext_agile.overrides.task import map_agile_status_to_task_status
+
+
+class AgileBulkTransition:
+    """Move many agile issues to one status in a handful of statements"""
+
+    def __init__(self, to_status, comment=None):
+        if not status_exists(to_status):
+            frappe.throw(_("Invalid status: {0}").format(to_status))
+
+        self.to_status = to_status
+        self.comment = comment
+        self.user = frappe.session.user
+        self.now = now_datetime()
+        self.task_status = map_agile_status_to_task_status(to_status) or 'Open'
+        self.is_done = is_done_status(to_status)
+        self.roles = set(frappe.get_roles(self.user))
+
+        self.checked_pairs = {}
+        # Conditions are checked before anything is written, so lookups can be shared
+        self.evaluator = ConditionEvaluator(memoise_lookups=True)
+
+    def run(self, task_names=None, issue_keys=None):
+        """Validate and apply the transition, returning per-issue errors"""
+        tasks = self.load_tasks(task_names, issue_keys)
+        errors = []
+
+        if issue_keys:
+            found = {task.issue_key for task in tasks}
+            errors.extend(
+                {'issue_key': key, 'error': _("Issue not found")}
+                for key in issue_keys if key not in found
+            )
+
+        movable = []
+        for task in tasks:
+            if task.issue_status == self.to_status:
+                continue
+
+            error = self.check_transition(task)
+            if error:
+                errors.append({'issue_key': task.issue_key, 'task': task.name, 'error': error})
+            else:
+                movable.append(task)
+
+        if self.task_status == 'Completed':
+            blocked = self.get_blocked_by_dependencies(movable)
+            for task in movable:
+                if task.name in blocked:
+                    errors.append({
+                        'issue_key': task.issue_key,
+                        'task': task.name,
+                        'error': _("Cannot complete {0} as its dependent tasks are not completed or cancelled").format(task.name)
+                    })
+            movable = [task for task in movable if task.name not in blocked]
+
+        moved = self.apply(movable)
+        moved_names = {task.name for task in moved}
+        errors.extend(
+            {'issue_key': task.issue_key, 'task': task.name, 'error': _("Issue was changed by another user")}
+            for task in movable if task.name not in moved_names
+        )
+
+        return {
+            'success': True,
+            'moved': len(moved),
+            'errors': errors
+        }
+
+    def load_tasks(self, task_names=None, issue_keys=None):
+        """Load the permitted tasks in one query"""
+        frappe.has_permission('Task', 'write', throw=True)
+
+        if issue_keys:
+            filters = {'issue_key': ['in', list(issue_keys)]}
+        elif task_names:
+            filters = {'name': ['in', list(task_names)]}
+        else:
+            return []
+
+        filters['is_agile'] = 1
+        tasks = frappe.get_list('Task', filters=filters, fields=['*'], limit_page_length=0)
+        writable = set(filter_permitted('Task', [task.name for task in tasks], 'write'))
+        return [task for task in tasks if task.name in writable]
+
+    def check_transition(self, task):
+        """Error message if the task cannot move to the target status"""
+        workflow = get_project_workflow(task.project)
+        if not workflow or not task.issue_status:
+            return None
+
+        pair = (workflow.name, task.issue_status)
+        if pair not in self.checked_pairs:
+            self.checked_pairs[pair] = self.check_pair(workflow, task.issue_status)
+
+        error, edge = self.checked_pairs[pair]
+        if error:
+            return error
+
+        if edge.condition:
+            try:
+                if not workflow.evaluate(edge, task, self.evaluator):
+                    return _("Transition condition not met: {0}").format(edge.condition)
+            except Exception as e:
+                return str(e)
+
+        return None
+
+    def check_pair(self, workflow, from_status):
+        """Validate one (scheme, from status) pair, returning (error, edge)"""
+        edge = workflow.get_edge(from_status, self.to_status)
+        if not edge:
+            return _("No transition defined from '{0}' to '{1}'").format(
+                from_status, self.to_status), None
+
+        required = edge.required_permission
+        if required and required != 'All' and required not in self.roles:
+            return _("User does not have required permission: {0}").format(required), None
+
+        return None, edge
+
+    def get_blocked_by_dependencies(self, tasks):
+        """Tasks whose dependencies outside this batch are still open"""
+        if not tasks:
+            return set()
+
+        names = tuple(task.name for task in tasks)
+        return {row[0] for row in frappe.db.sql("""
+            SELECT DISTINCT d.parent
+            FROM `tabTask Depends On` d
+            INNER JOIN `tabTask` dep ON dep.name = d.task
+            WHERE d.parenttype = 'Task'
+                AND d.parent IN %(names)s
+                AND dep.name NOT IN %(names)s
+                AND dep.status NOT IN ('Completed', 'Cancelled')
+        """, {'names': names})}
+
+    def apply(self, tasks):
+        """
+        Write the transition and its side effects for the validated tasks,
+        returning the tasks that were moved
+        """
+        if not tasks:
+            return []
+
+        by_from_status = {}
+        for task in tasks:
+            by_from_status.setdefault(task.issue_status, []).append(task.name)
+
+        set_clause = """issue_status = %(to_status)s, status = %(task_status)s,
+            modified = %(now)s, modified_by = %(user)s"""
+        if self.is_done:
+            set_clause += ", remaining_estimate = 0"
+
+        # The source status guards against concurrent moves of the same cards. The
+        # rows still in it are locked first, so side effects are only written for
+        # tasks this request actually moved.
+        moved = set()
+        for from_status, names in by_from_status.items():
+            names = frappe.db.sql_list("""
+                SELECT name FROM `tabTask`
+                WHERE name IN %(names)s AND IFNULL(issue_status, '') = %(from_status)s
+                FOR UPDATE
+            """, {'names': tuple(names), 'from_status': from_status or ''})
+            if not names:
+                continue
+
+            frappe.db.sql(f"""
+                UPDATE `tabTask`
+                SET {set_clause}
+                WHERE name IN %(names)s
+            """, {
+                'to_status': self.to_status,
+                'task_status': self.task_status,
+                'now': self.now,
+                'user': self.user,
+                'names': tuple(names)
+            })
+            moved.update(names)
+
+        tasks = [task for task in tasks if task.name in moved]
+        if not tasks:
+            return []
+
+        names = tuple(task.name for task in tasks)
+
+        # Keep 'Task Depends On' rows of other tasks in sync, as task_on_update does
+        frappe.db.sql("""
+            UPDATE `tabTask Depends On` SET custom_task_status = %(to_status)s
+            WHERE task IN %(names)s
+        """, {'to_status': self.to_status, 'names': names})
+
+        if self.task_status == 'Completed':
+            self.close_assignments(names)
+
+        self.log_activities(tasks)
+        record_status_intervals([{
+            'issue': task.name,
+            'project': task.project,
+            'sprint': task.current_sprint,
+            'status': self.to_status
+        } for task in tasks], self.now)
+        record_board_changes([{
+            'project': task.project,
+            'sprint': task.current_sprint or None,
+            'task': task.name,
+            'change_type': 'moved',
+            'from_status': task.issue_status,
+            'to_status': self.to_status
+        } for task in tasks if task.project and task.status != 'Cancelled'])
+
+        self.update_parent_progress(tasks)
+        self.update_sprints(tasks)
+        bump_sprint_versions({task.current_sprint for task in tasks})
+        self.update_projects({task.project for task in tasks if task.project})
+
+        frappe.enqueue(
+            'erpnext_agile.agile_bulk_transition.send_transition_notifications',
+            queue='short',
+            enqueue_after_commit=True,
+            tasks={task.name: task.issue_status for task in tasks},
+            to_status=self.to_status,
+            user=self.user
+        )
+        return tasks
+
+    def close_assignments(self, names):
+        """Close open ToDos of completed tasks, as Task.unassign_todo does"""
+        frappe.db.sql("""
+            UPDATE `tabToDo` SET status = 'Closed', modified = %(now)s, modified_by = %(user)s
+            WHERE reference_type = 'Task' AND reference_name IN %(names)s AND status = 'Open'
+        """, {'now': self.now, 'user': self.user, 'names': names})
+        frappe.db.sql("""
+            UPDATE `tabTask` SET _assign = '[]' WHERE name IN %(names)s
+        """, {'names': names})
+
+    def log_activities(self, tasks):
+        """Insert one activity row per moved task in a single statement"""
+        frappe.db.bulk_insert(
+            'Agile Issue Activity',
+            fields=['name', 'issue', 'project', 'activity_type', 'user', 'timestamp', 'data', 'comment',
+                'owner', 'modified_by', 'creation', 'modified'],
+            values=[(
+                frappe.generate_hash(length=10),
+                task.name,
+                task.project,
+                'status_changed',
+                self.user,
+                self.now,
+                json.dumps({'from_status': task.issue_status, 'to_status': self.to_status}),
+                self.comment,
+                self.user,
+                self.user,
+                self.now,
+                self.now
+            ) for task in tasks]
+        )
+
+    def update_parent_progress(self, tasks):
+        """Apply the change in completed children once per affected parent issue"""
+        deltas = {}
+        for task in tasks:
+            if task.parent_issue and is_done_status(task.issue_status) != self.is_done:
+                deltas[task.parent_issue] = deltas.get(task.parent_issue, 0) + (1 if self.is_done else -1)
+
+        for parent, completed_delta in deltas.items():
+            apply_parent_delta(parent, completed_delta=completed_delta)
+
+    def update_sprints(self, tasks):
+        """Apply the change in completed points once per affected sprint"""
+        deltas = {}
+        events = []
+        for task in tasks:
+            if not task.current_sprint or not task.is_agile:
+                continue
+            was_done = is_done_status(task.issue_status)
+            if was_done != self.is_done:
+                points = flt(task.story_points)
+                deltas[task.current_sprint] = deltas.get(task.current_sprint, 0) + (points if self.is_done else -points)
+                events.append(make_event(task.current_sprint, task.name,
+                    'completed' if self.is_done else 'reopened',
+                    completed_delta=points if self.is_done else -points))
+
+        for sprint, completed_delta in deltas.items():
+            apply_sprint_delta(sprint, completed_delta=completed_delta)
+        record_sprint_events(events, self.now)
+
+    def update_projects(self, projects):
+        """Refresh project completion once per affected project"""
+        for project in projects:
+            frappe.get_doc('Project', project).update_project()
+
+
+def send_transition_notifications(tasks, to_status, user):
+    """Queue the transition events of a bulk move; recipients get them in their digest"""
+    rows = frappe.get_all('Task',
+        filters={'name': ['in', list(tasks)]},
+        fields=['name', 'issue_key', 'subject', 'project', 'reporter']
+    )
+    if not rows:
+        return
+
+    notify_projects = set(frappe.get_all('Project',
+        filters={
+            'name': ['in', list({row.project for row in rows if row.project})],
+            'enable_email_notifications': 1
+        },
+        pluck='name'
+    ))
+    rows = [row for row in rows if row.project in notify_projects]
+    if not rows:
+        return
+
+    recipients = {}
+    for row in rows:
+        if row.reporter:
+            recipients.setdefault(row.name, set()).add(row.reporter)
+
+    for child_doctype in ('Assigned To Users', 'Agile Issue Watcher'):
+        for member in frappe.get_all(child_doctype,
+            filters={'parent': ['in', [row.name for row in rows]], 'parenttype': 'Task'},
+            fields=['parent', 'user']
+        ):
+            recipients.setdefault(member.parent, set()).add(member.user)
+
+    site_url = get_url()
+    for row in rows:
+        users = recipients.get(row.name, set()) - {user}
+        if not users:
+            continue
+
+        queue_notification(users, 'transitioned',
+            f"[{row.issue_key}] Status Changed: {row.subject}",
+            f"<a href='{site_url}/app/task/{row.name}'>[{row.issue_key}]</a> "
+            f"{frappe.utils.escape_html(row.subject or '')}: "
+            + _("moved from {0} to {1}").format(tasks.get(row.name), to_status),
+            project=row.project, reference_doctype='Task', reference_name=row.name)
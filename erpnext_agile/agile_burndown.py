@@ -0,0 +1,109 @@
+# erpnext_agile/agile_burndown.py
+"""
+Burndown and burnup derived from the Agile Sprint Event log.
+
+Every change to a sprint's scope or completed points is an append-only
+event, so the sprint's state at any moment is the sum of its events up to
+that moment. A day series needs one grouped query over the (sprint,
+timestamp) index. Scope added and removed after the sprint started are
+the positive and negative scope changes of the day. Correction events from
+reconciliation only move the totals, and are not counted as scope change.
+
+Agile Sprint Burndown rows are an optional snapshot of this series.
+"""
+
+from itertools import accumulate
+
+import frappe
+from frappe.utils import add_days, date_diff, flt, get_datetime, getdate, today
+
+# Scope changes that count as added/removed scope
+SCOPE_EVENTS = ('added', 'removed', 'points_changed')
+
+
+def get_sprint_totals_at(sprint, at=None):
+    """(scope, completed points) of a sprint at a moment (default: now)"""
+    conditions = ["sprint = %(sprint)s"]
+    values = {'sprint': sprint}
+    if at:
+        conditions.append("timestamp <= %(at)s")
+        values['at'] = get_datetime(at)
+
+    row = frappe.db.sql(f"""
+        SELECT SUM(scope_delta), SUM(completed_delta)
+        FROM `tabAgile Sprint Event`
+        WHERE {' AND '.join(conditions)}
+    """, values)[0]
+    return flt(row[0]), flt(row[1])
+
+
+def get_sprint_burndown_series(sprint, from_date=None, to_date=None):
+    """
+    Daily burndown/burnup rows of a sprint, as of the end of each day.
+
+    Defaults to the sprint's start date through its end date, cut off at
+    today. Every row has the scope, completed and remaining points, the scope
+    added and removed that day, and the ideal line. The ideal line runs from
+    the scope at the start of the sprint down to zero at its end date.
+    """
+    sprint_doc = frappe.db.get_value('Agile Sprint', sprint,
+        ['start_date', 'end_date', 'actual_start_date', 'actual_end_date'], as_dict=True)
+    if not sprint_doc:
+        return []
+
+    start_date = getdate(sprint_doc.actual_start_date or sprint_doc.start_date)
+    end_date = getdate(sprint_doc.end_date or sprint_doc.actual_end_date)
+    from_date = getdate(from_date) if from_date else start_date
+    to_date = min(getdate(to_date) if to_date else end_date, getdate(today()))
+    if to_date < from_date:
+        return []
+
+    days = {}
+    baseline_scope = baseline_completed = 0
+    for row in frappe.db.sql("""
+        SELECT DATE(timestamp) AS day,
+            SUM(scope_delta) AS scope,
+            SUM(completed_delta) AS completed,
+            SUM(CASE WHEN event_type IN %(scope_events)s AND scope_delta > 0 THEN scope_delta ELSE 0 END) AS added,
+            SUM(CASE WHEN event_type IN %(scope_events)s AND scope_delta < 0 THEN -scope_delta ELSE 0 END) AS removed
+        FROM `tabAgile Sprint Event`
+        WHERE sprint = %(sprint)s AND timestamp < %(until)s
+        GROUP BY day
+    """, {'sprint': sprint, 'scope_events': SCOPE_EVENTS, 'until': add_days(to_date, 1)}, as_dict=True):
+        day = getdate(row.day)
+        if day < from_date:
+            # Everything before the range is its opening balance
+            baseline_scope += flt(row.scope)
+            baseline_completed += flt(row.completed)
+        else:
+            days[day] = row
+
+    dates = [add_days(from_date, offset) for offset in range(date_diff(to_date, from_date) + 1)]
+    empty = frappe._dict(scope=0, completed=0, added=0, removed=0)
+    rows = [days.get(date, empty) for date in dates]
+
+    scope = [baseline_scope + flt(value) for value in accumulate(flt(row.scope) for row in rows)]
+    completed = [baseline_completed + flt(value) for value in accumulate(flt(row.completed) for row in rows)]
+
+    # Scope committed by the end of the first day, i.e. including sprint planning
+    committed = get_sprint_totals_at(sprint, f"{start_date} 23:59:59")[0]
+    sprint_days = date_diff(end_date, start_date)
+
+    return [
+        {
+            'date': date,
+            'scope': scope[i],
+            'completed_points': completed[i],
+            'remaining_points': scope[i] - completed[i],
+            'added_points': flt(rows[i].added) if date > start_date else 0,
+            'removed_points': flt(rows[i].removed) if date > start_date else 0,
+            'ideal_remaining': get_ideal_remaining(committed, start_date, sprint_days, date)
+        }
+        for i, date in enumerate(dates)
+    ]
+
+
+def get_ideal_remaining(committed, start_date, sprint_days, date):
+    if sprint_days <= 0:
+        return 0
+    return max(0, committed * (1 - date_diff(date, start_date) / sprint_days))
@@ -0,0 +1,84 @@
+# erpnext_agile/agile_cache.py
+"""
+Two level cache for rarely changing configuration (workflow schemes, status
+metadata and the like).
+
+Values are built from the database once, shared between workers through a
+Redis hash and kept per process. Each namespace carries a version token in
+Redis; invalidating bumps the token, so every process drops its copy on its
+next request. The token itself is read at most once per request.
+"""
+
+import frappe
+
+# namespace -> {key: (version, value)}
+_process_cache = {}
+
+
+class VersionedCache:
+    """Process + Redis cache for one namespace, invalidated by a version token
+
+    `builder(key)` loads plain, picklable data from the database. `compiler(data)`
+    optionally turns it into the process-local object (e.g. with code objects)
+    that is returned to callers.
+    """
+
+    def __init__(self, namespace, builder, compiler=None):
+        self.namespace = namespace
+        self.builder = builder
+        self.compiler = compiler
+        self.redis_key = f"agile_cache|{namespace}"
+        self.version_key = f"agile_cache_version|{namespace}"
+
+    def get(self, key):
+        version = self.get_version()
+        entries = _process_cache.setdefault(self.namespace, {})
+
+        cached = entries.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        shared = frappe.cache().hget(self.redis_key, key)
+        if shared and shared[0] == version:
+            data = shared[1]
+        else:
+            data = self.builder(key)
+            frappe.cache().hset(self.redis_key, key, (version, data))
+
+        value = self.compiler(data) if self.compiler and data is not None else data
+        entries[key] = (version, value)
+        return value
+
+    def get_version(self):
+        """Version token of the namespace, read once per request"""
+        versions = getattr(frappe.local, 'agile_cache_versions', None)
+        if versions is None:
+            versions = frappe.local.agile_cache_versions = {}
+
+        if self.namespace not in versions:
+            version = frappe.cache().get_value(self.version_key)
+            if not version:
+                version = frappe.generate_hash(length=12)
+                frappe.cache().set_value(self.version_key, version)
+            versions[self.namespace] = version
+
+        return versions[self.namespace]
+
+    def invalidate(self):
+        """Drop every cached value of the namespace in all processes
+
+        The token is bumped again after commit, so a worker that rebuilt from the
+        old rows while this transaction was open does not keep stale data.
+        """
+        self.bump()
+        if getattr(frappe.local, 'db', None):
+            frappe.db.after_commit.add(self.bump)
+
+    def bump(self):
+        frappe.cache().set_value(self.version_key, frappe.generate_hash(length=12))
+        frappe.cache().delete_value(self.redis_key)
+        _process_cache.pop(self.namespace, None)
+
+        versions = getattr(frappe.local, 'agile_cache_versions', None)
+        if versions:
+            versions.pop(self.namespace, None)
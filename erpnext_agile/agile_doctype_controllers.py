@@ -1,6 +1,10 @@
 import frappe
 from frappe import _
+from erpnext_agile.agile_sequence import parse_sequence_value, reserve_sequence_value
+from erpnext_agile.agile_save_profiler import profiled
+from erpnext_agile.agile_side_effects import schedule as schedule_side_effect
 
+@profiled('task_validate')
 def task_validate(doc, method):
     """Extend Task validation for agile features"""
     if doc.is_agile:
@@ -18,11 +22,18 @@ def task_validate(doc, method):
         # Auto-generate issue key if not set
         if not doc.issue_key:
             doc.issue_key = manager.generate_issue_key(project_doc)
+        elif doc.is_new() and project_doc.get('project_key'):
+            # Keys assigned by imports/syncs must not be handed out again
+            prefix = f"{project_doc.project_key}-"
+            number = parse_sequence_value(doc.issue_key, prefix)
+            if number:
+                reserve_sequence_value(prefix, number, 'issue_key')
         
         # Set default status if not set
         if not doc.issue_status:
             doc.issue_status = manager.get_default_status(project_doc)
 
+@profiled('task_on_update')
 def task_on_update(doc, method):
     """Actions on task update"""
     if doc.is_agile:
@@ -36,14 +47,26 @@ def task_on_update(doc, method):
             frappe.enqueue(
                 'erpnext_agile.agile_github_integration.AgileGitHubIntegration.create_github_issue',
                 task_doc=doc,
-                queue='short'
+                queue='short',
+                enqueue_after_commit=True
             )
     ## Reflection: Tasks Linked into other task's child table as dependincies were not getting updated on task update. Hence added a method to update the same.
-    sync_dependent_task_details(doc)
+    ## These run in a background job after commit (see agile_side_effects)
+    if not doc.is_new() and (doc.has_value_changed('subject') or doc.has_value_changed('issue_status')):
+        schedule_side_effect(doc, 'dependent_task_details')
     ## Reflection: Test Cases Linked into This task's child table will also reflect this tasks into its linked tasks child table.
-    link_task_to_test_cases(doc)
-    remove_unlinked_test_cases(doc)    
+    if not doc.flags.sync_in_progress and test_case_links_changed(doc):
+        schedule_side_effect(doc, 'test_case_links')
+
+def test_case_links_changed(doc):
+    """Whether this save added or removed rows of custom_test_cases"""
+    current_tcs = {row.test_case for row in doc.custom_test_cases if row.test_case}
+    old_doc = doc.get_doc_before_save()
+    if not old_doc:
+        return bool(current_tcs)
+    return current_tcs != {row.test_case for row in old_doc.custom_test_cases if row.test_case}
 
+@profiled('task_on_update.sync_dependent_task_details')
 def sync_dependent_task_details(doc):
     """
     Updates the subject and status in the 'Task Depends On' child table 
@@ -59,6 +82,12 @@ def sync_dependent_task_details(doc):
             task = %s
     """, (doc.subject, doc.issue_status, doc.name))
 
+def sync_test_case_links(doc):
+    """Mirror this task's current test cases into the Test Cases' linked items"""
+    link_task_to_test_cases(doc)
+    remove_unlinked_test_cases(doc)
+
+@profiled('task_on_update.link_task_to_test_cases')
 def link_task_to_test_cases(doc):
     """
     For each test case linked to this task, ensure that the task is listed in the test case's linked tasks.
@@ -78,20 +107,18 @@ def link_task_to_test_cases(doc):
             test_case_doc.flags.sync_in_progress = True
             test_case_doc.save(ignore_permissions=True)
 
+@profiled('task_on_update.remove_unlinked_test_cases')
 def remove_unlinked_test_cases(doc):
-    """Remove this Task from Test Cases that were unlinked during this save."""
-    if doc.is_new() or doc.flags.sync_in_progress:
-        return
-
-    old_doc = doc.get_doc_before_save()
-    if not old_doc:
-        return
-
-    # Find which test cases were present before the save, but are missing now
-    old_tcs = {row.test_case for row in old_doc.custom_test_cases if row.test_case}
+    """Remove this Task from Test Cases that link it but are no longer in its test cases."""
+    # Compared with the current state rather than the previous save, so
+    # several coalesced saves are handled in one pass
     current_tcs = {row.test_case for row in doc.custom_test_cases if row.test_case}
+    linked_tcs = set(frappe.get_all('Test Case Link',
+        filters={'parenttype': 'Test Case', 'link_doctype': 'Task', 'link_name': doc.name},
+        pluck='parent'
+    ))
     
-    removed_tcs = old_tcs - current_tcs
+    removed_tcs = linked_tcs - current_tcs
 
     for tc_name in removed_tcs:
         tc_doc = frappe.get_doc("Test Case", tc_name)
@@ -120,6 +147,16 @@ def task_after_insert(doc, method):
 def task_on_trash(doc, method):
     """Actions on task deletion"""
     if doc.is_agile:
-        # Clean up related records
+        # Clean up related records, including activity not yet flushed
+        from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+            discard_issue_activity,
+        )
+        discard_issue_activity(doc.name)
         frappe.db.delete('Agile Issue Activity', {'issue': doc.name})
-        frappe.db.delete('Agile Work Timer', {'task': doc.name})
\ No newline at end of file
+        frappe.db.delete('Agile Issue Activity Archive', {'issue': doc.name})
+        frappe.db.delete('Agile Work Timer', {'task': doc.name})
+        frappe.db.delete('Agile Issue Status Interval', {'issue': doc.name})
+        
+        # Past days of the cumulative flow included this task's intervals
+        from erpnext_agile.agile_flow_metrics import clear_cumulative_flow_cache
+        clear_cumulative_flow_cache(doc.project)
\ No newline at end of file
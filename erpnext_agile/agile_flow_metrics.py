@@ -0,0 +1,287 @@
+# erpnext_agile/agile_flow_metrics.py
+"""
+Flow metrics (cycle time, lead time, throughput, time in status) computed from
+the Agile Issue Status Interval table with one aggregate query each.
+
+An issue counts as completed when its open interval is in a Done status; the
+sprint, project and date scope apply to that Done interval.
+
+The cumulative flow diagram streams interval start/end events in time order
+through running counters. Closed days are cached per project and sprint.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, get_datetime, add_days, getdate, today
+
+# Story points is a Select field, so it is stored as text
+POINTS_SQL = "IFNULL(CAST(NULLIF(t.story_points, '') AS DECIMAL(10, 2)), 0)"
+
+SECONDS_PER_DAY = 86400
+
+STATUS_CATEGORIES = ('To Do', 'In Progress', 'Done')
+
+CFD_BUCKETS = ('day', 'week', 'month')
+
+
+class AgileFlowMetrics:
+    """Flow metrics for a project, a sprint or a date range"""
+
+    def __init__(self, project=None, sprint=None, from_date=None, to_date=None):
+        self.project = project
+        self.sprint = sprint
+        self.from_date = from_date
+        self.to_date = to_date
+
+    def done_conditions(self):
+        """Scope of completed issues, applied to their open Done interval `d`"""
+        conditions = ["d.status_category = 'Done'", "d.left_at IS NULL"]
+        values = {}
+
+        if self.project:
+            conditions.append("d.project = %(project)s")
+            values['project'] = self.project
+        if self.sprint:
+            conditions.append("d.sprint = %(sprint)s")
+            values['sprint'] = self.sprint
+        if self.from_date:
+            conditions.append("d.entered_at >= %(from_date)s")
+            values['from_date'] = get_datetime(self.from_date)
+        if self.to_date:
+            conditions.append("d.entered_at < %(to_date)s")
+            values['to_date'] = get_datetime(add_days(getdate(self.to_date), 1))
+
+        return " AND ".join(conditions), values
+
+    def get_cycle_time(self):
+        """Average time from first entering In Progress to entering Done"""
+        conditions, values = self.done_conditions()
+        result = frappe.db.sql(f"""
+            SELECT COUNT(*) AS count, AVG(TIMESTAMPDIFF(SECOND, c.started_at, c.done_at)) AS seconds
+            FROM (
+                SELECT d.entered_at AS done_at, (
+                    SELECT MIN(s.entered_at)
+                    FROM `tabAgile Issue Status Interval` s
+                    WHERE s.issue = d.issue
+                        AND s.status_category = 'In Progress'
+                        AND s.entered_at <= d.entered_at
+                ) AS started_at
+                FROM `tabAgile Issue Status Interval` d
+                WHERE {conditions}
+            ) c
+            WHERE c.started_at IS NOT NULL
+        """, values, as_dict=True)[0]
+
+        return {
+            'average_days': round(flt(result.seconds) / SECONDS_PER_DAY, 1),
+            'count': cint(result.count)
+        }
+
+    def get_lead_time(self):
+        """Average time from issue creation to entering Done"""
+        conditions, values = self.done_conditions()
+        result = frappe.db.sql(f"""
+            SELECT COUNT(*) AS count, AVG(TIMESTAMPDIFF(SECOND, t.creation, d.entered_at)) AS seconds
+            FROM `tabAgile Issue Status Interval` d
+            INNER JOIN `tabTask` t ON t.name = d.issue
+            WHERE {conditions}
+        """, values, as_dict=True)[0]
+
+        return {
+            'average_days': round(flt(result.seconds) / SECONDS_PER_DAY, 1),
+            'count': cint(result.count)
+        }
+
+    def get_throughput(self):
+        """Issues and story points completed per day"""
+        conditions, values = self.done_conditions()
+        rows = frappe.db.sql(f"""
+            SELECT DATE(d.entered_at) AS date, COUNT(*) AS issues, SUM({POINTS_SQL}) AS points
+            FROM `tabAgile Issue Status Interval` d
+            INNER JOIN `tabTask` t ON t.name = d.issue
+            WHERE {conditions}
+            GROUP BY DATE(d.entered_at)
+            ORDER BY date
+        """, values, as_dict=True)
+
+        return {
+            'issues': sum(cint(row.issues) for row in rows),
+            'points': sum(flt(row.points) for row in rows),
+            'by_date': rows
+        }
+
+    def get_time_in_status(self):
+        """Average days spent per visit to each status, open intervals counted up to now"""
+        conditions = []
+        values = {}
+        if self.project:
+            conditions.append("i.project = %(project)s")
+            values['project'] = self.project
+        if self.sprint:
+            conditions.append("i.sprint = %(sprint)s")
+            values['sprint'] = self.sprint
+        if self.from_date:
+            conditions.append("IFNULL(i.left_at, NOW()) >= %(from_date)s")
+            values['from_date'] = get_datetime(self.from_date)
+        if self.to_date:
+            conditions.append("i.entered_at < %(to_date)s")
+            values['to_date'] = get_datetime(add_days(getdate(self.to_date), 1))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = frappe.db.sql(f"""
+            SELECT i.status, i.status_category, COUNT(*) AS visits, COUNT(DISTINCT i.issue) AS issues,
+                AVG(IFNULL(i.duration, TIMESTAMPDIFF(SECOND, i.entered_at, NOW()))) AS seconds
+            FROM `tabAgile Issue Status Interval` i
+            {where}
+            GROUP BY i.status, i.status_category
+        """, values, as_dict=True)
+
+        return [{
+            'status': row.status,
+            'status_category': row.status_category,
+            'visits': cint(row.visits),
+            'issues': cint(row.issues),
+            'average_days': round(flt(row.seconds) / SECONDS_PER_DAY, 2)
+        } for row in rows]
+
+    def get_flow_metrics(self):
+        return {
+            'cycle_time': self.get_cycle_time(),
+            'lead_time': self.get_lead_time(),
+            'throughput': self.get_throughput(),
+            'time_in_status': self.get_time_in_status()
+        }
+
+    def scope_conditions(self):
+        """Project and sprint scope on the interval table `i`"""
+        conditions = []
+        values = {}
+        if self.project:
+            conditions.append("i.project = %(project)s")
+            values['project'] = self.project
+        if self.sprint:
+            conditions.append("i.sprint = %(sprint)s")
+            values['sprint'] = self.sprint
+        return conditions, values
+
+    def get_cumulative_flow(self, start, end, bucket='day'):
+        """Issue counts per status category at the end of each bucket"""
+        if bucket not in CFD_BUCKETS:
+            frappe.throw(_("Bucket must be one of {0}").format(", ".join(CFD_BUCKETS)))
+
+        start, end = getdate(start), min(getdate(end), getdate(today()))
+        if end < start:
+            frappe.throw(_("End date cannot be before start date"))
+
+        cache = CumulativeFlowCache(self.project, self.sprint)
+        daily = cache.get_days()
+
+        # Reuse the cached run of closed days and stream events only after it
+        counts = None
+        day = start
+        while day <= end and day in daily:
+            counts = daily[day]
+            day = add_days(day, 1)
+
+        if day <= end:
+            if counts is None:
+                counts = self.get_open_counts(day)
+            computed = self.stream_daily_counts(day, end, counts)
+            cache.set_days({d: c for d, c in computed.items() if d < getdate(today())})
+            daily.update(computed)
+
+        dates = []
+        series = {category: [] for category in STATUS_CATEGORIES}
+        day = start
+        while day <= end:
+            next_day = add_days(day, 1)
+            if bucket == 'day' or next_day > end or is_bucket_end(day, next_day, bucket):
+                dates.append(day)
+                for category, count in zip(STATUS_CATEGORIES, daily[day]):
+                    series[category].append(count)
+            day = next_day
+
+        return {'bucket': bucket, 'dates': dates, 'series': series}
+
+    def get_open_counts(self, day):
+        """Issues per category in their status at the start of a day"""
+        conditions, values = self.scope_conditions()
+        conditions += [
+            "i.entered_at < %(day_start)s",
+            "(i.left_at IS NULL OR i.left_at >= %(day_start)s)"
+        ]
+        values['day_start'] = get_datetime(day)
+
+        rows = frappe.db.sql(f"""
+            SELECT i.status_category, COUNT(*)
+            FROM `tabAgile Issue Status Interval` i
+            WHERE {" AND ".join(conditions)}
+            GROUP BY i.status_category
+        """, values)
+
+        totals = dict(rows)
+        return [cint(totals.get(category)) + (cint(totals.get(None)) if category == 'To Do' else 0)
+            for category in STATUS_CATEGORIES]
+
+    def stream_daily_counts(self, from_day, to_day, counts):
+        """Walk interval start/end events once, snapshotting counters at each day end"""
+        conditions, values = self.scope_conditions()
+        values.update({
+            'from_start': get_datetime(from_day),
+            'to_end': get_datetime(add_days(to_day, 1))
+        })
+        scope = "".join(f" AND {condition}" for condition in conditions)
+
+        events = frappe.db.sql(f"""
+            SELECT i.entered_at AS at, i.status_category, 1 AS delta
+            FROM `tabAgile Issue Status Interval` i
+            WHERE i.entered_at >= %(from_start)s AND i.entered_at < %(to_end)s{scope}
+            UNION ALL
+            SELECT i.left_at AS at, i.status_category, -1 AS delta
+            FROM `tabAgile Issue Status Interval` i
+            WHERE i.left_at >= %(from_start)s AND i.left_at < %(to_end)s{scope}
+            ORDER BY at
+        """, values, as_iterator=True)
+
+        index = {category: position for position, category in enumerate(STATUS_CATEGORIES)}
+        counts = list(counts)
+        daily = {}
+        day = getdate(from_day)
+
+        for at, category, delta in events:
+            event_day = getdate(at)
+            while day < event_day:
+                daily[day] = list(counts)
+                day = add_days(day, 1)
+            counts[index.get(category, 0)] += delta
+
+        while day <= to_day:
+            daily[day] = list(counts)
+            day = add_days(day, 1)
+
+        return daily
+
+
+class CumulativeFlowCache:
+    """Redis hash of closed-day category counts for one project and sprint"""
+
+    def __init__(self, project=None, sprint=None):
+        self.key = f"agile_cfd|{project or ''}|{sprint or ''}"
+
+    def get_days(self):
+        return {getdate(day): counts for day, counts in (frappe.cache().hgetall(self.key) or {}).items()}
+
+    def set_days(self, days):
+        for day, counts in days.items():
+            frappe.cache().hset(self.key, day.isoformat(), counts)
+
+
+def clear_cumulative_flow_cache(project=None):
+    """Drop cached days, e.g. after intervals of a past day were removed"""
+    frappe.cache().delete_keys(f"agile_cfd|{project or ''}|" if project else "agile_cfd|")
+
+
+def is_bucket_end(day, next_day, bucket):
+    if bucket == 'week':
+        return next_day.weekday() == 0
+    return next_day.month != day.month
@@ -0,0 +1,222 @@
+# erpnext_agile/agile_forecast.py
+"""
+Monte Carlo delivery forecasts from sprint history.
+
+The completed points of a project's recent sprints are its throughput
+sample. To forecast a backlog or release, every simulation draws one
+throughput per future sprint from that sample until the remaining points
+are done. All simulations run at once as NumPy arrays, a block of sprints
+at a time, so 100k simulations of a large backlog take milliseconds. The
+number of sprints needed at a confidence level is the percentile of those
+runs. For the next sprint, the points that fit at a confidence level are
+the points a simulated sprint reaches at least that often.
+
+Results are cached per project and scope, keyed by the history and the
+remaining points they were computed from, so repeated views skip the
+simulation until a sprint completes or the backlog changes.
+"""
+
+import zlib
+
+import numpy as np
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, date_diff, flt, getdate, today
+
+# Completed sprints the throughput sample is drawn from
+HISTORY_SPRINTS = 10
+
+DEFAULT_SIMULATIONS = 10000
+MAX_SIMULATIONS = 100000
+
+DEFAULT_CONFIDENCE_LEVELS = (50, 85, 95)
+
+# Future sprints simulated per block; bounds memory to simulations x block
+SPRINT_BLOCK = 26
+
+# Simulations still running after this many sprints count as not done
+MAX_FORECAST_SPRINTS = 520
+
+# Seconds a cached forecast lives without being read
+FORECAST_TTL = 24 * 3600
+
+
+class AgileDeliveryForecast:
+    """Monte Carlo forecasts for a project's backlog or one of its releases"""
+
+    def __init__(self, project, release=None, simulations=None, confidence_levels=None):
+        self.project = project
+        self.release = release
+        if release and frappe.db.get_value('Agile Release Version', release, 'project') != project:
+            frappe.throw(_("Release {0} does not belong to project {1}").format(release, project))
+        self.simulations = min(max(cint(simulations) or DEFAULT_SIMULATIONS, 1000), MAX_SIMULATIONS)
+        self.confidence_levels = parse_confidence_levels(confidence_levels)
+
+    def get_forecast(self, remaining_points=None):
+        """
+        When the remaining points will be done, and how much fits in the next
+        sprint, at each confidence level.
+
+        Remaining points default to the open estimated issues of the release,
+        or of the project backlog without one.
+        """
+        history = self.get_history()
+        remaining = flt(remaining_points) if remaining_points is not None else self.get_remaining_points()
+        anchor = self.get_anchor_date()
+
+        fingerprint = (
+            tuple(history.throughput), history.sprint_days, remaining, anchor,
+            self.simulations, self.confidence_levels
+        )
+        cached = frappe.cache().get_value(self.cache_key)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        forecast = {
+            'project': self.project,
+            'release': self.release,
+            'remaining_points': remaining,
+            'simulations': self.simulations,
+            'sprints_analyzed': len(history.throughput),
+            'sprint_length_days': history.sprint_days,
+            'average_velocity': round(sum(history.throughput) / len(history.throughput), 1)
+                if history.throughput else 0,
+            'completion': [],
+            'next_sprint': []
+        }
+
+        if any(history.throughput):
+            # Seeded by the inputs, so the same inputs always give the same forecast
+            rng = np.random.default_rng(zlib.crc32(repr(fingerprint).encode()))
+            throughput = np.asarray(history.throughput, dtype=float)
+
+            needed = simulate_sprints_needed(throughput, remaining, self.simulations, rng)
+            for level, sprints in zip(self.confidence_levels,
+                    np.percentile(needed, self.confidence_levels, method='higher')):
+                sprints = int(sprints) if sprints <= MAX_FORECAST_SPRINTS else None
+                forecast['completion'].append({
+                    'confidence': level,
+                    'sprints': sprints,
+                    'date': get_completion_date(anchor, sprints, history.sprint_days)
+                })
+
+            # Points a sprint completes with probability p are its (100 - p)th percentile
+            next_sprint = rng.choice(throughput, size=self.simulations)
+            for level, points in zip(self.confidence_levels,
+                    np.percentile(next_sprint, [100 - level for level in self.confidence_levels],
+                        method='lower')):
+                forecast['next_sprint'].append({'confidence': level, 'points': flt(points, 1)})
+
+        frappe.cache().set_value(self.cache_key, (fingerprint, forecast), expires_in_sec=FORECAST_TTL)
+        return forecast
+
+    def get_history(self):
+        """Completed points of the last completed sprints, and their median length in days"""
+        sprints = frappe.get_all('Agile Sprint',
+            filters={'project': self.project, 'sprint_state': 'Completed'},
+            fields=['completed_points', 'start_date', 'end_date', 'actual_start_date', 'actual_end_date'],
+            order_by='end_date desc',
+            limit=HISTORY_SPRINTS
+        )
+
+        lengths = sorted(
+            date_diff(s.actual_end_date or s.end_date, s.actual_start_date or s.start_date) + 1
+            for s in sprints if (s.actual_start_date or s.start_date) and (s.actual_end_date or s.end_date)
+        )
+        return frappe._dict(
+            throughput=[flt(s.completed_points) for s in sprints],
+            sprint_days=max(lengths[len(lengths) // 2], 1) if lengths else 14
+        )
+
+    def get_remaining_points(self):
+        """Story points of the open issues in scope"""
+        from erpnext_agile.agile_sprint_metrics import STORY_POINTS
+
+        if self.release:
+            return flt(frappe.db.sql(f"""
+                SELECT SUM({STORY_POINTS})
+                FROM `tabRelease Linked Task` rt
+                JOIN `tabTask` t ON t.name = rt.task
+                LEFT JOIN `tabAgile Issue Status` s ON s.name = t.issue_status
+                WHERE rt.parent = %(release)s AND rt.parenttype = 'Agile Release Version'
+                    AND t.status != 'Cancelled' AND IFNULL(s.status_category, '') != 'Done'
+            """, {'release': self.release})[0][0])
+
+        return flt(frappe.db.sql(f"""
+            SELECT SUM({STORY_POINTS})
+            FROM `tabTask` t
+            LEFT JOIN `tabAgile Issue Status` s ON s.name = t.issue_status
+            WHERE t.project = %(project)s AND t.is_agile = 1
+                AND t.status != 'Cancelled' AND IFNULL(s.status_category, '') != 'Done'
+        """, {'project': self.project})[0][0])
+
+    def get_anchor_date(self):
+        """First day of the first forecast sprint: the active sprint's start, or today"""
+        active = frappe.db.get_value('Agile Sprint',
+            {'project': self.project, 'sprint_state': 'Active'},
+            ['actual_start_date', 'start_date'], as_dict=True)
+        if active and (active.actual_start_date or active.start_date):
+            return getdate(active.actual_start_date or active.start_date)
+        return getdate(today())
+
+    @property
+    def cache_key(self):
+        return f"agile_forecast|{self.project}|{self.release or ''}"
+
+
+def simulate_sprints_needed(throughput, remaining, simulations, rng):
+    """
+    Sprints each simulation needs to complete `remaining` points, drawing
+    sprint throughputs from the sample. Simulations not done within
+    MAX_FORECAST_SPRINTS get MAX_FORECAST_SPRINTS + 1.
+    """
+    needed = np.full(simulations, MAX_FORECAST_SPRINTS + 1, dtype=np.int64)
+    if remaining <= 0:
+        needed[:] = 0
+        return needed
+
+    totals = np.zeros(simulations)
+    pending = np.arange(simulations)
+    block = int(min(SPRINT_BLOCK, max(1, np.ceil(remaining / throughput.mean()))))
+    offset = 0
+
+    while pending.size and offset < MAX_FORECAST_SPRINTS:
+        cumulative = totals[pending, None] + rng.choice(throughput, size=(pending.size, block)).cumsum(axis=1)
+        done = cumulative[:, -1] >= remaining
+        needed[pending[done]] = offset + (cumulative[done] >= remaining).argmax(axis=1) + 1
+
+        totals[pending] = cumulative[:, -1]
+        pending = pending[~done]
+        offset += block
+
+    return needed
+
+
+def get_completion_date(anchor, sprints, sprint_days):
+    """Last day of the `sprints`th sprint from the anchor; None if beyond the forecast horizon"""
+    if sprints is None:
+        return None
+    if not sprints:
+        return getdate(today())
+    return add_days(anchor, sprints * sprint_days - 1)
+
+
+def parse_confidence_levels(confidence_levels):
+    """Confidence levels as sorted percentages, each between 1 and 99"""
+    if not confidence_levels:
+        return DEFAULT_CONFIDENCE_LEVELS
+    if isinstance(confidence_levels, str):
+        confidence_levels = frappe.parse_json(confidence_levels)
+        if not isinstance(confidence_levels, list):
+            confidence_levels = [confidence_levels]
+
+    levels = tuple(sorted({cint(level) for level in confidence_levels}))
+    if not levels or not all(1 <= level <= 99 for level in levels):
+        frappe.throw(_("Confidence levels must be percentages between 1 and 99"))
+    return levels
+
+
+def clear_forecast_cache(project=None):
+    """Drop cached forecasts, e.g. after sprint history was corrected"""
+    frappe.cache().delete_keys(f"agile_forecast|{project}|" if project else "agile_forecast|")
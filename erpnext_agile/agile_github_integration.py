@@ -3,6 +3,7 @@ from frappe import _
 from frappe.model.document import Document
 import json
 import re
+from erpnext_agile.agile_metadata import find_issue_type, find_priority, get_done_statuses
 
 class AgileGitHubIntegration:
     """Bridge between Agile Issues and GitHub Integration"""
@@ -288,8 +289,8 @@ class AgileGitHubIntegration:
         # Update status based on GitHub state
         if repo_issue.state == 'closed' and task_doc.issue_status not in self.get_done_statuses():
             # Find a "Done" status to use
-            done_status = frappe.db.get_value('Agile Issue Status', 
-                {'status_category': 'Done'}, 'name', order_by='sort_order')
+            done_statuses = self.get_done_statuses()
+            done_status = done_statuses[0] if done_statuses else None
             if done_status:
                 task_doc.issue_status = done_status
                 task_doc.status = 'Completed'
@@ -316,28 +317,22 @@ class AgileGitHubIntegration:
             if label.startswith('type:'):
                 type_name = label[5:].replace('-', ' ').title()
                 # Try to find matching issue type
-                existing_type = frappe.db.get_value('Agile Issue Type', 
-                    {'issue_type_name': type_name}, 'name')
+                existing_type = find_issue_type(type_name)
                 if existing_type:
                     issue_type = existing_type
             
             elif label.startswith('priority:'):
                 priority_name = label[9:].replace('-', ' ').title()
                 # Try to find matching priority
-                existing_priority = frappe.db.get_value('Agile Issue Priority',
-                    {'priority_name': priority_name}, 'name')
+                existing_priority = find_priority(priority_name)
                 if existing_priority:
                     issue_priority = existing_priority
         
         return issue_type, issue_priority
     
     def get_done_statuses(self):
-        """Get all statuses in Done category"""
-        return [status.name for status in frappe.get_all(
-            'Agile Issue Status',
-            filters={'status_category': 'Done'},
-            fields=['name']
-        )]
+        """Get all statuses in Done category, in sort order"""
+        return get_done_statuses()
     
     @frappe.whitelist()
     def sync_commits_to_issue(self, task_name):
@@ -3,6 +3,9 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import today, add_days, get_datetime, now_datetime
 import json
+from erpnext_agile.agile_sequence import next_sequence_value
+from erpnext_agile.erpnext_agile.doctype.agile_notification.agile_notification import queue_notification
+from erpnext_agile.agile_metadata import get_statuses_in_category, is_done_status, is_in_progress_status
 
 class AgileIssueManager:
     """Core class for managing Agile Issues (Tasks with Agile functionality)"""
@@ -76,14 +79,8 @@ class AgileIssueManager:
         if not project_key:
             frappe.throw(_("Project key is required for agile projects"))
         
-        # Get the next issue number for this project
-        last_issue = frappe.db.sql("""
-            SELECT MAX(CAST(SUBSTRING(issue_key, LENGTH(%s) + 2) AS UNSIGNED)) as last_num
-            FROM `tabTask` 
-            WHERE project = %s AND issue_key LIKE %s AND is_agile = 1
-        """, (project_key, project_doc.name, f"{project_key}-%"), as_dict=True)
-        
-        next_num = (last_issue[0].get('last_num') or 0) + 1
+        # Row-locked per-key counter, seeded once from the existing keys
+        next_num = next_sequence_value(f"{project_key}-", 'Task', 'issue_key')
         frappe.msgprint(f"Generated issue key: {project_key}-{next_num}", alert=True, indicator="green")
         return f"{project_key}-{next_num}"
     
@@ -96,13 +93,8 @@ class AgileIssueManager:
         workflow_scheme = project_doc.get('workflow_scheme')
         if workflow_scheme:
             # Get the first "To Do" category status
-            default_status = frappe.db.get_value(
-                'Agile Issue Status', 
-                {'status_category': 'To Do'}, 
-                'name',
-                order_by='sort_order asc'
-            )
-            return default_status
+            to_do_statuses = get_statuses_in_category('To Do')
+            return to_do_statuses[0] if to_do_statuses else None
         return 'Open'  # Fallback to standard Task status
     
     @frappe.whitelist()
@@ -147,20 +139,22 @@ class AgileIssueManager:
     
     def validate_transition(self, project_doc, from_status, to_status):
         """Validate if transition is allowed based on workflow scheme"""
-        workflow_scheme = project_doc.get('workflow_scheme')
-        if not workflow_scheme:
+        from erpnext_agile.agile_workflow_graph import get_workflow
+        
+        workflow = get_workflow(project_doc.get('workflow_scheme'))
+        if not workflow:
             return True  # Allow all transitions if no workflow
         
-        scheme_doc = frappe.get_doc('Agile Workflow Scheme', workflow_scheme)
-        return scheme_doc.validate_transition(from_status, to_status)
+        is_valid, message = workflow.validate_transition(from_status, to_status)
+        return is_valid
     
     def is_done_status(self, status):
         """Check if status is in Done category"""
-        return frappe.db.get_value('Agile Issue Status', status, 'status_category') == 'Done'
+        return is_done_status(status)
     
     def is_in_progress_status(self, status):
         """Check if status is In Progress category"""
-        return frappe.db.get_value('Agile Issue Status', status, 'status_category') == 'In Progress'
+        return is_in_progress_status(status)
     
     @frappe.whitelist()
     def assign_issue(self, task_name, assignees, notify=True):
@@ -243,19 +237,14 @@ class AgileIssueManager:
     
     def log_issue_activity(self, task_doc, activity_type, data):
         """Log issue activity for audit trail"""
-        activity_doc = frappe.get_doc({
-            'doctype': 'Agile Issue Activity',
-            'issue': task_doc.name,
-            'activity_type': activity_type,
-            'user': frappe.session.user,
-            'timestamp': now_datetime(),
-            'data': json.dumps(data)
-        })
-        activity_doc.insert()
+        from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+            buffer_activity,
+        )
+        buffer_activity(task_doc.name, activity_type, data)
     
     def send_issue_notifications(self, task_doc, event_type, data=None):
-        """Send notifications for issue events"""
-        if not frappe.db.get_value('Project', task_doc.project, 'enable_email_notifications'):
+        """Queue notifications for issue events; they are sent as per-recipient digests"""
+        if not frappe.get_cached_value('Project', task_doc.project, 'enable_email_notifications'):
             return
         
         recipients = set()
@@ -272,37 +261,34 @@ class AgileIssueManager:
         for watcher_row in task_doc.get('watchers', []):
             recipients.add(watcher_row.user)
         
-        # Remove current user from notifications
-        recipients.discard(frappe.session.user)
-        
         if recipients:
-            self._send_email_notification(task_doc, event_type, list(recipients), data)
+            self._queue_email_notification(task_doc, event_type, recipients, data)
     
-    def _send_email_notification(self, task_doc, event_type, recipients, data):
-        """Send email notification"""
-        try:
-            subject_map = {
-                'created': f"[{task_doc.issue_key}] Issue Created: {task_doc.subject}",
-                'transitioned': f"[{task_doc.issue_key}] Status Changed: {task_doc.subject}",
-                'assigned': f"[{task_doc.issue_key}] Issue Assigned: {task_doc.subject}",
-                'commented': f"[{task_doc.issue_key}] New Comment: {task_doc.subject}"
-            }
-            
-            subject = subject_map.get(event_type, f"[{task_doc.issue_key}] Updated: {task_doc.subject}")
-            
-            frappe.sendmail(
-                recipients=recipients,
-                subject=subject,
-                template="agile_issue_notification",
-                args={
-                    'task': task_doc,
-                    'event_type': event_type,
-                    'data': data,
-                    'site_url': frappe.utils.get_url()
-                }
-            )
-        except Exception as e:
-            frappe.log_error(f"Failed to send notification: {str(e)}")
+    def _queue_email_notification(self, task_doc, event_type, recipients, data):
+        """Queue the email notification of an issue event"""
+        subject_map = {
+            'created': f"[{task_doc.issue_key}] Issue Created: {task_doc.subject}",
+            'transitioned': f"[{task_doc.issue_key}] Status Changed: {task_doc.subject}",
+            'assigned': f"[{task_doc.issue_key}] Issue Assigned: {task_doc.subject}",
+            'commented': f"[{task_doc.issue_key}] New Comment: {task_doc.subject}"
+        }
+        detail_map = {
+            'created': _("created"),
+            'transitioned': _("moved from {0} to {1}").format(
+                (data or {}).get('from_status'), (data or {}).get('to_status')),
+            'assigned': _("assigned"),
+            'commented': _("new comment")
+        }
+        
+        subject = subject_map.get(event_type, f"[{task_doc.issue_key}] Updated: {task_doc.subject}")
+        message = "<a href='{0}/app/task/{1}'>[{2}]</a> {3}: {4}".format(
+            frappe.utils.get_url(), task_doc.name, task_doc.issue_key,
+            frappe.utils.escape_html(task_doc.subject or ''),
+            detail_map.get(event_type, _("updated"))
+        )
+        
+        queue_notification(recipients, event_type, subject, message,
+            project=task_doc.project, reference_doctype='Task', reference_name=task_doc.name)
     
     def send_assignment_notifications(self, task_doc, assignees):
         """Send assignment notifications"""
@@ -0,0 +1,121 @@
+# erpnext_agile/agile_metadata.py
+"""
+Registry of Agile Issue Status, Priority and Type metadata.
+
+The three master tables are small and read on almost every request (done
+status lists, category checks, colours, sort orders). They are loaded in one
+go into a VersionedCache and invalidated from the doctypes' controllers, so
+lookups are dictionary reads.
+"""
+
+import frappe
+
+from erpnext_agile.agile_cache import VersionedCache
+
+REGISTRY_KEY = 'all'
+
+
+class AgileMetadata:
+    """In-memory view of statuses, priorities and types, each ordered for display"""
+
+    def __init__(self, data):
+        self.statuses = [frappe._dict(row) for row in data['statuses']]
+        self.priorities = [frappe._dict(row) for row in data['priorities']]
+        self.types = [frappe._dict(row) for row in data['types']]
+
+        self.status_map = {row.name: row for row in self.statuses}
+        self.priority_map = {row.name: row for row in self.priorities}
+        self.type_map = {row.name: row for row in self.types}
+
+        self.statuses_by_category = {}
+        for row in self.statuses:
+            self.statuses_by_category.setdefault(row.status_category, []).append(row.name)
+
+        self.priority_by_label = {row.priority_name: row.name for row in self.priorities}
+        self.type_by_label = {row.issue_type_name: row.name for row in self.types}
+
+
+def load_metadata(key):
+    return {
+        'statuses': [dict(row) for row in frappe.get_all('Agile Issue Status',
+            fields=['name', 'status_name', 'status_category', 'color', 'sort_order'],
+            order_by='sort_order asc, name asc'
+        )],
+        'priorities': [dict(row) for row in frappe.get_all('Agile Issue Priority',
+            fields=['name', 'priority_name', 'color', 'sort_order'],
+            order_by='sort_order asc, name asc'
+        )],
+        'types': [dict(row) for row in frappe.get_all('Agile Issue Type',
+            fields=['name', 'issue_type_name', 'icon', 'color'],
+            order_by='name asc'
+        )]
+    }
+
+
+metadata_cache = VersionedCache('issue_metadata', builder=load_metadata, compiler=AgileMetadata)
+
+
+def get_metadata():
+    return metadata_cache.get(REGISTRY_KEY)
+
+
+def get_status(status):
+    """Status row (name, status_name, status_category, color, sort_order) or None"""
+    return get_metadata().status_map.get(status)
+
+
+def get_status_category(status):
+    row = get_status(status)
+    return row.status_category if row else None
+
+
+def get_statuses_in_category(category):
+    """Status names of a category, in sort order"""
+    return list(get_metadata().statuses_by_category.get(category, []))
+
+
+def get_done_statuses():
+    return get_statuses_in_category('Done')
+
+
+def get_in_progress_statuses():
+    return get_statuses_in_category('In Progress')
+
+
+def is_done_status(status):
+    return get_status_category(status) == 'Done'
+
+
+def is_in_progress_status(status):
+    return get_status_category(status) == 'In Progress'
+
+
+def get_statuses():
+    """All status rows in sort order"""
+    return [frappe._dict(row) for row in get_metadata().statuses]
+
+
+def status_exists(status):
+    return status in get_metadata().status_map
+
+
+def priority_exists(priority):
+    return priority in get_metadata().priority_map
+
+
+def issue_type_exists(issue_type):
+    return issue_type in get_metadata().type_map
+
+
+def find_priority(priority_name):
+    """Priority matching a display name, or None"""
+    return get_metadata().priority_by_label.get(priority_name)
+
+
+def find_issue_type(issue_type_name):
+    """Issue type matching a display name, or None"""
+    return get_metadata().type_by_label.get(issue_type_name)
+
+
+def clear_metadata_cache():
+    metadata_cache.invalidate()
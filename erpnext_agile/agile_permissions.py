@@ -0,0 +1,164 @@
+# erpnext_agile/agile_permissions.py
+"""
+Request-scoped permission context for the agile `has_permission` hooks.
+
+A user's roles, project memberships and task assignments are loaded once
+per request (or background job) and reused by every document check, so a
+page of 500 rows costs a handful of queries instead of several per row.
+`filter_permitted` checks many documents of one doctype at once.
+
+Grants come from the materialized visibility tables (Agile Task Visibility,
+Agile Project Visibility); their hooks call `clear_permission_context` when
+they change.
+"""
+
+import frappe
+
+ADMIN_ROLE = 'Administrator'
+MANAGER_ROLE = 'Projects Manager'
+PROJECTS_USER_ROLE = 'Projects User'
+
+
+class PermissionContext:
+    """Roles, project memberships and assignments of one user"""
+
+    def __init__(self, user):
+        self.user = user
+        self.roles = set(frappe.get_roles(user))
+        self.is_admin = ADMIN_ROLE in self.roles
+        self.is_manager = MANAGER_ROLE in self.roles
+        self._projects = None
+        self._assigned_tasks = None
+        self._scheme_rules = {}
+        self._values = {}
+
+    @property
+    def projects(self):
+        """Projects the user is a Project User of"""
+        if self._projects is None:
+            self._projects = set(frappe.get_all('Agile Project Visibility',
+                filters={'user': self.user}, pluck='project'))
+        return self._projects
+
+    @property
+    def assigned_tasks(self):
+        """Tasks the user is assigned to"""
+        if self._assigned_tasks is None:
+            self._assigned_tasks = set(frappe.get_all('Agile Task Visibility',
+                filters={'user': self.user, 'is_assignee': 1}, pluck='task'))
+        return self._assigned_tasks
+
+    def in_project(self, project):
+        return bool(project) and project in self.projects
+
+    def get_values(self, doctype, name, fields):
+        """Memoised frappe.db.get_value(..., as_dict=True) for referenced documents"""
+        key = (doctype, name, tuple(fields))
+        if key not in self._values:
+            self._values[key] = frappe.db.get_value(doctype, name, fields, as_dict=True) or frappe._dict()
+        return self._values[key]
+
+    def has_scheme_permission(self, scheme, permission_type):
+        """Agile Permission Scheme check without loading the scheme document"""
+        if scheme not in self._scheme_rules:
+            self._scheme_rules[scheme] = frappe.get_all('Agile Permission Rule',
+                filters={'parent': scheme, 'parenttype': 'Agile Permission Scheme'},
+                fields=['permission_type', 'role'])
+
+        return any(rule.permission_type in (permission_type, 'All') and rule.role in self.roles
+            for rule in self._scheme_rules[scheme])
+
+
+def get_permission_context(user=None):
+    user = user or frappe.session.user
+    contexts = getattr(frappe.local, 'agile_permission_contexts', None)
+    if contexts is None:
+        contexts = frappe.local.agile_permission_contexts = {}
+    if user not in contexts:
+        contexts[user] = PermissionContext(user)
+    return contexts[user]
+
+
+def clear_permission_context():
+    frappe.local.agile_permission_contexts = None
+
+
+# Batch checks: doctype -> (fields to read, check(ctx, row, ptype))
+def _task_permitted(ctx, row, ptype):
+    if ctx.is_manager or PROJECTS_USER_ROLE in ctx.roles:
+        return True
+    if ptype == 'create':
+        return not row.project or ctx.in_project(row.project)
+    return row.name in ctx.assigned_tasks
+
+
+def _project_permitted(ctx, row, ptype):
+    return ctx.is_manager or row.owner == ctx.user or ctx.in_project(row.name)
+
+
+def _project_child_permitted(owner_field):
+    def check(ctx, row, ptype):
+        return ctx.is_manager or row[owner_field] == ctx.user or ctx.in_project(row.project)
+    return check
+
+
+BATCH_CHECKS = {
+    'Task': (['name', 'project'], _task_permitted),
+    'Project': (['name', 'owner'], _project_permitted),
+    'Agile Sprint': (['name', 'owner', 'project'], _project_child_permitted('owner')),
+    'Test Cycle': (['name', 'owner_user', 'project'], _project_child_permitted('owner_user')),
+    'Test Case': (['name', 'owner', 'project'], _project_child_permitted('owner')),
+}
+
+
+def filter_permitted(doctype, names, ptype='read', user=None):
+    """
+    The subset of `names` the user may access with `ptype`, in input order.
+
+    Checks the doctype-level role permission once, then resolves User
+    Permissions, DocShare and permission query conditions for all documents
+    with one frappe.get_list, and applies the same rules as the agile
+    `has_permission` hooks to every document from one query. Doctypes without
+    an agile hook fall back to frappe.has_permission per document.
+    """
+    names = [name for name in dict.fromkeys(names or []) if name]
+    if not names:
+        return []
+
+    ctx = get_permission_context(user)
+    if ctx.is_admin:
+        existing = set(frappe.get_all(doctype, filters={'name': ['in', names]}, pluck='name'))
+        return [name for name in names if name in existing]
+
+    if doctype not in BATCH_CHECKS:
+        return [name for name in names if frappe.has_permission(doctype, ptype, name, user=ctx.user)]
+
+    role_permitted = frappe.has_permission(doctype, ptype, user=ctx.user)
+    shared = get_shared_names(doctype, names, ptype, ctx.user)
+    if not role_permitted and not shared:
+        return []
+
+    # Documents passing User Permissions and query conditions, plus read shares
+    candidates = set(shared)
+    if role_permitted:
+        candidates.update(frappe.get_list(doctype, filters={'name': ['in', names]}, pluck='name',
+            limit_page_length=0, user=ctx.user))
+    if not candidates:
+        return []
+
+    fields, check = BATCH_CHECKS[doctype]
+    rows = {row.name: row for row in frappe.get_all(doctype,
+        filters={'name': ['in', list(candidates)]}, fields=fields)}
+    return [name for name in names if name in rows and check(ctx, rows[name], ptype)]
+
+
+def get_shared_names(doctype, names, ptype, user):
+    """Names among `names` shared with the user (or everyone) with the `ptype` right"""
+    if ptype not in ('read', 'write', 'share', 'submit'):
+        return set()
+
+    return set(frappe.db.sql(f"""
+        SELECT share_name FROM `tabDocShare`
+        WHERE share_doctype = %(doctype)s AND share_name IN %(names)s
+            AND (user = %(user)s OR everyone = 1) AND `{ptype}` = 1
+    """, {'doctype': doctype, 'names': tuple(names), 'user': user}, pluck=True))
@@ -0,0 +1,150 @@
+# erpnext_agile/agile_save_profiler.py
+"""
+Opt-in profiler for the Task save path.
+
+Hooks decorated with `profiled(label)` record wall time and the number of
+SQL statements they issue. Totals are aggregated in a Redis hash and shown
+by the "Agile Task Save Profile" report. Profiling is enabled with the
+`agile_profile_task_saves` site config key; the `agile-profile-task-saves`
+bench command enables it for one run and prints the breakdown.
+
+Blocks nest (Task.save contains every hook), so a label's time includes
+the labels it calls.
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+
+import frappe
+
+PROFILE_KEY = 'agile_task_save_profile'
+
+
+def is_enabled():
+    return bool(frappe.flags.agile_profile_saves or frappe.conf.get('agile_profile_task_saves'))
+
+
+def profiled(label):
+    """Decorator recording a hook's time and query count when profiling is on"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return function(*args, **kwargs)
+            with profile_block(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profile_block(label):
+    """Record one block; a no-op unless profiling is on"""
+    if not is_enabled():
+        yield
+        return
+
+    install_query_counter()
+    queries_before = frappe.local.agile_query_count
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(label, time.perf_counter() - start, frappe.local.agile_query_count - queries_before)
+
+
+def install_query_counter():
+    """Count frappe.db.sql calls on this request's connection"""
+    db = frappe.db
+    if getattr(db, 'agile_counting_queries', False):
+        return
+
+    if not hasattr(frappe.local, 'agile_query_count'):
+        frappe.local.agile_query_count = 0
+
+    sql = db.sql
+
+    def counting_sql(*args, **kwargs):
+        frappe.local.agile_query_count += 1
+        return sql(*args, **kwargs)
+
+    db.sql = counting_sql
+    db.agile_counting_queries = True
+
+
+def record(label, seconds, queries):
+    collector = getattr(frappe.local, 'agile_profile_collector', None)
+    if collector is not None:
+        # Benchmark run: keep results local instead of mixing them into the totals
+        entry = collector.setdefault(label, {'calls': 0, 'time_ms': 0.0, 'queries': 0})
+        entry['calls'] += 1
+        entry['time_ms'] += seconds * 1000
+        entry['queries'] += queries
+        return
+
+    cache = frappe.cache()
+    key = cache.make_key(PROFILE_KEY)
+    pipeline = cache.pipeline()
+    pipeline.hincrby(key, f"{label}|calls", 1)
+    pipeline.hincrbyfloat(key, f"{label}|time_ms", seconds * 1000)
+    pipeline.hincrby(key, f"{label}|queries", queries)
+    pipeline.execute()
+
+
+def get_profile():
+    """Aggregated totals: {label: {'calls', 'time_ms', 'queries'}}"""
+    cache = frappe.cache()
+    # Raw HGETALL: the counters are plain numbers under a key already prefixed
+    # by make_key, which RedisWrapper.hgetall would prefix again and unpickle
+    pipeline = cache.pipeline()
+    pipeline.hgetall(cache.make_key(PROFILE_KEY))
+    profile = {}
+    for field, value in (pipeline.execute()[0] or {}).items():
+        label, metric = frappe.safe_decode(field).rsplit('|', 1)
+        profile.setdefault(label, {'calls': 0, 'time_ms': 0.0, 'queries': 0})[metric] = float(frappe.safe_decode(value))
+    return profile
+
+
+def reset_profile():
+    cache = frappe.cache()
+    cache.delete(cache.make_key(PROFILE_KEY))
+
+
+def summarize(profile):
+    """Rows sorted by total time, with per-call averages"""
+    rows = []
+    for label, entry in profile.items():
+        calls = int(entry['calls']) or 1
+        rows.append(frappe._dict(
+            hook=label,
+            calls=int(entry['calls']),
+            total_ms=round(entry['time_ms'], 2),
+            avg_ms=round(entry['time_ms'] / calls, 2),
+            queries=int(entry['queries']),
+            avg_queries=round(entry['queries'] / calls, 2)
+        ))
+    return sorted(rows, key=lambda row: row.total_ms, reverse=True)
+
+
+def run_benchmark(count=20, project=None):
+    """Save `count` recently modified agile tasks with profiling on, then roll back"""
+    filters = {'is_agile': 1}
+    if project:
+        filters['project'] = project
+
+    task_names = frappe.get_all('Task', filters=filters, pluck='name',
+        order_by='modified desc', limit_page_length=count)
+
+    frappe.flags.agile_profile_saves = True
+    frappe.local.agile_profile_collector = {}
+    try:
+        for task_name in task_names:
+            doc = frappe.get_doc('Task', task_name)
+            doc.flags.ignore_permissions = True
+            doc.save()
+        return summarize(frappe.local.agile_profile_collector)
+    finally:
+        frappe.db.rollback()
+        frappe.flags.agile_profile_saves = False
+        frappe.local.agile_profile_collector = None
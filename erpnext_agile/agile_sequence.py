@@ -0,0 +1,71 @@
+# erpnext_agile/agile_sequence.py
+"""
+Sequence allocator for issue keys and test IDs.
+
+Counters live in Frappe's `tabSeries` table, one row per field and prefix
+under an "agile:" key (e.g. "agile:issue_key:PROJ-"), so they never share a
+row with naming series such as ERPNext's "PROJ-.####". A number is taken by
+locking the row and incrementing it in the inserting transaction, so
+concurrent inserts serialise on that row instead of racing on MAX(), and a
+rolled back insert gives its number back.
+A missing row is seeded once from the highest number already in use.
+"""
+
+import frappe
+from frappe.utils import cint
+
+
+def next_sequence_value(prefix, doctype, fieldname):
+    """Next number for prefix; doctype.fieldname holds existing values for seeding"""
+    return allocate_sequence(prefix, 1, doctype, fieldname)
+
+
+def allocate_sequence(prefix, count, doctype, fieldname):
+    """Reserve `count` consecutive numbers for prefix, returning the first one"""
+    key = get_series_key(prefix, fieldname)
+    current = lock_series(key)
+    if current is None:
+        frappe.db.sql("""
+            INSERT IGNORE INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)
+        """, (key, get_max_suffix(prefix, doctype, fieldname)))
+        current = lock_series(key)
+
+    frappe.db.sql("""
+        UPDATE `tabSeries` SET `current` = `current` + %s WHERE `name` = %s
+    """, (cint(count), key))
+    return current + 1
+
+
+def reserve_sequence_value(prefix, value, fieldname):
+    """Move the counter past a number assigned from outside (imports, syncs)"""
+    frappe.db.sql("""
+        UPDATE `tabSeries` SET `current` = GREATEST(`current`, %s) WHERE `name` = %s
+    """, (cint(value), get_series_key(prefix, fieldname)))
+
+
+def get_series_key(prefix, fieldname):
+    """tabSeries row of a counter, namespaced apart from naming series"""
+    return f"agile:{fieldname}:{prefix}"
+
+
+def lock_series(key):
+    row = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", key)
+    return cint(row[0][0]) if row else None
+
+
+def get_max_suffix(prefix, doctype, fieldname):
+    """Highest number used after prefix in doctype.fieldname (one-off seed scan)"""
+    result = frappe.db.sql(f"""
+        SELECT MAX(CAST(SUBSTRING(`{fieldname}`, %(start)s) AS UNSIGNED))
+        FROM `tab{doctype}`
+        WHERE `{fieldname}` LIKE %(pattern)s
+    """, {'start': len(prefix) + 1, 'pattern': f"{prefix}%"})
+    return cint(result[0][0]) if result else 0
+
+
+def parse_sequence_value(value, prefix):
+    """Number of an ID like PROJ-42 for prefix PROJ-, or None"""
+    if not value or not value.startswith(prefix):
+        return None
+    suffix = value[len(prefix):]
+    return cint(suffix) if suffix.isdigit() else None
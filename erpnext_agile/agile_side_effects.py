@@ -0,0 +1,103 @@
+# erpnext_agile/agile_side_effects.py
+"""
+Post-commit pipeline for derived Task data.
+
+Save hooks only record which side effects a task needs (`schedule`). After
+the transaction commits, the effects are added to a per-task Redis set and
+one background job per task is enqueued; further saves of the task while
+that job is pending only add to the set, so a burst of saves runs each
+effect once. The job reloads the task and runs the effects against its
+latest state, so every effect must be idempotent.
+"""
+
+import frappe
+
+# Effect name -> function taking the reloaded Task; run in this order
+EFFECTS = {
+    'dependent_task_details': 'erpnext_agile.agile_doctype_controllers.sync_dependent_task_details',
+    'test_case_links': 'erpnext_agile.agile_doctype_controllers.sync_test_case_links',
+    'project_user_time': 'erpnext_agile.project_time_tracking.update_task_project_user_time',
+    'test_coverage': 'erpnext_agile.test_management.events.check_test_coverage',
+}
+
+# Seconds a pending job marker lives; bounds the delay if a worker dies before clearing it
+DEDUPE_WINDOW = 600
+
+
+def schedule(doc, effect):
+    """Record that `effect` must run for this task once the transaction commits"""
+    if effect not in EFFECTS:
+        raise ValueError(f"Unknown side effect: {effect}")
+
+    if frappe.flags.in_test:
+        # Tests roll back instead of committing; run inline so they see the result
+        frappe.get_attr(EFFECTS[effect])(doc)
+        return
+
+    pending = getattr(frappe.local, 'agile_side_effects', None)
+    if pending is None:
+        pending = frappe.local.agile_side_effects = {}
+        frappe.db.after_commit.add(dispatch)
+        frappe.db.after_rollback.add(discard)
+
+    pending.setdefault(doc.name, set()).add(effect)
+
+
+def dispatch():
+    pending = getattr(frappe.local, 'agile_side_effects', None)
+    frappe.local.agile_side_effects = None
+    if not pending:
+        return
+
+    cache = frappe.cache()
+    for task, effects in pending.items():
+        # Raw pipeline: the keys are already prefixed by make_key
+        pipeline = cache.pipeline()
+        pipeline.sadd(get_effects_key(task), *effects)
+        # Only the first save since the last job started enqueues a new one
+        pipeline.set(get_job_key(task), 1, nx=True, ex=DEDUPE_WINDOW)
+        if pipeline.execute()[1]:
+            frappe.enqueue(
+                'erpnext_agile.agile_side_effects.run_task_side_effects',
+                queue='short',
+                task=task
+            )
+
+
+def discard():
+    frappe.local.agile_side_effects = None
+
+
+def run_task_side_effects(task):
+    """Background job: run the effects recorded for a task since its last job"""
+    cache = frappe.cache()
+    # Clear the marker before taking the effects: a save recorded after this
+    # point enqueues its own job instead of being lost
+    cache.delete(get_job_key(task))
+
+    pipeline = cache.pipeline()
+    pipeline.smembers(get_effects_key(task))
+    pipeline.delete(get_effects_key(task))
+    effects = {frappe.safe_decode(effect) for effect in pipeline.execute()[0]}
+
+    if not effects or not frappe.db.exists('Task', task):
+        return
+
+    doc = frappe.get_doc('Task', task)
+    for effect, method in EFFECTS.items():
+        if effect not in effects:
+            continue
+        try:
+            frappe.get_attr(method)(doc)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(title=f"Task side effect {effect} failed for {task}")
+
+
+def get_effects_key(task):
+    return frappe.cache().make_key(f"agile_task_side_effects|{task}")
+
+
+def get_job_key(task):
+    return frappe.cache().make_key(f"agile_task_side_effects_job|{task}")
@@ -3,6 +3,12 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import today, add_days, get_datetime, now_datetime, date_diff, flt
 import json
+from erpnext_agile.agile_burndown import get_sprint_burndown_series
+from erpnext_agile.agile_metadata import get_done_statuses, get_in_progress_statuses
+from erpnext_agile.agile_sprint_metrics import calculate_sprint_totals
+from erpnext_agile.agile_sprint_membership import AgileSprintMembership
+from erpnext_agile.agile_sprint_report import freeze_sprint_report, get_sprint_report
+from erpnext_agile.erpnext_agile.doctype.agile_notification.agile_notification import queue_notification
 
 class AgileSprintManager:
     """Core class for managing Agile Sprints with Jira-like functionality"""
@@ -110,20 +116,20 @@ class AgileSprintManager:
         # Calculate final metrics
         self.calculate_sprint_metrics(sprint_doc)
         
-        # Handle incomplete issues
+        # Handle incomplete issues: move them to the backlog in one statement.
+        # The final metrics above are saved with the sprint, so no refresh here.
         incomplete_issues = self.get_incomplete_sprint_issues(sprint_name)
-        moved_count = 0
-        
-        for issue in incomplete_issues:
-            # Move to backlog (remove from sprint)
-            frappe.db.set_value('Task', issue.name, 'current_sprint', '')
-            moved_count += 1
+        moved_count = len(AgileSprintMembership(ignore_permissions=True).apply(
+            incomplete_issues, None, refresh=False))
         
         sprint_doc.save()
         
         # Create final burndown entry
         self.update_burndown_entry(sprint_doc, is_final=True)
         
+        # The report of a completed sprint no longer changes
+        freeze_sprint_report(sprint_name)
+        
         # Send notifications
         self.send_sprint_notifications(sprint_doc, 'completed', {
             'incomplete_issues': moved_count
@@ -144,32 +150,19 @@ class AgileSprintManager:
                 'is_agile': 1,
                 'issue_status': ['not in', self.get_done_statuses()]
             },
-            fields=['name', 'subject', 'issue_key']
+            fields=['name', 'subject', 'issue_key', 'project', 'current_sprint', 'issue_status', 'status',
+                'is_agile', 'story_points']
         )
     
     def get_done_statuses(self):
         """Get all statuses in Done category"""
-        return [status.name for status in frappe.get_all(
-            'Agile Issue Status',
-            filters={'status_category': 'Done'},
-            fields=['name']
-        )]
+        return get_done_statuses()
     
     def calculate_sprint_metrics(self, sprint_doc):
         """Calculate sprint metrics (points, velocity, progress)"""
-        sprint_issues = frappe.get_all('Task',
-            filters={'current_sprint': sprint_doc.name, 'is_agile': 1},
-            fields=['story_points', 'issue_status']
-        )
-        
-        total_points = sum(int(issue.get('story_points', 0)) for issue in sprint_issues)
-        
-        done_statuses = self.get_done_statuses()
-        completed_points = sum(
-            float(issue.get('story_points', 0)) 
-            for issue in sprint_issues 
-            if issue.get('issue_status') in done_statuses
-        )
+        # Same aggregate the delta reconciliation uses, so both agree on the totals
+        total_points, completed_points = calculate_sprint_totals([sprint_doc.name]).get(
+            sprint_doc.name, (0, 0))
         
         progress_percentage = (completed_points / total_points * 100) if total_points > 0 else 0
         
@@ -195,121 +188,39 @@ class AgileSprintManager:
     @frappe.whitelist()
     def add_issues_to_sprint(self, sprint_name, issue_keys):
         """Add issues to sprint (sprint planning)"""
-        sprint_doc = frappe.get_doc('Agile Sprint', sprint_name)
-        
-        if sprint_doc.sprint_state not in ['Future', 'Active']:
-            frappe.throw(_("Can only add issues to future or active sprints"))
-        
-        added_count = 0
-        
-        for issue_key in issue_keys:
-            # Find task by issue key
-            task = frappe.db.get_value('Task', 
-                {'issue_key': issue_key, 'is_agile': 1}, 
-                ['name', 'current_sprint'])
-            
-            if task:
-                task_name = task[0]
-                current_sprint = task[1]
-                
-                if current_sprint and current_sprint != sprint_name:
-                    frappe.throw(_(
-                        "Issue {0} is already in sprint {1}"
-                    ).format(issue_key, current_sprint))
-                
-                if not current_sprint:
-                    frappe.db.set_value('Task', task_name, 'current_sprint', sprint_name)
-                    added_count += 1
-        
-        # Recalculate sprint metrics
-        self.calculate_sprint_metrics(sprint_doc)
-        sprint_doc.save()
-        
-        return {'added': added_count}
+        added = AgileSprintMembership().add(sprint_name, issue_keys=issue_keys)
+        return {'added': len(added)}
     
     @frappe.whitelist()
     def remove_issues_from_sprint(self, sprint_name, issue_keys):
         """Remove issues from sprint"""
-        sprint_doc = frappe.get_doc('Agile Sprint', sprint_name)
-        
-        if sprint_doc.sprint_state == 'Completed':
-            frappe.throw(_("Cannot modify completed sprints"))
-        
-        removed_count = 0
-        
-        for issue_key in issue_keys:
-            task_name = frappe.db.get_value('Task', 
-                {'issue_key': issue_key, 'current_sprint': sprint_name}, 
-                'name')
-            
-            if task_name:
-                frappe.db.set_value('Task', task_name, 'current_sprint', '')
-                removed_count += 1
-        
-        # Recalculate sprint metrics
-        self.calculate_sprint_metrics(sprint_doc)
-        sprint_doc.save()
-        
-        return {'removed': removed_count}
+        removed = AgileSprintMembership().remove(sprint_name, issue_keys=issue_keys)
+        return {'removed': len(removed)}
     
     def create_burndown_entry(self, sprint_doc, is_final=False):
         """Create burndown chart entry"""
-        if not frappe.db.get_value('Project', sprint_doc.project, 'burndown_enabled'):
-            return
-        
-        metrics = self.calculate_sprint_metrics(sprint_doc)
-        
-        # Calculate remaining work
-        remaining_points = metrics['total_points'] - metrics['completed_points']
+        self.update_burndown_entry(sprint_doc, is_final)
         
-        # Calculate ideal burndown
-        if sprint_doc.sprint_state == 'Active':
-            total_days = date_diff(sprint_doc.end_date, sprint_doc.start_date) or 1
-            days_passed = date_diff(today(), sprint_doc.actual_start_date or sprint_doc.start_date)
-            days_remaining = total_days - days_passed
-            ideal_remaining = (days_remaining / total_days) * metrics['total_points'] if total_days > 0 else 0
-        else:
-            ideal_remaining = 0 if is_final else metrics['total_points']
-        
-        burndown_doc = frappe.get_doc({
-            'doctype': 'Agile Sprint Burndown',
-            'sprint': sprint_doc.name,
-            'date': today(),
-            'remaining_points': remaining_points,
-            'ideal_remaining': max(0, ideal_remaining),
-            'completed_points': metrics['completed_points'],
-            'added_points': 0  # Track scope changes
-        })
-        
-        burndown_doc.insert()
-        
-    def update_burndown_entry(self, sprint_doc, is_final=False):
-        """Update today's burndown chart entry or create if missing"""
+    def update_burndown_entry(self, sprint_doc, is_final=False, date=None):
+        """Snapshot a day's burndown (default today), derived from the sprint event log, into Agile Sprint Burndown"""
+        date = date or today()
         if not frappe.db.get_value('Project', sprint_doc.project, 'burndown_enabled'):
             return
 
-        # Recalculate metrics
-        metrics = self.calculate_sprint_metrics(sprint_doc)
-        current_total_points = metrics['total_points']
-
-        # Compute remaining, ideal, AND scope changes
-        remaining_points = current_total_points - metrics['completed_points']
-        added_points, removed_points = self.get_scope_changes(sprint_doc.name, current_total_points)
-
-        if sprint_doc.sprint_state == 'Active':
-            total_days = date_diff(sprint_doc.end_date, sprint_doc.start_date) or 1
-            days_passed = date_diff(today(), sprint_doc.actual_start_date or sprint_doc.start_date)
-            days_remaining = total_days - days_passed
-            ideal_remaining = (days_remaining / total_days) * current_total_points if total_days > 0 else 0
-        else:
-            ideal_remaining = 0 if is_final else current_total_points
+        series = get_sprint_burndown_series(sprint_doc.name, date, date)
+        if not series:
+            return
+        values = {field: series[0][field] for field in
+            ('remaining_points', 'ideal_remaining', 'completed_points', 'added_points', 'removed_points')}
+        if is_final:
+            values['ideal_remaining'] = 0
 
-        # Check if today's burndown entry already exists
+        # Check if the day's burndown entry already exists
         existing_entry = frappe.db.get_value(
             'Agile Sprint Burndown',
             {
                 'sprint': sprint_doc.name,
-                'date': today()
+                'date': date
             },
             'name' 
         )
@@ -317,41 +228,33 @@ class AgileSprintManager:
         if existing_entry:
             # Update existing entry
             burndown_doc = frappe.get_doc('Agile Sprint Burndown', existing_entry)
-            burndown_doc.remaining_points = remaining_points
-            burndown_doc.ideal_remaining = max(0, ideal_remaining)
-            burndown_doc.completed_points = metrics['completed_points']
-            burndown_doc.added_points = added_points
-            burndown_doc.removed_points = removed_points # Make sure this field exists in your DocType!
+            if all(flt(burndown_doc.get(field), 2) == flt(value, 2) for field, value in values.items()):
+                return
+            burndown_doc.update(values)
             burndown_doc.save(ignore_permissions=True) # Good practice for background metric updates
-            frappe.logger().info(f"Updated burndown entry for sprint {sprint_doc.name} on {today()}")
+            frappe.logger().info(f"Updated burndown entry for sprint {sprint_doc.name} on {date}")
         else:
             # Create a new one if missing
             burndown_doc = frappe.get_doc({
                 'doctype': 'Agile Sprint Burndown',
                 'sprint': sprint_doc.name,
-                'date': today(),
-                'remaining_points': remaining_points,
-                'ideal_remaining': max(0, ideal_remaining),
-                'completed_points': metrics['completed_points'],
-                'added_points': added_points,
-                'removed_points': removed_points
+                'date': date,
+                **values
             })
             burndown_doc.insert(ignore_permissions=True)
-            frappe.logger().info(f"Created new burndown entry for sprint {sprint_doc.name} on {today()}")
+            frappe.logger().info(f"Created new burndown entry for sprint {sprint_doc.name} on {date}")
         
     @frappe.whitelist()
     def get_sprint_burndown(self, sprint_name):
-        """Get burndown data for charts"""
-        burndown_data = frappe.get_all('Agile Sprint Burndown',
-            filters={'sprint': sprint_name},
-            fields=['date', 'remaining_points', 'ideal_remaining', 'completed_points'],
-            order_by='date'
-        )
-        
-        return burndown_data
+        """Get burndown data for charts, derived from the sprint event log"""
+        return get_sprint_burndown_series(sprint_name)
     
     @frappe.whitelist()
     def get_sprint_report(self, sprint_name):
+        """Comprehensive sprint report, served from its snapshot while the sprint is unchanged"""
+        return get_sprint_report(sprint_name)
+    
+    def build_sprint_report(self, sprint_name):
         """Generate comprehensive sprint report"""
         sprint_doc = frappe.get_doc('Agile Sprint', sprint_name)
         
@@ -376,11 +279,7 @@ class AgileSprintManager:
         }
         
         done_statuses = self.get_done_statuses()
-        in_progress_statuses = [status.name for status in frappe.get_all(
-            'Agile Issue Status',
-            filters={'status_category': 'In Progress'},
-            fields=['name']
-        )]
+        in_progress_statuses = get_in_progress_statuses()
         
         for issue in issues:
             status = issue.get('issue_status')
@@ -406,9 +305,10 @@ class AgileSprintManager:
         # Calculate team velocity
         team_velocity = self.calculate_team_velocity(sprint_doc.project)
         
+        metrics = self.calculate_sprint_metrics(sprint_doc)
         report = {
-            'sprint': sprint_doc,
-            'metrics': self.calculate_sprint_metrics(sprint_doc),
+            'sprint': sprint_doc.as_dict(),
+            'metrics': metrics,
             'issues': issues,
             'issue_stats': issue_stats,
             'burndown_data': burndown_data,
@@ -451,8 +351,8 @@ class AgileSprintManager:
         }
     
     def send_sprint_notifications(self, sprint_doc, event_type, data=None):
-        """Send sprint notifications to team members"""
-        if not frappe.db.get_value('Project', sprint_doc.project, 'enable_email_notifications'):
+        """Queue sprint notifications for team members; they are sent as digests"""
+        if not frappe.get_cached_value('Project', sprint_doc.project, 'enable_email_notifications'):
             return
         
         # Get project team members
@@ -463,63 +363,24 @@ class AgileSprintManager:
         )
         
         if team_members:
-            self._send_sprint_email_notification(sprint_doc, event_type, team_members, data)
+            self._queue_sprint_email_notification(sprint_doc, event_type, team_members, data)
     
-    def _send_sprint_email_notification(self, sprint_doc, event_type, recipients, data):
-        """Send sprint email notification"""
-        try:
-            subject_map = {
-                'started': f"Sprint Started: {sprint_doc.sprint_name}",
-                'completed': f"Sprint Completed: {sprint_doc.sprint_name}",
-                'updated': f"Sprint Updated: {sprint_doc.sprint_name}"
-            }
-            
-            subject = subject_map.get(event_type, f"Sprint Notification: {sprint_doc.sprint_name}")
-            
-            frappe.sendmail(
-                recipients=recipients,
-                subject=subject,
-                template="agile_sprint_notification",
-                args={
-                    'sprint': sprint_doc,
-                    'event_type': event_type,
-                    'data': data,
-                    'site_url': frappe.utils.get_url()
-                }
-            )
-        except Exception as e:
-            frappe.log_error(f"Failed to send sprint notification: {str(e)}")
+    def _queue_sprint_email_notification(self, sprint_doc, event_type, recipients, data):
+        """Queue the email notification of a sprint event"""
+        subject_map = {
+            'started': f"Sprint Started: {sprint_doc.sprint_name}",
+            'completed': f"Sprint Completed: {sprint_doc.sprint_name}",
+            'updated': f"Sprint Updated: {sprint_doc.sprint_name}"
+        }
+        
+        subject = subject_map.get(event_type, f"Sprint Notification: {sprint_doc.sprint_name}")
+        message = "<a href='{0}/app/agile-sprint/{1}'>{2}</a>".format(
+            frappe.utils.get_url(), sprint_doc.name, frappe.utils.escape_html(subject))
+        
+        queue_notification(recipients, event_type, subject, message,
+            project=sprint_doc.project, reference_doctype='Agile Sprint', reference_name=sprint_doc.name,
+            notify_self=True)
     
     def is_agile_project(self, project_name):
         """Check if project is agile-enabled"""
         return frappe.db.get_value('Project', project_name, 'enable_agile') == 1
-    
-    def get_scope_changes(self, sprint_name, current_total_points):
-        """
-        Compare current total points with the last recorded burndown entry (before today)
-        to calculate added and removed points.
-        """
-        # Fetch the most recent burndown entry strictly BEFORE today
-        last_entry = frappe.db.get_all(
-            'Agile Sprint Burndown',
-            filters={
-                'sprint': sprint_name,
-                'date': ['<', today()]
-            },
-            fields=['remaining_points', 'completed_points'],
-            order_by='date desc',
-            limit=1
-        )
-
-        if not last_entry:
-            # First day of the sprint. The baseline is set, so technically 0 "added" scope creep.
-            return 0, 0
-
-        # Total points yesterday = remaining + completed
-        previous_total_points = last_entry[0].remaining_points + last_entry[0].completed_points
-        scope_diff = current_total_points - previous_total_points
-
-        added_points = scope_diff if scope_diff > 0 else 0
-        removed_points = abs(scope_diff) if scope_diff < 0 else 0
-
-        return added_points, removed_points
\ No newline at end of file
@@ -0,0 +1,218 @@
+# erpnext_agile/agile_sprint_membership.py
+"""
+Set-based sprint membership changes.
+
+Issue keys are resolved in one query, `current_sprint` is updated with one
+statement per source sprint, the sprint_added/sprint_removed activity rows
+and board changes are written in one insert each, and the totals and
+burndown of every affected sprint are recomputed once at the end. Task
+hooks are bypassed, so everything the save path derives from a sprint
+change is written here.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+
+from erpnext_agile.erpnext_agile.doctype.agile_board_change.agile_board_change import (
+    record_board_changes,
+)
+from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+    ACTIVITY_FIELDS,
+)
+from erpnext_agile.erpnext_agile.doctype.agile_sprint_event.agile_sprint_event import (
+    get_contribution_events,
+    record_sprint_events,
+)
+from erpnext_agile.agile_permissions import filter_permitted
+from erpnext_agile.agile_sprint_metrics import get_task_contribution, recalculate_sprint_metrics
+from erpnext_agile.agile_sprint_report import bump_sprint_versions
+
+TASK_FIELDS = ['name', 'issue_key', 'project', 'current_sprint', 'issue_status', 'status', 'is_agile',
+    'story_points']
+
+
+class AgileSprintMembership:
+    """Move many agile issues into, out of or between sprints in a handful of statements"""
+
+    def __init__(self, ignore_permissions=False):
+        self.ignore_permissions = ignore_permissions
+        self.user = frappe.session.user
+        self.now = now_datetime()
+
+    def add(self, sprint, issue_keys=None, task_names=None, allow_move=False):
+        """
+        Add issues to a Future or Active sprint.
+
+        Issues already in another sprint raise an error unless `allow_move`
+        is set, in which case they are moved. Returns the tasks that changed.
+        """
+        sprint_state = frappe.db.get_value('Agile Sprint', sprint, 'sprint_state')
+        if not sprint_state:
+            frappe.throw(_("Sprint {0} does not exist").format(sprint))
+        if sprint_state not in ('Future', 'Active'):
+            frappe.throw(_("Can only add issues to future or active sprints"))
+
+        tasks = self.load_tasks(issue_keys, task_names)
+        if not allow_move:
+            for task in tasks:
+                if task.current_sprint and task.current_sprint != sprint:
+                    frappe.throw(_(
+                        "Issue {0} is already in sprint {1}"
+                    ).format(task.issue_key or task.name, task.current_sprint))
+
+        return self.apply([task for task in tasks if task.current_sprint != sprint], sprint)
+
+    def remove(self, sprint, issue_keys=None, task_names=None):
+        """Move the given issues of a sprint back to the backlog; returns the tasks that changed"""
+        if frappe.db.get_value('Agile Sprint', sprint, 'sprint_state') == 'Completed':
+            frappe.throw(_("Cannot modify completed sprints"))
+
+        tasks = self.load_tasks(issue_keys, task_names)
+        return self.apply([task for task in tasks if task.current_sprint == sprint], None)
+
+    def load_tasks(self, issue_keys=None, task_names=None):
+        """Resolve issue keys or task names to agile tasks in one query"""
+        if issue_keys:
+            filters = {'issue_key': ['in', list(issue_keys)]}
+        elif task_names:
+            filters = {'name': ['in', list(task_names)]}
+        else:
+            return []
+
+        filters['is_agile'] = 1
+        tasks = frappe.get_all('Task', filters=filters, fields=TASK_FIELDS)
+        if self.ignore_permissions:
+            return tasks
+
+        frappe.has_permission('Task', 'write', throw=True)
+        writable = set(filter_permitted('Task', [task.name for task in tasks], 'write'))
+        return [task for task in tasks if task.name in writable]
+
+    def apply(self, tasks, to_sprint, refresh=True):
+        """
+        Set `current_sprint` of the tasks (rows with TASK_FIELDS) to `to_sprint`,
+        or the backlog when it is empty, and record the change.
+
+        With `refresh`, the totals and burndown of the affected sprints are
+        recomputed; callers that write final sprint metrics themselves skip it.
+        """
+        to_sprint = to_sprint or None
+        tasks = [task for task in tasks if (task.current_sprint or None) != to_sprint]
+        if not tasks:
+            return []
+
+        by_from_sprint = {}
+        for task in tasks:
+            by_from_sprint.setdefault(task.current_sprint or '', []).append(task.name)
+
+        # The source sprint guards against concurrent moves of the same issues. The
+        # rows still in it are locked first, so only tasks moved here are recorded.
+        moved = set()
+        for from_sprint, names in by_from_sprint.items():
+            names = frappe.db.sql_list("""
+                SELECT name FROM `tabTask`
+                WHERE name IN %(names)s AND IFNULL(current_sprint, '') = %(from_sprint)s
+                FOR UPDATE
+            """, {'names': tuple(names), 'from_sprint': from_sprint})
+            if not names:
+                continue
+
+            frappe.db.sql("""
+                UPDATE `tabTask`
+                SET current_sprint = %(to_sprint)s, modified = %(now)s, modified_by = %(user)s
+                WHERE name IN %(names)s
+            """, {
+                'to_sprint': to_sprint,
+                'now': self.now,
+                'user': self.user,
+                'names': tuple(names)
+            })
+            moved.update(names)
+
+        tasks = [task for task in tasks if task.name in moved]
+        if not tasks:
+            return []
+
+        self.log_activities(tasks, to_sprint)
+        self.record_board_changes(tasks, to_sprint)
+        self.record_sprint_events(tasks, to_sprint)
+        bump_sprint_versions({task.current_sprint for task in tasks} | {to_sprint})
+
+        if refresh:
+            self.refresh_sprints({task.current_sprint for task in tasks} | {to_sprint})
+
+        return tasks
+
+    def log_activities(self, tasks, to_sprint):
+        """Insert one activity row per task, as the Task save path logs sprint changes"""
+        rows = []
+        for task in tasks:
+            if to_sprint and task.current_sprint:
+                activity_type = 'sprint_added'
+                data = {'from_sprint': task.current_sprint, 'to_sprint': to_sprint}
+            elif to_sprint:
+                activity_type, data = 'sprint_added', {'sprint': to_sprint}
+            else:
+                activity_type, data = 'sprint_removed', {'sprint': task.current_sprint}
+
+            row = {
+                'name': frappe.generate_hash(length=10),
+                'issue': task.name,
+                'project': task.project,
+                'activity_type': activity_type,
+                'user': self.user,
+                'timestamp': self.now,
+                'data': json.dumps(data),
+                'comment': None,
+                'owner': self.user,
+                'modified_by': self.user,
+                'creation': self.now,
+                'modified': self.now
+            }
+            rows.append([row[field] for field in ACTIVITY_FIELDS])
+
+        frappe.db.bulk_insert('Agile Issue Activity', fields=ACTIVITY_FIELDS, values=rows)
+
+    def record_sprint_events(self, tasks, to_sprint):
+        """Log the scope each task takes out of its old sprint and into the new one"""
+        events = []
+        for task in tasks:
+            events += get_contribution_events(task.name, get_task_contribution(task),
+                get_task_contribution(frappe._dict(task, current_sprint=to_sprint)))
+        record_sprint_events(events, self.now)
+
+    def record_board_changes(self, tasks, to_sprint):
+        changes = []
+        for task in tasks:
+            if not task.project or task.status == 'Cancelled':
+                continue
+            changes.append({
+                'project': task.project, 'sprint': task.current_sprint or None, 'task': task.name,
+                'change_type': 'removed', 'from_status': task.issue_status, 'to_status': None
+            })
+            changes.append({
+                'project': task.project, 'sprint': to_sprint, 'task': task.name,
+                'change_type': 'added', 'from_status': None, 'to_status': task.issue_status
+            })
+
+        record_board_changes(changes)
+
+    def refresh_sprints(self, sprints):
+        """Recompute totals of the affected sprints, then today's burndown of the active ones"""
+        from erpnext_agile.agile_sprint_manager import AgileSprintManager
+
+        sprints = [sprint for sprint in sprints if sprint]
+        if not sprints:
+            return
+
+        recalculate_sprint_metrics(sprints)
+
+        manager = AgileSprintManager()
+        for sprint in frappe.get_all('Agile Sprint',
+            filters={'name': ['in', sprints], 'sprint_state': 'Active'},
+            pluck='name'
+        ):
+            manager.update_burndown_entry(frappe.get_doc('Agile Sprint', sprint))
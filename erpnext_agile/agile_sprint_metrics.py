@@ -0,0 +1,253 @@
+# erpnext_agile/agile_sprint_metrics.py
+"""
+Sprint totals maintained by deltas.
+
+A task save adds the difference between its old and new contribution
+(story points, and the points counted as completed) to its sprint row in
+the same transaction, so the cost of a save does not depend on the size of
+the sprint, and appends it to the Agile Sprint Event log burndown is derived
+from. Once committed, every delta adds its sprint to a Redis dirty set. The hourly
+`refresh_dirty_sprints` recomputes only those sprints from their tasks and
+corrects drift in both, so its cost follows activity rather than the number
+of open sprints. The daily `reconcile_sprint_metrics` sweep checks every open
+sprint, which catches updates that bypass Task hooks.
+"""
+
+import frappe
+from frappe.utils import flt
+
+from erpnext_agile.agile_metadata import is_done_status
+from erpnext_agile.agile_sprint_report import bump_sprint_versions
+from erpnext_agile.erpnext_agile.doctype.agile_sprint_event.agile_sprint_event import (
+    get_contribution_events,
+    get_logged_totals,
+    make_event,
+    record_sprint_events,
+)
+
+# Totals differing by less than this are not treated as drift
+TOLERANCE = 0.005
+
+# Derived metrics, recomputed in the same UPDATE as the totals. MariaDB
+# evaluates single-table SET clauses left to right, so these see the new totals.
+DERIVED_METRICS = """
+    progress_percentage = CASE WHEN total_points > 0
+        THEN completed_points / total_points * 100 ELSE 0 END,
+    velocity = CASE WHEN sprint_state IN ('Active', 'Completed')
+        THEN completed_points / GREATEST(IFNULL(DATEDIFF(end_date, start_date), 1), 1) ELSE 0 END
+"""
+
+STORY_POINTS = "IFNULL(CAST(NULLIF(t.story_points, '') AS DECIMAL(10,2)), 0)"
+
+# Redis set of sprints whose tasks changed since the last hourly refresh
+DIRTY_SPRINTS_KEY = 'agile_dirty_sprints'
+
+# Sprints claimed by the running refresh; left behind by a failed one and retried
+PROCESSING_SPRINTS_KEY = 'agile_dirty_sprints_processing'
+
+
+def get_task_contribution(doc):
+    """(sprint, points, completed points) a task adds to its sprint, or None"""
+    if not doc or not doc.get('is_agile') or not doc.get('current_sprint'):
+        return None
+
+    points = flt(doc.get('story_points'))
+    return doc.current_sprint, points, points if is_done_status(doc.get('issue_status')) else 0
+
+
+def apply_task_delta(doc, deleted=False):
+    """Move a saved (or deleted) task's contribution from its previous state to its current one"""
+    if deleted:
+        old, new = get_task_contribution(doc), None
+    else:
+        old, new = get_task_contribution(doc.get_doc_before_save()), get_task_contribution(doc)
+
+    if old == new:
+        return
+
+    record_sprint_events(get_contribution_events(doc.name, old, new))
+
+    deltas = {}
+    for contribution, sign in ((old, -1), (new, 1)):
+        if contribution:
+            sprint, points, completed = contribution
+            total_delta, completed_delta = deltas.get(sprint, (0, 0))
+            deltas[sprint] = (total_delta + sign * points, completed_delta + sign * completed)
+
+    for sprint, (total_delta, completed_delta) in deltas.items():
+        apply_sprint_delta(sprint, total_delta, completed_delta)
+
+
+def apply_sprint_delta(sprint, total_delta=0, completed_delta=0):
+    """Add to a sprint's stored totals in one statement"""
+    if not (total_delta or completed_delta):
+        return
+
+    frappe.db.sql(f"""
+        UPDATE `tabAgile Sprint`
+        SET total_points = IFNULL(total_points, 0) + %(total)s,
+            completed_points = IFNULL(completed_points, 0) + %(completed)s,
+            {DERIVED_METRICS}
+        WHERE name = %(sprint)s
+    """, {'sprint': sprint, 'total': total_delta, 'completed': completed_delta})
+    mark_sprints_dirty([sprint])
+
+
+def set_sprint_totals(totals):
+    """Overwrite the totals of several sprints, {sprint: (total, completed points)}, in one statement"""
+    if not totals:
+        return
+
+    values = {'sprints': tuple(totals)}
+    total_cases, completed_cases = [], []
+    for i, (sprint, (total_points, completed_points)) in enumerate(totals.items()):
+        values.update({f'sprint_{i}': sprint, f'total_{i}': total_points, f'completed_{i}': completed_points})
+        total_cases.append(f"WHEN %(sprint_{i})s THEN %(total_{i})s")
+        completed_cases.append(f"WHEN %(sprint_{i})s THEN %(completed_{i})s")
+
+    frappe.db.sql(f"""
+        UPDATE `tabAgile Sprint`
+        SET total_points = CASE name {' '.join(total_cases)} END,
+            completed_points = CASE name {' '.join(completed_cases)} END,
+            {DERIVED_METRICS}
+        WHERE name IN %(sprints)s
+    """, values)
+    # Totals are only reset after changes that bypassed the Task hooks
+    bump_sprint_versions(totals)
+
+
+def calculate_sprint_totals(sprints):
+    """{sprint: (total points, completed points)} from the sprints' tasks in one aggregate"""
+    if not sprints:
+        return {}
+
+    return {row[0]: (flt(row[1]), flt(row[2])) for row in frappe.db.sql(f"""
+        SELECT t.current_sprint,
+            SUM({STORY_POINTS}),
+            SUM(CASE WHEN s.status_category = 'Done' THEN {STORY_POINTS} ELSE 0 END)
+        FROM `tabTask` t
+        LEFT JOIN `tabAgile Issue Status` s ON s.name = t.issue_status
+        WHERE t.is_agile = 1 AND t.current_sprint IN %(sprints)s
+        GROUP BY t.current_sprint
+    """, {'sprints': tuple(sprints)})}
+
+
+def recalculate_sprint_metrics(sprints):
+    """Recompute the totals of the given sprints from scratch"""
+    sprints = [sprint for sprint in sprints if sprint]
+    totals = calculate_sprint_totals(sprints)
+    set_sprint_totals({sprint: totals.get(sprint, (0, 0)) for sprint in sprints})
+
+
+def mark_sprints_dirty(sprints):
+    """Queue sprints for the next hourly refresh once the transaction commits"""
+    sprints = {sprint for sprint in sprints if sprint}
+    if not sprints:
+        return
+
+    pending = getattr(frappe.local, 'agile_dirty_sprints', None)
+    if pending is None:
+        pending = frappe.local.agile_dirty_sprints = set()
+        frappe.db.after_commit.add(flush_dirty_sprints)
+        frappe.db.after_rollback.add(discard_dirty_sprints)
+    pending.update(sprints)
+
+
+def flush_dirty_sprints():
+    pending = getattr(frappe.local, 'agile_dirty_sprints', None)
+    frappe.local.agile_dirty_sprints = None
+    if pending:
+        frappe.cache().sadd(DIRTY_SPRINTS_KEY, *pending)
+
+
+def discard_dirty_sprints():
+    frappe.local.agile_dirty_sprints = None
+
+
+def refresh_dirty_sprints():
+    """
+    Scheduler job: reconcile the sprints whose tasks changed since the last run.
+
+    The dirty set is moved into a processing set atomically, so sprints marked
+    while the refresh runs stay queued for the next run. The processing set is
+    only dropped once the refresh has committed, so a failed run is retried.
+    """
+    cache = frappe.cache()
+    dirty, processing = cache.make_key(DIRTY_SPRINTS_KEY), cache.make_key(PROCESSING_SPRINTS_KEY)
+
+    # Raw MULTI/EXEC pipeline: the keys are already prefixed by make_key
+    pipeline = cache.pipeline()
+    pipeline.sunionstore(processing, [processing, dirty])
+    pipeline.delete(dirty)
+    pipeline.smembers(processing)
+    sprints = [frappe.safe_decode(sprint) for sprint in pipeline.execute()[-1]]
+    if not sprints:
+        return []
+
+    drifted = reconcile_sprint_metrics(sprints=sprints)
+    cache.delete(processing)
+    return drifted
+
+
+def reconcile_sprint_metrics(states=('Active', 'Future'), sprints=None):
+    """
+    Verify the delta-maintained totals of open sprints (or of the given ones
+    among them) against their tasks.
+
+    Stored and actual totals come from one aggregate over the sprints joined
+    to their tasks and status categories, and drifted sprints are corrected in
+    one update. The drift is logged, and a correction event brings the sprint
+    event log back in line with the tasks as well.
+    """
+    conditions = ["sp.sprint_state IN %(states)s"]
+    values = {'states': tuple(states)}
+    if sprints is not None:
+        if not sprints:
+            return []
+        conditions.append("sp.name IN %(sprints)s")
+        values['sprints'] = tuple(sprints)
+
+    rows = frappe.db.sql(f"""
+        SELECT sp.name,
+            sp.total_points AS stored_total,
+            sp.completed_points AS stored_completed,
+            SUM({STORY_POINTS}) AS total_points,
+            SUM(CASE WHEN s.status_category = 'Done' THEN {STORY_POINTS} ELSE 0 END) AS completed_points
+        FROM `tabAgile Sprint` sp
+        LEFT JOIN `tabTask` t ON t.current_sprint = sp.name AND t.is_agile = 1
+        LEFT JOIN `tabAgile Issue Status` s ON s.name = t.issue_status
+        WHERE {' AND '.join(conditions)}
+        GROUP BY sp.name, sp.total_points, sp.completed_points
+    """, values, as_dict=True)
+    totals = {row.name: (flt(row.total_points), flt(row.completed_points)) for row in rows}
+
+    drifted = []
+    corrected = {}
+    for row in rows:
+        total_points, completed_points = totals[row.name]
+        if (abs(total_points - flt(row.stored_total)) > TOLERANCE
+                or abs(completed_points - flt(row.stored_completed)) > TOLERANCE):
+            corrected[row.name] = (total_points, completed_points)
+            drifted.append(
+                f"{row.name}: total {flt(row.stored_total)} -> {total_points}, "
+                f"completed {flt(row.stored_completed)} -> {completed_points}"
+            )
+    set_sprint_totals(corrected)
+
+    if drifted:
+        frappe.log_error(title="Sprint Metrics Drift", message="\n".join(drifted))
+
+    # Keep the event log summing to the tasks, so burndown stays exact after bypassed updates
+    logged = get_logged_totals(list(totals))
+    corrections = []
+    for sprint, (total_points, completed_points) in totals.items():
+        logged_total, logged_completed = logged.get(sprint, (0, 0))
+        if (abs(total_points - logged_total) > TOLERANCE
+                or abs(completed_points - logged_completed) > TOLERANCE):
+            corrections.append(make_event(sprint, None, 'correction',
+                total_points - logged_total, completed_points - logged_completed))
+    record_sprint_events(corrections)
+    bump_sprint_versions([event['sprint'] for event in corrections])
+
+    frappe.db.commit()
+    return drifted
@@ -0,0 +1,135 @@
+# erpnext_agile/agile_sprint_report.py
+"""
+Sprint report snapshots.
+
+Every sprint has a version counter in Redis. Writers bump it when the
+sprint's issues, statuses, points or event log change, and the report of an
+open sprint is cached together with the version (and day, as the burndown
+grows by a day at midnight) it was built at, so views and the daily digest
+only rebuild sprints that changed since. Bumps are repeated after commit,
+so a report built from rows of a transaction that was still open does not
+outlive it.
+
+A completed sprint's report is frozen into Agile Sprint Report Snapshot
+and served from there permanently.
+"""
+
+import json
+
+import frappe
+from frappe.utils import now_datetime, today
+
+# Task fields the report reads; a change to any of them makes the report stale
+REPORT_TASK_FIELDS = (
+    'current_sprint', 'is_agile', 'issue_status', 'story_points', 'subject',
+    'issue_key', 'issue_type', 'issue_priority', 'reporter'
+)
+
+# Seconds a cached report of an open sprint lives without being read
+REPORT_TTL = 7 * 24 * 3600
+
+
+def get_sprint_report(sprint):
+    """The report of a sprint from its snapshot, rebuilding it only when stale"""
+    from erpnext_agile.agile_sprint_manager import AgileSprintManager
+
+    if frappe.db.get_value('Agile Sprint', sprint, 'sprint_state') == 'Completed':
+        frozen = frappe.db.get_value('Agile Sprint Report Snapshot', {'sprint': sprint}, 'report')
+        if frozen:
+            return json.loads(frozen, object_hook=frappe._dict)
+        return freeze_sprint_report(sprint)
+
+    version = (get_sprint_version(sprint), today())
+    cached = frappe.cache().get_value(get_report_key(sprint))
+    if cached and cached[0] == version:
+        return cached[1]
+
+    report = AgileSprintManager().build_sprint_report(sprint)
+    frappe.cache().set_value(get_report_key(sprint), (version, report), expires_in_sec=REPORT_TTL)
+    return report
+
+
+def freeze_sprint_report(sprint):
+    """Build the final report of a completed sprint and store it permanently"""
+    from erpnext_agile.agile_sprint_manager import AgileSprintManager
+
+    report = AgileSprintManager().build_sprint_report(sprint)
+    if not frappe.db.exists('Agile Sprint Report Snapshot', {'sprint': sprint}):
+        frappe.get_doc({
+            'doctype': 'Agile Sprint Report Snapshot',
+            'sprint': sprint,
+            'frozen_on': now_datetime(),
+            'report': frappe.as_json(report)
+        }).insert(ignore_permissions=True)
+
+    frappe.cache().delete_value(get_report_key(sprint))
+    return report
+
+
+def get_sprint_version(sprint):
+    cache = frappe.cache()
+    return int(cache.get(get_version_key(sprint)) or 0)
+
+
+def bump_sprint_versions(sprints):
+    """Mark the reports of the given sprints stale, now and again after commit"""
+    sprints = {sprint for sprint in sprints if sprint}
+    if not sprints:
+        return
+
+    increment_versions(sprints)
+
+    pending = getattr(frappe.local, 'agile_sprint_report_bumps', None)
+    if pending is None:
+        pending = frappe.local.agile_sprint_report_bumps = set()
+        frappe.db.after_commit.add(flush_version_bumps)
+        frappe.db.after_rollback.add(discard_version_bumps)
+
+    pending.update(sprints)
+
+
+def bump_task_sprints(doc, deleted=False):
+    """Bump the sprints whose report a saved (or deleted) task changes"""
+    if deleted:
+        bump_sprint_versions([doc.get('current_sprint')])
+        return
+
+    old_doc = doc.get_doc_before_save()
+    if old_doc and not any(old_doc.get(field) != doc.get(field) for field in REPORT_TASK_FIELDS):
+        return
+
+    bump_sprint_versions([doc.get('current_sprint'), old_doc.get('current_sprint') if old_doc else None])
+
+
+def increment_versions(sprints):
+    cache = frappe.cache()
+    # Raw pipeline: the keys are already prefixed by make_key
+    pipeline = cache.pipeline()
+    for sprint in sprints:
+        pipeline.incr(get_version_key(sprint))
+    pipeline.execute()
+
+
+def flush_version_bumps():
+    pending = getattr(frappe.local, 'agile_sprint_report_bumps', None)
+    frappe.local.agile_sprint_report_bumps = None
+    if pending:
+        increment_versions(pending)
+
+
+def discard_version_bumps():
+    frappe.local.agile_sprint_report_bumps = None
+
+
+def delete_sprint_report(sprint):
+    """Drop the cached and frozen reports of a deleted sprint"""
+    frappe.db.delete('Agile Sprint Report Snapshot', {'sprint': sprint})
+    frappe.cache().delete_value(get_report_key(sprint))
+
+
+def get_report_key(sprint):
+    return f"agile_sprint_report|{sprint}"
+
+
+def get_version_key(sprint):
+    return frappe.cache().make_key(f"agile_sprint_report_version|{sprint}")
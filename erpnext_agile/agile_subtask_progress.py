@@ -0,0 +1,128 @@
+# erpnext_agile/agile_subtask_progress.py
+"""
+Parent progress from stored subtask counters.
+
+Every parent issue keeps `subtask_count` and `completed_subtask_count` for
+its direct children. A child save applies the change in its parent and
+Done category to those counters (and the parent's progress) in one UPDATE,
+instead of reading every sibling. Counters are per level: a parent's own
+status change is applied to its parent by the parent's save, so the
+hierarchy propagates the same way at every depth.
+
+`rebuild_subtask_counters` (bench `agile-rebuild-subtask-counters`)
+recomputes the counters from the children when they drift.
+"""
+
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+from erpnext_agile.agile_metadata import is_done_status
+
+# Progress is only derived while the parent has children; otherwise it keeps
+# its manual value. Evaluated after the counters in the same SET (left to right).
+DERIVED_PROGRESS = """
+    progress = CASE WHEN subtask_count > 0
+        THEN completed_subtask_count / subtask_count * 100 ELSE progress END
+"""
+
+
+def get_child_contribution(doc):
+    """(parent, completed) a task adds to its parent's counters, or None"""
+    if not doc or not doc.get('parent_issue'):
+        return None
+
+    return doc.parent_issue, 1 if is_done_status(doc.get('issue_status')) else 0
+
+
+def apply_child_delta(doc, deleted=False):
+    """Move a saved (or deleted) child's contribution from its previous parent/status to its current one"""
+    if deleted:
+        old, new = get_child_contribution(doc), None
+    else:
+        old, new = get_child_contribution(doc.get_doc_before_save()), get_child_contribution(doc)
+
+    if old == new:
+        return
+
+    deltas = {}
+    for contribution, sign in ((old, -1), (new, 1)):
+        if contribution:
+            parent, completed = contribution
+            total_delta, completed_delta = deltas.get(parent, (0, 0))
+            deltas[parent] = (total_delta + sign, completed_delta + sign * completed)
+
+    for parent, (total_delta, completed_delta) in deltas.items():
+        apply_parent_delta(parent, total_delta, completed_delta)
+
+
+def apply_parent_delta(parent, total_delta=0, completed_delta=0):
+    """Add to a parent's subtask counters and refresh its progress in one statement"""
+    if not (total_delta or completed_delta):
+        return
+
+    frappe.db.sql(f"""
+        UPDATE `tabTask`
+        SET subtask_count = GREATEST(IFNULL(subtask_count, 0) + %(total)s, 0),
+            completed_subtask_count = GREATEST(IFNULL(completed_subtask_count, 0) + %(completed)s, 0),
+            {DERIVED_PROGRESS}
+        WHERE name = %(parent)s
+    """, {'parent': parent, 'total': total_delta, 'completed': completed_delta})
+
+
+def rebuild_subtask_counters(project=None):
+    """
+    Recompute the subtask counters of every parent (of one project) from its children.
+
+    Returns the number of parents whose counters were corrected.
+    """
+    conditions = ["(p.subtask_count != IFNULL(c.total, 0) OR p.completed_subtask_count != IFNULL(c.completed, 0))"]
+    values = {}
+    if project:
+        conditions.append("p.project = %(project)s")
+        values['project'] = project
+
+    frappe.db.sql(f"""
+        UPDATE `tabTask` p
+        LEFT JOIN (
+            SELECT t.parent_issue, COUNT(*) AS total,
+                SUM(CASE WHEN s.status_category = 'Done' THEN 1 ELSE 0 END) AS completed
+            FROM `tabTask` t
+            LEFT JOIN `tabAgile Issue Status` s ON s.name = t.issue_status
+            WHERE IFNULL(t.parent_issue, '') != ''
+            GROUP BY t.parent_issue
+        ) c ON c.parent_issue = p.name
+        SET p.subtask_count = IFNULL(c.total, 0),
+            p.completed_subtask_count = IFNULL(c.completed, 0),
+            p.progress = CASE WHEN c.total > 0 THEN c.completed / c.total * 100 ELSE p.progress END
+        WHERE {' AND '.join(conditions)}
+    """, values)
+    corrected = frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+
+    frappe.db.commit()
+    return corrected
+
+
+def create_subtask_counter_fields():
+    """Create the hidden counter fields on Task (also created by setup_agile)"""
+    create_custom_fields({
+        'Task': [
+            {
+                'fieldname': 'subtask_count',
+                'label': 'Subtask Count',
+                'fieldtype': 'Int',
+                'insert_after': 'backlog_rank',
+                'read_only': 1,
+                'hidden': 1,
+                'no_copy': 1
+            },
+            {
+                'fieldname': 'completed_subtask_count',
+                'label': 'Completed Subtask Count',
+                'fieldtype': 'Int',
+                'insert_after': 'subtask_count',
+                'read_only': 1,
+                'hidden': 1,
+                'no_copy': 1
+            }
+        ]
+    }, update=True)
@@ -0,0 +1,133 @@
+# erpnext_agile/agile_visibility_benchmark.py
+"""
+Synthetic benchmark of the Task permission query.
+
+Generates projects, project users and tasks (with assignees and watchers)
+inside one transaction, times the Task list view queries of a Projects
+User with the previous subquery conditions and with the visibility tables,
+then rolls everything back. Meant for staging sites: a million tasks take
+minutes to generate and the rebuild locks the visibility tables meanwhile.
+"""
+
+import random
+import statistics
+import time
+
+import frappe
+from frappe.utils import now_datetime
+
+from erpnext_agile.erpnext_agile.doctype.agile_project_visibility.agile_project_visibility import (
+    rebuild_project_visibility,
+)
+from erpnext_agile.erpnext_agile.doctype.agile_task_visibility.agile_task_visibility import (
+    rebuild_task_visibility,
+)
+from erpnext_agile.overrides.project import get_task_visibility_conditions
+
+# Standard-user conditions before the visibility tables, kept for comparison
+LEGACY_CONDITIONS = """
+    (
+        `tabTask`.project IN (
+            SELECT name FROM `tabProject`
+            WHERE custom_enable_assignment_based_visibility = 1
+        )
+        AND (
+            `tabTask`.name IN (SELECT parent FROM `tabAssigned To Users` WHERE user = {user})
+            OR `tabTask`.owner = {user}
+            OR `tabTask`.reporter = {user}
+            OR `tabTask`.custom_original_owner = {user}
+            OR `tabTask`.name IN (SELECT parent FROM `tabAgile Issue Watcher` WHERE user = {user})
+        )
+    )
+    OR
+    (
+        (
+            `tabTask`.project IS NULL
+            OR `tabTask`.project IN (
+                SELECT name FROM `tabProject`
+                WHERE IFNULL(custom_enable_assignment_based_visibility, 0) = 0
+            )
+        )
+        AND (
+            `tabTask`.name IN (SELECT parent FROM `tabAssigned To Users` WHERE user = {user})
+            OR `tabTask`.project IN (SELECT parent FROM `tabProject User` WHERE user = {user})
+        )
+    )
+"""
+
+# What the Task list view runs: one page and the total count
+LIST_QUERIES = [
+    "SELECT `tabTask`.name, `tabTask`.subject, `tabTask`.status, `tabTask`.modified FROM `tabTask` "
+    "WHERE {conditions} ORDER BY `tabTask`.modified DESC LIMIT 20",
+    "SELECT COUNT(*) FROM `tabTask` WHERE {conditions}",
+]
+
+
+def run_benchmark(task_count=1000000, project_count=1000, user_count=200,
+        users_per_project=10, restricted_share=0.2, runs=5):
+    """Generate the data set, time both conditions and roll back; returns the timings in ms"""
+    random.seed(42)
+    try:
+        users = [f"visibility-bench-{i}@example.com" for i in range(user_count)]
+        generate_data(users, task_count, project_count, users_per_project, restricted_share)
+
+        rebuild_task_visibility()
+        rebuild_project_visibility()
+
+        user = users[0]
+        return {
+            'legacy': time_queries(LEGACY_CONDITIONS.format(user=frappe.db.escape(user)), runs),
+            'materialized': time_queries(get_task_visibility_conditions(user), runs),
+        }
+    finally:
+        frappe.db.rollback()
+
+
+def generate_data(users, task_count, project_count, users_per_project, restricted_share):
+    now = now_datetime()
+    projects = [f"VISIBILITY-BENCH-{i}" for i in range(project_count)]
+
+    frappe.db.bulk_insert('Project',
+        fields=['name', 'project_name', 'status', 'custom_enable_assignment_based_visibility',
+            'owner', 'modified_by', 'creation', 'modified'],
+        values=[(project, project, 'Open', int(random.random() < restricted_share),
+            'Administrator', 'Administrator', now, now) for project in projects])
+
+    project_users = []
+    for project in projects:
+        for idx, user in enumerate(random.sample(users, min(users_per_project, len(users))), 1):
+            project_users.append((frappe.generate_hash(length=10), project, 'Project', 'users', idx, user))
+    frappe.db.bulk_insert('Project User',
+        fields=['name', 'parent', 'parenttype', 'parentfield', 'idx', 'user'], values=project_users)
+
+    tasks, assignees, watchers = [], [], []
+    for i in range(task_count):
+        task = f"VISIBILITY-BENCH-TASK-{i}"
+        owner = random.choice(users)
+        tasks.append((task, f"Synthetic task {i}", random.choice(projects), 'Open', 1,
+            owner, owner, 'Administrator', now, now))
+        assignees.append((frappe.generate_hash(length=10), task, 'Task', 'assigned_to_users', 1,
+            random.choice(users)))
+        if random.random() < 0.3:
+            watchers.append((frappe.generate_hash(length=10), task, 'Task', 'watchers', 1,
+                random.choice(users)))
+
+    frappe.db.bulk_insert('Task',
+        fields=['name', 'subject', 'project', 'status', 'is_agile', 'reporter', 'owner', 'modified_by',
+            'creation', 'modified'],
+        values=tasks)
+    child_fields = ['name', 'parent', 'parenttype', 'parentfield', 'idx', 'user']
+    frappe.db.bulk_insert('Assigned To Users', fields=child_fields, values=assignees)
+    frappe.db.bulk_insert('Agile Issue Watcher', fields=child_fields, values=watchers)
+
+
+def time_queries(conditions, runs):
+    """Median and best milliseconds of the list view queries over `runs` runs"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for query in LIST_QUERIES:
+            frappe.db.sql(query.format(conditions=conditions))
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {'median_ms': round(statistics.median(timings), 1), 'best_ms': round(min(timings), 1)}
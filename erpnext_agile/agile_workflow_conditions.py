@@ -0,0 +1,294 @@
+# erpnext_agile/agile_workflow_conditions.py
+"""
+Workflow transition conditions.
+
+A condition is parsed once, checked against an AST whitelist and compiled to
+a cached code object. While parsing, the doc fields it reads are recorded and
+conditions that only depend on those fields are marked pure: their result is
+memoised per process on the values of those fields, so cards with the same
+values (or a card saved again without touching them) are not re-evaluated.
+Batch evaluators additionally memoise the DB helpers used by impure conditions.
+"""
+
+import ast
+
+import frappe
+from frappe import _
+
+NUMERIC_FIELDS = frozenset({
+    'story_points', 'priority_value', 'estimated_hours',
+    'actual_hours', 'progress', 'expected_time'
+})
+
+# Helpers that read the clock, the session or the database
+IMPURE_NAMES = frozenset({'today', 'now', 'get_value', 'exists', 'frappe'})
+
+# frappe utilities conditions may call; anything else under frappe.utils
+# (e.g. execute_in_shell) is rejected
+ALLOWED_FRAPPE_UTILS = frozenset({
+    'today', 'nowdate', 'now', 'now_datetime', 'getdate', 'get_datetime',
+    'flt', 'cint', 'cstr', 'add_days', 'add_months', 'date_diff', 'time_diff_in_hours'
+})
+
+# frappe attributes conditions may use
+ALLOWED_FRAPPE_ATTRIBUTES = frozenset({
+    'frappe.session.user', 'frappe.db.get_value', 'frappe.db.exists',
+    'frappe.db.count', 'frappe.get_roles'
+} | {f'frappe.utils.{name}' for name in ALLOWED_FRAPPE_UTILS})
+
+ALLOWED_NAMES = frozenset({
+    'doc', 'frappe', '_', 'len', 'str', 'int', 'float', 'flt', 'cint', 'bool',
+    'today', 'now', 'getdate', 'get_value', 'exists', 'True', 'False', 'None'
+})
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.FloorDiv,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.In, ast.NotIn, ast.Is, ast.IsNot, ast.IfExp,
+    ast.Call, ast.keyword, ast.Attribute, ast.Subscript, ast.Name, ast.Load,
+    ast.Constant, ast.List, ast.Tuple, ast.Set
+)
+
+MAX_MEMOISED_RESULTS = 10000
+
+# condition source -> CompiledCondition
+_compiled_conditions = {}
+
+# CompiledCondition.memo_key -> bool, for pure conditions
+_pure_results = {}
+
+
+class CompiledCondition:
+    """A validated condition with its code object and field dependencies"""
+
+    __slots__ = ('source', 'code', 'fields', 'pure')
+
+    def __init__(self, source, code, fields, pure):
+        self.source = source
+        self.code = code
+        # None when the condition uses doc in a way fields cannot be tracked
+        self.fields = fields
+        self.pure = pure
+
+    def memo_key(self, doc):
+        if not self.pure or self.fields is None:
+            return None
+        return (self.source,) + tuple(str(doc.get(field)) for field in self.fields)
+
+
+class ConditionVisitor(ast.NodeVisitor):
+    """Enforces the whitelist and collects the doc fields a condition reads"""
+
+    def __init__(self):
+        self.fields = set()
+        self.tracked = True
+        self.pure = True
+
+    def generic_visit(self, node):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(_("'{0}' is not allowed in workflow conditions").format(
+                type(node).__name__))
+        super().generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id not in ALLOWED_NAMES:
+            raise ValueError(_("Name '{0}' is not allowed in workflow conditions").format(node.id))
+        if node.id in IMPURE_NAMES:
+            self.pure = False
+        if node.id == 'doc':
+            # Bare doc usage (passed to a function, compared...) hides its field reads
+            self.tracked = False
+
+    def visit_Attribute(self, node):
+        if node.attr.startswith('_'):
+            raise ValueError(_("Private attributes are not allowed in workflow conditions"))
+
+        if is_doc(node.value):
+            if node.attr != 'get':
+                self.fields.add(node.attr)
+            return
+
+        path = get_dotted_path(node)
+        if path in ALLOWED_FRAPPE_ATTRIBUTES:
+            self.pure = False
+            return
+
+        raise ValueError(_("'{0}' is not allowed in workflow conditions").format(
+            path or node.attr))
+
+    def visit_Subscript(self, node):
+        if is_doc(node.value) and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str):
+            self.fields.add(node.slice.value)
+            return
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and is_doc(func.value) and func.attr == 'get':
+            if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+                self.fields.add(node.args[0].value)
+            else:
+                self.tracked = False
+            for arg in node.args[1:]:
+                self.visit(arg)
+            return
+
+        if isinstance(func, ast.Attribute) and is_doc(func.value):
+            raise ValueError(_("Only doc.get() can be called on doc in workflow conditions"))
+        if not isinstance(func, (ast.Name, ast.Attribute)):
+            raise ValueError(_("Only helper functions can be called in workflow conditions"))
+        self.generic_visit(node)
+
+
+def is_doc(node):
+    return isinstance(node, ast.Name) and node.id == 'doc'
+
+
+def get_dotted_path(node):
+    """'frappe.session.user' for the matching Attribute chain, else None"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name) or node.id != 'frappe':
+        return None
+    return '.'.join(['frappe'] + parts[::-1])
+
+
+def compile_condition(condition):
+    """Validate and compile a condition once; raises ValueError or SyntaxError"""
+    source = (condition or '').strip()
+    compiled = _compiled_conditions.get(source)
+    if compiled:
+        return compiled
+
+    tree = ast.parse(source, mode='eval')
+    visitor = ConditionVisitor()
+    visitor.visit(tree)
+
+    compiled = CompiledCondition(
+        source,
+        compile(tree, '<workflow condition>', 'eval'),
+        tuple(sorted(visitor.fields)) if visitor.tracked else None,
+        visitor.pure
+    )
+    _compiled_conditions[source] = compiled
+    return compiled
+
+
+def get_float(value):
+    try:
+        return float(value) if value else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+def get_int(value):
+    try:
+        return int(float(value)) if value else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+class SmartDoc:
+    """Read-only view of a doc (or dict row) that auto-casts numeric fields"""
+
+    __slots__ = ('_doc',)
+
+    def __init__(self, doc):
+        self._doc = doc
+
+    def __getattr__(self, name):
+        value = getattr(self._doc, name, None)
+        return get_float(value) if name in NUMERIC_FIELDS else value
+
+    def get(self, key, default=None):
+        value = self._doc.get(key, default)
+        return get_float(value) if key in NUMERIC_FIELDS else value
+
+    def __getitem__(self, key):
+        return self._doc[key]
+
+
+BASE_CONTEXT = {
+    '_': _,
+    'len': len,
+    'str': str,
+    'int': get_int,
+    'float': get_float,
+    'flt': get_float,
+    'cint': get_int,
+    'bool': bool,
+}
+
+
+class ConditionEvaluator:
+    """Evaluates compiled conditions, reusing memoised results of pure ones
+
+    With `memoise_lookups`, get_value/exists calls are memoised for the lifetime
+    of the evaluator; use it only for read-only passes such as a board load.
+    """
+
+    def __init__(self, memoise_lookups=False):
+        self.lookups = {}
+        get_value, exists = frappe.db.get_value, frappe.db.exists
+        if memoise_lookups:
+            get_value, exists = self.memoised(get_value), self.memoised(exists)
+
+        self.context = dict(BASE_CONTEXT,
+            frappe=frappe,
+            today=frappe.utils.today,
+            now=frappe.utils.now,
+            getdate=frappe.utils.getdate,
+            get_value=get_value,
+            exists=exists
+        )
+
+    def memoised(self, function):
+        def wrapper(*args, **kwargs):
+            key = (function.__name__, repr(args), repr(sorted(kwargs.items())))
+            if key not in self.lookups:
+                self.lookups[key] = function(*args, **kwargs)
+            return self.lookups[key]
+        return wrapper
+
+    def evaluate(self, condition, doc):
+        """Evaluate a condition (string or CompiledCondition) against doc"""
+        if not isinstance(condition, CompiledCondition):
+            if not condition or not condition.strip():
+                return True
+            try:
+                condition = compile_condition(condition)
+            except (SyntaxError, ValueError) as e:
+                throw_condition_error(condition, e)
+
+        key = condition.memo_key(doc)
+        if key is not None and key in _pure_results:
+            return _pure_results[key]
+
+        try:
+            result = bool(eval(condition.code, {"__builtins__": {}}, dict(self.context, doc=SmartDoc(doc))))
+        except Exception as e:
+            throw_condition_error(condition.source, e)
+
+        if key is not None:
+            if len(_pure_results) >= MAX_MEMOISED_RESULTS:
+                _pure_results.clear()
+            _pure_results[key] = result
+        return result
+
+
+def evaluate_condition(condition, doc):
+    """Evaluate one condition against doc"""
+    return ConditionEvaluator().evaluate(condition, doc)
+
+
+def throw_condition_error(condition, error):
+    frappe.log_error(
+        f"Workflow condition failed\nCondition: {condition}\nError: {str(error)}",
+        "Workflow Condition Error"
+    )
+    frappe.throw(
+        _("Workflow condition error: {0}\n\nCondition: {1}").format(str(error), condition)
+    )
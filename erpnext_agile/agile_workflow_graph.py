@@ -0,0 +1,233 @@
+# erpnext_agile/agile_workflow_graph.py
+"""
+Compiled workflow transition graphs.
+
+Each Agile Workflow Scheme is compiled into an adjacency map keyed by
+(from_status, to_status) with the required permission and the compiled
+condition. Graphs are cached per process and in Redis and invalidated
+when a scheme is saved or deleted, so validating a transition needs no
+database reads.
+"""
+
+import frappe
+from frappe import _
+
+from erpnext_agile.agile_cache import VersionedCache
+from erpnext_agile.agile_permissions import filter_permitted
+from erpnext_agile.agile_workflow_conditions import (
+    ConditionEvaluator,
+    compile_condition,
+    throw_condition_error,
+)
+
+
+class CompiledWorkflow:
+    """Adjacency map of one workflow scheme"""
+
+    def __init__(self, name, transitions):
+        self.name = name
+        self.edges = {}
+        self.outgoing = {}
+
+        for row in transitions:
+            condition = (row.get('condition') or '').strip()
+            edge = frappe._dict(row, condition=condition or None, compiled=None, error=None)
+            if condition:
+                # Rows saved before conditions were whitelisted fail on evaluation
+                try:
+                    edge.compiled = compile_condition(condition)
+                except (SyntaxError, ValueError) as e:
+                    edge.error = e
+
+            # The first row of a (from, to) pair wins, as in the scheme's linear scan
+            if (edge.from_status, edge.to_status) in self.edges:
+                continue
+            self.edges[(edge.from_status, edge.to_status)] = edge
+            self.outgoing.setdefault(edge.from_status, []).append(edge)
+
+    def get_edge(self, from_status, to_status):
+        return self.edges.get((from_status, to_status))
+
+    def get_transitions(self, from_status, doc=None):
+        """Transitions out of a status whose condition holds for doc (if given)"""
+        return [
+            {
+                'to_status': edge.to_status,
+                'transition_name': edge.transition_name,
+                'required_permission': edge.required_permission,
+                'condition': edge.condition
+            }
+            for edge in self.outgoing.get(from_status, [])
+            if not (edge.condition and doc) or self.evaluate(edge, doc)
+        ]
+
+    def validate_transition(self, from_status, to_status, doc=None, user=None):
+        """Same contract as AgileWorkflowScheme.validate_transition: (is_valid, message)"""
+        edge = self.get_edge(from_status, to_status)
+        if not edge:
+            return False, _("No transition defined from '{0}' to '{1}'").format(
+                from_status, to_status
+            )
+
+        if edge.condition and doc and not self.evaluate(edge, doc):
+            return False, _("Transition condition not met: {0}").format(edge.condition)
+
+        if user and not has_required_role(user, edge.required_permission):
+            return False, _("User does not have required permission: {0}").format(
+                edge.required_permission
+            )
+
+        return True, None
+
+    def evaluate(self, edge, doc, evaluator=None):
+        if edge.error:
+            throw_condition_error(edge.condition, edge.error)
+        return (evaluator or ConditionEvaluator()).evaluate(edge.compiled, doc)
+
+    @property
+    def condition_fields(self):
+        """Task fields read by the conditions; None if some condition uses doc opaquely"""
+        fields = set()
+        for edge in self.edges.values():
+            if edge.compiled:
+                if edge.compiled.fields is None:
+                    return None
+                fields.update(edge.compiled.fields)
+        return fields
+
+
+def load_workflow(scheme_name):
+    """Plain transition rows of a scheme, in order; None if it does not exist"""
+    if not frappe.db.exists('Agile Workflow Scheme', scheme_name):
+        return None
+
+    return {
+        'name': scheme_name,
+        'transitions': [dict(row) for row in frappe.get_all('Agile Workflow Transition',
+            filters={'parent': scheme_name, 'parenttype': 'Agile Workflow Scheme'},
+            fields=['from_status', 'to_status', 'transition_name', 'required_permission', 'condition'],
+            order_by='idx asc'
+        )]
+    }
+
+
+workflow_cache = VersionedCache(
+    'workflow_scheme',
+    builder=load_workflow,
+    compiler=lambda data: CompiledWorkflow(data['name'], data['transitions'])
+)
+
+
+def get_workflow(scheme_name):
+    """Compiled graph of a workflow scheme, or None"""
+    if not scheme_name:
+        return None
+    return workflow_cache.get(scheme_name)
+
+
+def get_project_workflow(project):
+    """Compiled graph governing a project, or None when transitions are unrestricted"""
+    if not project:
+        return None
+
+    enable_agile, workflow_scheme = frappe.get_cached_value(
+        'Project', project, ['enable_agile', 'workflow_scheme']) or (None, None)
+    if not enable_agile or not workflow_scheme:
+        return None
+
+    return get_workflow(workflow_scheme)
+
+
+def get_transitions_for_tasks(task_names, user=None):
+    """Allowed transitions for many tasks in one pass
+
+    Tasks are read with at most two queries (status, then the fields the
+    conditions depend on), pure conditions are shared between cards with the
+    same field values and DB helpers are memoised for the pass. Returns
+    {task: [transition, ...]}, or None for a task whose project has no workflow.
+    """
+    if not task_names:
+        return {}
+
+    # Cards the user cannot edit get no transitions
+    writable = filter_permitted('Task', task_names, 'write', user)
+    if not writable:
+        return {}
+
+    tasks = frappe.get_list('Task',
+        filters={'name': ['in', writable]},
+        fields=['name', 'project', 'issue_status'],
+        limit_page_length=0
+    )
+
+    workflows = {task.name: get_project_workflow(task.project) for task in tasks}
+    docs = load_condition_fields(tasks, workflows)
+
+    roles = set(frappe.get_roles(user or frappe.session.user))
+    evaluator = ConditionEvaluator(memoise_lookups=True)
+    result = {}
+
+    for task in tasks:
+        workflow = workflows[task.name]
+        if not workflow:
+            result[task.name] = None
+            continue
+
+        transitions = []
+        for edge in workflow.outgoing.get(task.issue_status, []):
+            required = edge.required_permission
+            if required and required != 'All' and required not in roles:
+                continue
+            if edge.condition:
+                try:
+                    if not workflow.evaluate(edge, docs[task.name], evaluator):
+                        continue
+                except frappe.ValidationError:
+                    continue
+
+            transitions.append({
+                'to_status': edge.to_status,
+                'transition_name': edge.transition_name,
+                'required_permission': required,
+                'condition': edge.condition
+            })
+        result[task.name] = transitions
+
+    return result
+
+
+def load_condition_fields(tasks, workflows):
+    """Rows carrying every field the tasks' conditions read, keyed by task"""
+    docs = {task.name: task for task in tasks}
+    fields = set()
+    for workflow in {w.name: w for w in workflows.values() if w}.values():
+        condition_fields = workflow.condition_fields
+        if condition_fields is None:
+            fields = None
+            break
+        fields.update(condition_fields)
+
+    if fields is not None:
+        fields = set(fields) & set(frappe.get_meta('Task').get_valid_columns())
+        fields -= {'name', 'project', 'issue_status'}
+        if not fields:
+            return docs
+
+    for row in frappe.get_all('Task',
+        filters={'name': ['in', list(docs)]},
+        fields=['*'] if fields is None else ['name'] + sorted(fields),
+        limit_page_length=0
+    ):
+        docs[row.name].update(row)
+
+    return docs
+
+
+def has_required_role(user, required_permission):
+    if not required_permission or required_permission == 'All':
+        return True
+    return required_permission in frappe.get_roles(user)
+
+
+def clear_workflow_cache():
+    workflow_cache.invalidate()
@@ -6,6 +6,7 @@ import frappe
 from frappe import _
 import json
 from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+    get_activity_page,
     log_issue_activity,
 )
 
@@ -166,8 +167,8 @@ def get_project_overview(project):
     # Issue statistics
     total_issues = frappe.db.count('Task', {'project': project, 'is_agile': 1})
     
-    done_statuses = [s.name for s in frappe.get_all('Agile Issue Status',
-        filters={'status_category': 'Done'}, fields=['name'])]
+    from erpnext_agile.agile_metadata import get_done_statuses
+    done_statuses = get_done_statuses()
     
     completed_issues = frappe.db.count('Task', {
         'project': project,
@@ -274,16 +275,30 @@ def get_user_dashboard():
 
 
 @frappe.whitelist()
-def get_issue_activity(task_name, limit=50):
-    """Get activity timeline for an issue"""
-    activities = frappe.get_all('Agile Issue Activity',
-        filters={'issue': task_name},
-        fields=['name', 'activity_type', 'user', 'timestamp', 'data', 'comment'],
-        order_by='timestamp desc',
-        limit=limit
-    )
+def get_issue_activity(task_name, limit=50, cursor=None):
+    """Get activity timeline for an issue (newest first, archived entries included)"""
+    frappe.has_permission('Task', 'read', task_name, throw=True)
+    return get_activity_page('issue', task_name, cursor, limit)['activities']
+
+
+@frappe.whitelist()
+def get_issue_activity_page(task_name, cursor=None, page_length=50):
+    """Keyset-paginated activity timeline for an issue"""
+    frappe.has_permission('Task', 'read', task_name, throw=True)
+    return get_activity_page('issue', task_name, cursor, page_length)
+
+
+@frappe.whitelist()
+def get_project_activity(project, cursor=None, page_length=50):
+    """Keyset-paginated activity stream across the issues of a project the user can read"""
+    frappe.has_permission('Project', 'read', project, throw=True)
+    page = get_activity_page('project', project, cursor, page_length)
     
-    return activities
+    # Project access does not imply access to every issue; a page may come back short
+    from erpnext_agile.agile_permissions import filter_permitted as filter_permitted_names
+    permitted = set(filter_permitted_names('Task', [row.issue for row in page['activities']], 'read'))
+    page['activities'] = [row for row in page['activities'] if row.issue in permitted]
+    return page
 
 
 # ====================
@@ -292,20 +307,16 @@ def get_issue_activity(task_name, limit=50):
 
 def is_valid_transition(project, from_status, to_status):
     """Check if status transition is valid based on workflow"""
+    from erpnext_agile.agile_workflow_graph import get_workflow
+    
     # Get workflow scheme from project
-    workflow_scheme = frappe.db.get_value("Project", project, "workflow_scheme")
+    workflow = get_workflow(frappe.get_cached_value("Project", project, "workflow_scheme"))
     
-    if not workflow_scheme:
+    if not workflow:
         return True  # No workflow restriction
     
     # Check if transition exists in workflow
-    transition = frappe.db.exists("Agile Workflow Transition", {
-        "parent": workflow_scheme,
-        "from_status": from_status,
-        "to_status": to_status
-    })
-    
-    return bool(transition)
+    return bool(workflow.get_edge(from_status, to_status))
 
 
 def format_seconds(seconds):
@@ -431,23 +442,14 @@ def complete_sprint(sprint_name):
 
 @frappe.whitelist()
 def add_issues_to_sprint(sprint_name, issue_keys):
-    """Add issues to sprint"""
+    """Add issues to sprint, moving them out of any other sprint"""
     if isinstance(issue_keys, str):
         issue_keys = json.loads(issue_keys)
     
-    added = 0
+    from erpnext_agile.agile_sprint_membership import AgileSprintMembership
+    added = AgileSprintMembership().add(sprint_name, issue_keys=issue_keys, allow_move=True)
     
-    for issue_key in issue_keys:
-        task = frappe.db.get_value("Task", {"issue_key": issue_key}, "name")
-        if task:
-            task_doc = frappe.get_doc("Task", task)
-            task_doc.current_sprint = sprint_name
-            task_doc.save()
-            
-            # Activity is automatically logged by handle_issue_activity_update()
-            added += 1
-    
-    return {"success": True, "added": added}
+    return {"success": True, "added": len(added)}
 
 
 @frappe.whitelist()
@@ -456,19 +458,10 @@ def remove_issues_from_sprint(sprint_name, issue_keys):
     if isinstance(issue_keys, str):
         issue_keys = json.loads(issue_keys)
     
-    removed = 0
+    from erpnext_agile.agile_sprint_membership import AgileSprintMembership
+    removed = AgileSprintMembership().remove(sprint_name, issue_keys=issue_keys)
     
-    for issue_key in issue_keys:
-        task = frappe.db.get_value("Task", {"issue_key": issue_key}, "name")
-        if task:
-            task_doc = frappe.get_doc("Task", task)
-            task_doc.current_sprint = None
-            task_doc.save()
-            
-            # Activity is automatically logged by handle_issue_activity_update()
-            removed += 1
-    
-    return {"success": True, "removed": removed}
+    return {"success": True, "removed": len(removed)}
 
 
 @frappe.whitelist()
@@ -486,6 +479,16 @@ def get_sprint_burndown(sprint_name):
     manager = AgileSprintManager()
     return manager.get_sprint_burndown(sprint_name)
 
+@frappe.whitelist()
+def get_delivery_forecast(project, release=None, remaining_points=None, confidence_levels=None, simulations=None):
+    """Monte Carlo forecast of when the backlog (or a release) is done and how much fits in the next sprint"""
+    frappe.has_permission('Project', 'read', project, throw=True)
+    if release:
+        frappe.has_permission('Agile Release Version', 'read', release, throw=True)
+    
+    from erpnext_agile.agile_forecast import AgileDeliveryForecast
+    return AgileDeliveryForecast(project, release, simulations, confidence_levels).get_forecast(remaining_points)
+
 # ====================
 # BACKLOG MANAGEMENT
 # ====================
@@ -557,11 +560,36 @@ def get_backlog_metrics(project):
 # ====================
 
 @frappe.whitelist()
-def get_board_data(project, sprint=None, view_type='sprint'):
+def get_board_data(project, sprint=None, view_type='sprint', filters=None, start=0, page_length=None):
     """Get board data for Kanban/Scrum board"""
+    if isinstance(filters, str):
+        filters = json.loads(filters) if filters else {}
+    
     from erpnext_agile.agile_board_manager import AgileBoardManager
     manager = AgileBoardManager(project, sprint)
-    return manager.get_board_data(project, sprint, view_type)
+    return manager.get_board_data(project, sprint, view_type, filters, start, page_length)
+
+
+@frappe.whitelist()
+def get_board_column(project, status, sprint=None, view_type='sprint', filters=None, cursor=None, page_length=50):
+    """Get the next page of one board column"""
+    if isinstance(filters, str):
+        filters = json.loads(filters) if filters else {}
+    
+    from erpnext_agile.agile_board_manager import AgileBoardManager
+    manager = AgileBoardManager(project, sprint)
+    return manager.get_board_column(project, status, sprint, view_type, filters, cursor, page_length)
+
+
+@frappe.whitelist()
+def get_board_changes(project, sprint=None, since_version=0, view_type='sprint', filters=None):
+    """Get board cards changed since a board version"""
+    if isinstance(filters, str):
+        filters = json.loads(filters) if filters else {}
+    
+    from erpnext_agile.agile_board_manager import AgileBoardManager
+    manager = AgileBoardManager(project, sprint)
+    return manager.get_board_changes(project, sprint, since_version, view_type, filters)
 
 
 @frappe.whitelist()
@@ -576,6 +604,38 @@ def move_issue(task_name, from_status, to_status, position=None):
     return {"success": True, "new_status": to_status}
 
 
+@frappe.whitelist()
+def bulk_move_issues(to_status, issue_keys=None, task_names=None, comment=None):
+    """Move several issues to a status in one batch (multi-select board actions)"""
+    if isinstance(issue_keys, str):
+        issue_keys = json.loads(issue_keys)
+    if isinstance(task_names, str):
+        task_names = json.loads(task_names)
+    
+    from erpnext_agile.agile_bulk_transition import AgileBulkTransition
+    return AgileBulkTransition(to_status, comment).run(task_names=task_names, issue_keys=issue_keys)
+
+
+@frappe.whitelist()
+def get_board_transitions(task_names):
+    """Allowed transitions for every card on a board, evaluated in one pass"""
+    if isinstance(task_names, str):
+        task_names = json.loads(task_names)
+    
+    from erpnext_agile.agile_workflow_graph import get_transitions_for_tasks
+    return get_transitions_for_tasks(task_names)
+
+
+@frappe.whitelist()
+def filter_permitted(doctype, names, ptype='read'):
+    """Names of the documents the current user may access, checked in one pass"""
+    if isinstance(names, str):
+        names = json.loads(names)
+    
+    from erpnext_agile.agile_permissions import filter_permitted as filter_permitted_names
+    return filter_permitted_names(doctype, names, ptype)
+
+
 @frappe.whitelist()
 def quick_create_issue(project, status, issue_data):
     """Quick create issue from board"""
@@ -591,30 +651,85 @@ def quick_create_issue(project, status, issue_data):
 
 
 @frappe.whitelist()
-def get_board_metrics(project, sprint=None):
+def get_board_metrics(project, sprint=None, filters=None):
     """Get board metrics"""
+    if isinstance(filters, str):
+        filters = json.loads(filters) if filters else {}
+    
     from erpnext_agile.agile_board_manager import AgileBoardManager
     manager = AgileBoardManager()
-    return manager.get_board_metrics(project, sprint)
+    return manager.get_board_metrics(project, sprint, filters)
 
 
 @frappe.whitelist()
-def filter_board(project, sprint=None, filters=None):
+def filter_board(project, sprint=None, filters=None, start=0, page_length=None):
     """Filter board by criteria"""
     if isinstance(filters, str):
         filters = json.loads(filters)
     
     from erpnext_agile.agile_board_manager import AgileBoardManager
     manager = AgileBoardManager()
-    return manager.filter_board(project, sprint, filters)
+    return manager.filter_board(project, sprint, filters, start, page_length)
 
 
 @frappe.whitelist()
-def get_swimlane_data(project, sprint=None, swimlane_by='issue_type'):
+def get_swimlane_data(project, sprint=None, swimlane_by='issue_type', filters=None, start=0, page_length=None):
     """Get swimlane data"""
+    if isinstance(filters, str):
+        filters = json.loads(filters) if filters else {}
+    
     from erpnext_agile.agile_board_manager import AgileBoardManager
     manager = AgileBoardManager()
-    return manager.get_swimlane_data(project, sprint, swimlane_by)
+    return manager.get_swimlane_data(project, sprint, swimlane_by, filters, start, page_length)
+
+
+@frappe.whitelist()
+def get_flow_metrics(project=None, sprint=None, from_date=None, to_date=None):
+    """Get cycle time, lead time, throughput and time in status"""
+    project = check_flow_permission(project, sprint)
+    
+    from erpnext_agile.agile_flow_metrics import AgileFlowMetrics
+    return AgileFlowMetrics(project, sprint, from_date, to_date).get_flow_metrics()
+
+
+def check_flow_permission(project=None, sprint=None):
+    """
+    Check read access to the scope of a flow query, returning its project.
+    
+    A sprint scopes the query to its project; a given project must match it.
+    Metrics across all projects are limited to Projects Managers.
+    """
+    if sprint:
+        sprint_project = frappe.db.get_value('Agile Sprint', sprint, 'project')
+        if not sprint_project or (project and project != sprint_project):
+            frappe.throw(_("Sprint {0} does not belong to project {1}").format(sprint, project or ''))
+        project = sprint_project
+    
+    if project:
+        frappe.has_permission('Project', 'read', project, throw=True)
+    else:
+        frappe.only_for('Projects Manager')
+    return project
+
+
+@frappe.whitelist()
+def get_cumulative_flow(project, sprint=None, start=None, end=None, bucket='day'):
+    """Get cumulative flow diagram data (issues per status category over time)"""
+    if not project:
+        frappe.throw(_("Project is required"))
+    check_flow_permission(project, sprint)
+    
+    if sprint and not (start and end):
+        sprint_dates = frappe.db.get_value('Agile Sprint', sprint, ['start_date', 'end_date'], as_dict=True)
+        start = start or sprint_dates.start_date
+        end = end or sprint_dates.end_date
+    
+    end = end or frappe.utils.today()
+    start = start or frappe.utils.add_days(end, -30)
+    
+    from erpnext_agile.agile_flow_metrics import AgileFlowMetrics
+    return AgileFlowMetrics(project, sprint).get_cumulative_flow(start, end, bucket)
+
 
 # ====================
 # TIME TRACKING
@@ -745,15 +860,8 @@ def move_tasks_to_sprint(current_sprint, target_sprint, issues_to_move):
         frappe.throw(frappe._("The selected target sprint ({0}) does not exist.").format(target_sprint))
 
     
-    moved_count = 0
-    
-    for issue_name in issues_to_move:
-        frappe.db.set_value("Task", issue_name, "current_sprint", target_sprint)
-        moved_count += 1
-    
-    current_sprint_doc = frappe.get_doc("Agile Sprint", current_sprint)
-    current_sprint_doc.calculate_metrics()
-
-    # Commit the changes to the database
+    from erpnext_agile.agile_sprint_membership import AgileSprintMembership
+    moved = AgileSprintMembership().add(target_sprint, task_names=issues_to_move, allow_move=True)
+    moved_count = len(moved)
 
     return {"status": "success", "moved_count": moved_count}
\ No newline at end of file
@@ -0,0 +1,77 @@
+# erpnext_agile/commands.py
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("agile-profile-task-saves")
+@click.option("--count", default=20, help="Number of recently modified agile tasks to save")
+@click.option("--project", help="Only use tasks of this project")
+@pass_context
+def profile_task_saves(context, count, project=None):
+    """Save agile tasks with the save-path profiler on and print the per-hook breakdown (changes are rolled back)"""
+    import frappe
+
+    from erpnext_agile.agile_save_profiler import run_benchmark
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        rows = run_benchmark(count, project)
+    finally:
+        frappe.destroy()
+
+    click.echo(f"{'Hook':<50} {'Calls':>6} {'Total ms':>10} {'Avg ms':>9} {'Queries':>8} {'Avg q':>7}")
+    for row in rows:
+        click.echo(
+            f"{row.hook:<50} {row.calls:>6} {row.total_ms:>10.1f} {row.avg_ms:>9.1f} "
+            f"{row.queries:>8} {row.avg_queries:>7.1f}"
+        )
+
+
+@click.command("agile-rebuild-subtask-counters")
+@click.option("--project", help="Only rebuild parents of this project")
+@pass_context
+def rebuild_subtask_counters(context, project=None):
+    """Recompute parent issues' subtask counters and progress from their children"""
+    import frappe
+
+    from erpnext_agile.agile_subtask_progress import rebuild_subtask_counters as rebuild
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        corrected = rebuild(project)
+    finally:
+        frappe.destroy()
+
+    click.echo(f"Corrected subtask counters of {corrected} parent issue(s)")
+
+
+@click.command("agile-benchmark-task-visibility")
+@click.option("--tasks", default=1000000, help="Number of synthetic tasks")
+@click.option("--projects", default=1000, help="Number of synthetic projects")
+@click.option("--users", default=200, help="Number of synthetic users")
+@click.option("--runs", default=5, help="Timed runs per variant")
+@pass_context
+def benchmark_task_visibility(context, tasks, projects, users, runs):
+    """Time the Task list view of a Projects User with the old and the materialized permission query (data is rolled back)"""
+    import frappe
+
+    from erpnext_agile.agile_visibility_benchmark import run_benchmark
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        results = run_benchmark(task_count=tasks, project_count=projects, user_count=users, runs=runs)
+    finally:
+        frappe.destroy()
+
+    click.echo(f"{'Conditions':<15} {'Median ms':>10} {'Best ms':>10}")
+    for variant, timing in results.items():
+        click.echo(f"{variant:<15} {timing['median_ms']:>10.1f} {timing['best_ms']:>10.1f}")
+
+
+commands = [profile_task_saves, rebuild_subtask_counters, benchmark_task_visibility]
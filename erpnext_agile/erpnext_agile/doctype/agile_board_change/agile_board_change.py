@@ -0,0 +1,198 @@
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, now_datetime
+
+# Task fields shown on a board card; a change to any of them updates the card
+CARD_FIELDS = (
+    'subject', 'issue_key', 'issue_type', 'issue_priority', 'story_points',
+    'reporter', 'github_issue_number', 'github_pr_number', 'backlog_rank'
+)
+
+
+class AgileBoardChange(Document):
+    pass
+
+
+def on_board(doc):
+    """Whether a task version is visible on its project board"""
+    return bool(doc and doc.project and doc.is_agile and doc.status != 'Cancelled')
+
+
+def record_task_board_changes(doc, deleted=False):
+    """Record the board changes caused by saving or deleting a task"""
+    old_doc = None if deleted else doc.get_doc_before_save()
+    was_on_board = on_board(doc) if deleted else on_board(old_doc)
+    is_on_board = False if deleted else on_board(doc)
+
+    if not was_on_board and not is_on_board:
+        return
+
+    changes = []
+    old_key = (old_doc.project, old_doc.current_sprint or None) if was_on_board and old_doc else None
+    new_key = (doc.project, doc.current_sprint or None)
+
+    if deleted:
+        changes.append(make_change(doc, 'removed', from_status=doc.issue_status))
+    elif not was_on_board:
+        changes.append(make_change(doc, 'added', to_status=doc.issue_status))
+    elif not is_on_board or old_key != new_key:
+        changes.append(make_change(old_doc, 'removed', from_status=old_doc.issue_status))
+        if is_on_board:
+            changes.append(make_change(doc, 'added', to_status=doc.issue_status))
+    elif old_doc.issue_status != doc.issue_status:
+        changes.append(make_change(
+            doc, 'moved', from_status=old_doc.issue_status, to_status=doc.issue_status
+        ))
+    elif card_changed(old_doc, doc):
+        changes.append(make_change(doc, 'updated', to_status=doc.issue_status))
+
+    record_board_changes(changes)
+
+
+def record_sprint_changes(task_names, from_sprint=None, to_sprint=None):
+    """Record removed/added changes for tasks moved between sprints with a direct update"""
+    if not task_names:
+        return
+
+    tasks = frappe.get_all('Task',
+        filters={'name': ['in', list(task_names)], 'is_agile': 1, 'status': ['!=', 'Cancelled']},
+        fields=['name', 'project', 'issue_status']
+    )
+
+    changes = []
+    for task in tasks:
+        if not task.project:
+            continue
+        changes.append({
+            'project': task.project, 'sprint': from_sprint or None, 'task': task.name,
+            'change_type': 'removed', 'from_status': task.issue_status, 'to_status': None
+        })
+        changes.append({
+            'project': task.project, 'sprint': to_sprint or None, 'task': task.name,
+            'change_type': 'added', 'from_status': None, 'to_status': task.issue_status
+        })
+
+    record_board_changes(changes)
+
+
+def make_change(doc, change_type, from_status=None, to_status=None):
+    return {
+        'project': doc.project,
+        'sprint': doc.current_sprint or None,
+        'task': doc.name,
+        'change_type': change_type,
+        'from_status': from_status,
+        'to_status': to_status
+    }
+
+
+def card_changed(old_doc, doc):
+    """Whether any field rendered on the card differs between two versions"""
+    if any(old_doc.get(field) != doc.get(field) for field in CARD_FIELDS):
+        return True
+
+    old_users = [row.user for row in old_doc.get('assigned_to_users') or []]
+    new_users = [row.user for row in doc.get('assigned_to_users') or []]
+    return old_users != new_users
+
+
+def record_board_changes(changes):
+    """
+    Buffer board changes for the transaction and push a notification after commit.
+
+    The buffer is written before commit, when the transaction takes the next
+    version of each project board under a lock on its counter. The lock is
+    held until commit, so a version only becomes visible after every lower
+    one, and clients polling past it never miss a change that commits late.
+    """
+    if not changes:
+        return
+
+    buffer = getattr(frappe.local, 'agile_board_change_buffer', None)
+    if buffer is None:
+        buffer = frappe.local.agile_board_change_buffer = []
+        frappe.db.before_commit.add(flush_board_changes)
+        frappe.db.after_rollback.add(discard_board_changes)
+    buffer.extend(changes)
+
+    boards = {}
+    for change in changes:
+        boards.setdefault((change['project'], change['sprint']), set()).add(change['task'])
+
+    for (project, sprint), tasks in boards.items():
+        frappe.publish_realtime(
+            'agile_board_changed',
+            {'project': project, 'sprint': sprint, 'tasks': sorted(tasks)},
+            doctype='Project',
+            docname=project,
+            after_commit=True
+        )
+
+
+def flush_board_changes():
+    buffer = getattr(frappe.local, 'agile_board_change_buffer', None)
+    frappe.local.agile_board_change_buffer = None
+    if not buffer:
+        return
+
+    by_project = {}
+    for change in buffer:
+        by_project.setdefault(change['project'], []).append(change)
+
+    now = now_datetime()
+    user = frappe.session.user
+    values = []
+    # Lock the counters in a fixed order so concurrent commits cannot deadlock
+    for project in sorted(by_project):
+        version = take_board_version(project)
+        values.extend(
+            (c['project'], c['sprint'], c['task'], c['change_type'], c['from_status'],
+                c['to_status'], version, user, user, now, now)
+            for c in by_project[project]
+        )
+
+    frappe.db.bulk_insert(
+        'Agile Board Change',
+        fields=['project', 'sprint', 'task', 'change_type', 'from_status', 'to_status',
+            'board_version', 'owner', 'modified_by', 'creation', 'modified'],
+        values=values
+    )
+
+
+def discard_board_changes():
+    frappe.local.agile_board_change_buffer = None
+
+
+def take_board_version(project):
+    """Increment a project's board version, holding its row lock until commit"""
+    key = get_board_version_key(project)
+    frappe.db.sql("""
+        INSERT IGNORE INTO `tabSeries` (`name`, `current`)
+        SELECT %(key)s, IFNULL(MAX(board_version), 0)
+        FROM `tabAgile Board Change` WHERE project = %(project)s
+    """, {'key': key, 'project': project})
+    frappe.db.sql("UPDATE `tabSeries` SET `current` = `current` + 1 WHERE `name` = %s", key)
+    return cint(frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s", key)[0][0])
+
+
+def get_board_version(project):
+    """Current version of a project board, i.e. the version of its latest committed changes"""
+    version = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s",
+        get_board_version_key(project))
+    if version:
+        return cint(version[0][0])
+
+    # No counter yet: changes logged before counters existed still carry versions
+    version = frappe.db.sql("""
+        SELECT MAX(board_version) FROM `tabAgile Board Change` WHERE project = %s
+    """, project)
+    return cint(version[0][0]) if version else 0
+
+
+def get_board_version_key(project):
+    return f"agile:board_version:{project}"
+
+
+def on_doctype_update():
+    frappe.db.add_index('Agile Board Change', ['project', 'sprint'])
+    frappe.db.add_index('Agile Board Change', ['project', 'board_version'])
@@ -12,28 +12,107 @@ class AgileIssueActivity(Document):
             self.user = frappe.session.user
 
 
+ACTIVITY_FIELDS = ['name', 'issue', 'project', 'activity_type', 'user', 'timestamp', 'data', 'comment',
+    'owner', 'modified_by', 'creation', 'modified']
+
+# Fields returned by the timeline endpoints
+TIMELINE_FIELDS = ['name', 'issue', 'project', 'activity_type', 'user', 'timestamp', 'data', 'comment']
+
+
 def log_issue_activity(issue, action, data=None, comment=None):
     """
     Helper function to log activity for an agile issue.
     
+    Entries are buffered and written in one insert when the transaction
+    commits (see buffer_activity).
+    
     Args:
         issue: Task document name
         action: Activity description (e.g., "created this issue", "set status to In Progress")
         data: Optional dict of additional data to store as JSON
         comment: Optional comment text
     """
-    activity_doc = frappe.get_doc({
-        "doctype": "Agile Issue Activity",
-        "issue": issue,
-        "activity_type": determine_activity_type(action),
-        "user": frappe.session.user,
-        "timestamp": frappe.utils.now_datetime(),
-        "data": json.dumps(data) if data else None,
-        "comment": comment
-    })
+    return buffer_activity(issue, determine_activity_type(action), data, comment)
+
+
+def buffer_activity(issue, activity_type, data=None, comment=None, project=None):
+    """
+    Queue an activity row for the current transaction.
+    
+    The row gets its name and timestamp now, so the timeline is the same as
+    with immediate inserts. The buffer is flushed as one multi-row insert
+    before commit (or enqueued when `agile_async_activity_log` is set in
+    site config) and dropped on rollback.
+    """
+    now = frappe.utils.now_datetime()
+    user = frappe.session.user
+    row = frappe._dict(
+        name=frappe.generate_hash(length=10),
+        issue=issue,
+        project=project,
+        activity_type=activity_type,
+        user=user,
+        timestamp=now,
+        data=json.dumps(data) if data else None,
+        comment=comment,
+        owner=user,
+        modified_by=user,
+        creation=now,
+        modified=now
+    )
+    
+    buffer = getattr(frappe.local, 'agile_activity_buffer', None)
+    if buffer is None:
+        buffer = frappe.local.agile_activity_buffer = []
+        frappe.db.before_commit.add(flush_activity_buffer)
+        frappe.db.after_rollback.add(discard_activity_buffer)
     
-    activity_doc.insert(ignore_permissions=True)
-    return activity_doc
+    buffer.append(row)
+    return row
+
+
+def flush_activity_buffer():
+    """Write buffered activities now (also call before reading the timeline)"""
+    buffer = getattr(frappe.local, 'agile_activity_buffer', None)
+    frappe.local.agile_activity_buffer = None
+    if not buffer:
+        return
+    
+    missing = {row.issue for row in buffer if not row.project}
+    if missing:
+        projects = dict(frappe.get_all('Task',
+            filters={'name': ['in', list(missing)]},
+            fields=['name', 'project'],
+            as_list=True
+        ))
+        for row in buffer:
+            row.project = row.project or projects.get(row.issue)
+    
+    rows = [[row[field] for field in ACTIVITY_FIELDS] for row in buffer]
+    if frappe.conf.get('agile_async_activity_log') and not frappe.flags.in_test:
+        frappe.enqueue(
+            'erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity.insert_activity_rows',
+            queue='short',
+            rows=rows,
+            enqueue_after_commit=True
+        )
+    else:
+        insert_activity_rows(rows)
+
+
+def discard_activity_buffer():
+    frappe.local.agile_activity_buffer = None
+
+
+def discard_issue_activity(issue):
+    """Drop buffered rows of an issue that is being deleted"""
+    buffer = getattr(frappe.local, 'agile_activity_buffer', None)
+    if buffer:
+        buffer[:] = [row for row in buffer if row.issue != issue]
+
+
+def insert_activity_rows(rows):
+    frappe.db.bulk_insert('Agile Issue Activity', fields=ACTIVITY_FIELDS, values=rows)
 
 
 def determine_activity_type(action):
@@ -65,4 +144,66 @@ def determine_activity_type(action):
     elif "priority" in action_lower:
         return "status_changed"
     else:
-        return "commented"
\ No newline at end of file
+        return "commented"
+
+
+def get_activity_page(field, value, cursor=None, page_length=50):
+    """
+    One page of the activity of an issue or project, newest first.
+    
+    Keyset pagination on (timestamp, name) over the (field, timestamp, name)
+    index, so every page costs the same however deep it is. When the hot
+    table runs out, the page continues from the archive.
+    
+    Args:
+        field: 'issue' or 'project'
+        value: Issue or project name
+        cursor: next_cursor of the previous page
+        page_length: Rows per page
+    
+    Returns:
+        Dict with `activities` and `next_cursor` (None on the last page)
+    """
+    from erpnext_agile.erpnext_agile.doctype.agile_issue_activity_archive.agile_issue_activity_archive import (
+        get_archived_activities,
+    )
+    
+    if field not in ('issue', 'project'):
+        frappe.throw(frappe._("Invalid activity stream"))
+    
+    flush_activity_buffer()
+    page_length = frappe.utils.cint(page_length) or 50
+    cursor = frappe.parse_json(cursor) if isinstance(cursor, str) else cursor
+    
+    conditions = [f"`{field}` = %(value)s"]
+    values = {'value': value, 'limit': page_length + 1}
+    if cursor:
+        conditions.append("(`timestamp` < %(timestamp)s OR (`timestamp` = %(timestamp)s AND `name` < %(name)s))")
+        values.update(timestamp=cursor[0], name=cursor[1])
+    
+    fields = ', '.join(f"`{fieldname}`" for fieldname in TIMELINE_FIELDS)
+    activities = frappe.db.sql(f"""
+        SELECT {fields}
+        FROM `tabAgile Issue Activity`
+        WHERE {' AND '.join(conditions)}
+        ORDER BY `timestamp` DESC, `name` DESC
+        LIMIT %(limit)s
+    """, values, as_dict=True)
+    
+    if len(activities) <= page_length:
+        before = (activities[-1].timestamp, activities[-1].name) if activities else cursor
+        activities += get_archived_activities(field, value, before, page_length + 1 - len(activities))
+    
+    next_cursor = None
+    if len(activities) > page_length:
+        activities = activities[:page_length]
+        next_cursor = [str(activities[-1].timestamp), activities[-1].name]
+    
+    return {'activities': activities, 'next_cursor': next_cursor}
+
+
+def on_doctype_update():
+    frappe.db.add_index('Agile Issue Activity', ['issue', 'timestamp', 'name'])
+    frappe.db.add_index('Agile Issue Activity', ['project', 'timestamp', 'name'])
+    # Used by the archive job
+    frappe.db.add_index('Agile Issue Activity', ['timestamp'])
@@ -0,0 +1,127 @@
+import base64
+import json
+import zlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_months, cint, get_datetime, now_datetime
+
+from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+    TIMELINE_FIELDS,
+)
+
+# Activity older than this many months leaves the hot table
+DEFAULT_ARCHIVE_MONTHS = 12
+BATCH_SIZE = 5000
+CHUNK_SIZE = 500
+ARCHIVE_FIELDS = ['name', 'issue', 'project', 'activity_count', 'from_timestamp', 'to_timestamp',
+    'payload', 'owner', 'modified_by', 'creation', 'modified']
+
+
+class AgileIssueActivityArchive(Document):
+    def get_activities(self):
+        return unpack_activities(self.payload)
+
+
+def pack_activities(rows):
+    return base64.b64encode(zlib.compress(json.dumps(rows, default=str).encode())).decode()
+
+
+def unpack_activities(payload):
+    rows = [frappe._dict(row) for row in json.loads(zlib.decompress(base64.b64decode(payload)))]
+    for row in rows:
+        row.timestamp = get_datetime(row.timestamp)
+    return rows
+
+
+def archive_old_activity():
+    """Scheduler job: move old activity into compressed per-issue chunks"""
+    months = cint(frappe.conf.get('agile_activity_archive_months') or DEFAULT_ARCHIVE_MONTHS)
+    cutoff = add_months(now_datetime(), -months)
+    fields = ', '.join(f"`{fieldname}`" for fieldname in TIMELINE_FIELDS)
+
+    while True:
+        rows = frappe.db.sql(f"""
+            SELECT {fields}
+            FROM `tabAgile Issue Activity`
+            WHERE `timestamp` < %(cutoff)s
+            ORDER BY `timestamp`, `name`
+            LIMIT %(limit)s
+        """, {'cutoff': cutoff, 'limit': BATCH_SIZE}, as_dict=True)
+
+        if not rows:
+            break
+
+        archive_rows(rows)
+        frappe.db.commit()
+
+
+def archive_rows(rows):
+    by_issue = {}
+    for row in rows:
+        by_issue.setdefault(row.issue, []).append(row)
+
+    now = now_datetime()
+    chunks = []
+    for issue, issue_rows in by_issue.items():
+        for start in range(0, len(issue_rows), CHUNK_SIZE):
+            chunk = issue_rows[start:start + CHUNK_SIZE]
+            chunks.append((
+                frappe.generate_hash(length=10),
+                issue,
+                chunk[-1].project,
+                len(chunk),
+                chunk[0].timestamp,
+                chunk[-1].timestamp,
+                pack_activities(chunk),
+                'Administrator',
+                'Administrator',
+                now,
+                now
+            ))
+
+    frappe.db.bulk_insert('Agile Issue Activity Archive', fields=ARCHIVE_FIELDS, values=chunks)
+    frappe.db.sql("""
+        DELETE FROM `tabAgile Issue Activity` WHERE name IN %(names)s
+    """, {'names': tuple(row.name for row in rows)})
+
+
+def get_archived_activities(field, value, before=None, limit=50):
+    """
+    Newest archived activity of an issue or project older than `before`.
+
+    Chunks are read newest first; reading stops once no remaining chunk can
+    hold a row newer than the oldest row already collected.
+    """
+    if limit <= 0:
+        return []
+
+    before_key = (get_datetime(before[0]), before[1]) if before else None
+    conditions = [f"`{field}` = %(value)s"]
+    values = {'value': value}
+    if before_key:
+        conditions.append("`from_timestamp` <= %(before)s")
+        values['before'] = before_key[0]
+
+    collected = []
+    for chunk in frappe.db.sql(f"""
+        SELECT `to_timestamp`, `payload`
+        FROM `tabAgile Issue Activity Archive`
+        WHERE {' AND '.join(conditions)}
+        ORDER BY `to_timestamp` DESC
+    """, values, as_dict=True, as_iterator=True):
+        if len(collected) >= limit and get_datetime(chunk.to_timestamp) < collected[limit - 1].timestamp:
+            break
+
+        collected.extend(
+            row for row in unpack_activities(chunk.payload)
+            if not before_key or (row.timestamp, row.name) < before_key
+        )
+        collected.sort(key=lambda row: (row.timestamp, row.name), reverse=True)
+
+    return collected[:limit]
+
+
+def on_doctype_update():
+    frappe.db.add_index('Agile Issue Activity Archive', ['issue', 'to_timestamp'])
+    frappe.db.add_index('Agile Issue Activity Archive', ['project', 'to_timestamp'])
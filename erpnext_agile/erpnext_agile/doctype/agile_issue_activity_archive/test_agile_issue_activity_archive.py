@@ -0,0 +1,9 @@
+# Copyright (c) 2025, Yanky and Contributors
+# See license.txt
+
+# import frappe
+from frappe.tests.utils import FrappeTestCase
+
+
+class TestAgileIssueActivityArchive(FrappeTestCase):
+	pass
@@ -5,4 +5,16 @@ class AgileIssuePriority(Document):
     def validate(self):
         """Validate priority configuration"""
         if not self.priority_name:
-            frappe.throw("Priority Name is mandatory")
\ No newline at end of file
+            frappe.throw("Priority Name is mandatory")
+
+    def on_update(self):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
+    
+    def on_trash(self):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
+    
+    def after_rename(self, old_name, new_name, merge=False):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
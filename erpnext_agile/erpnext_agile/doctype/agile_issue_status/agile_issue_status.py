@@ -14,3 +14,15 @@ class AgileIssueStatus(Document):
         })
         if existing:
             frappe.throw(f"Status name '{self.status_name}' already exists")
+
+    def on_update(self):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
+    
+    def on_trash(self):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
+    
+    def after_rename(self, old_name, new_name, merge=False):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
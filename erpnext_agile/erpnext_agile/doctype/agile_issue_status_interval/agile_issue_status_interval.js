@@ -0,0 +1,8 @@
+// Copyright (c) 2025, Yanky and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Agile Issue Status Interval", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,75 @@
+import frappe
+from frappe.model.document import Document
+from frappe.utils import now_datetime
+
+
+class AgileIssueStatusInterval(Document):
+    pass
+
+
+def record_status_interval(doc, at=None):
+    """Close the open interval of an issue and open one for its current status"""
+    record_status_intervals([{
+        'issue': doc.name,
+        'project': doc.project,
+        'sprint': doc.current_sprint,
+        'status': doc.issue_status
+    }], at)
+
+
+def record_status_intervals(issues, at=None):
+    """Batch version of record_status_interval for issues entering a new status"""
+    issues = [issue for issue in issues if issue.get('status')]
+    if not issues:
+        return
+
+    at = at or now_datetime()
+    close_open_intervals([issue['issue'] for issue in issues], at)
+
+    user = frappe.session.user
+    categories = get_status_categories({issue['status'] for issue in issues})
+    frappe.db.bulk_insert(
+        'Agile Issue Status Interval',
+        fields=['name', 'issue', 'project', 'sprint', 'status', 'status_category',
+            'entered_at', 'owner', 'modified_by', 'creation', 'modified'],
+        values=[(
+            frappe.generate_hash(length=10),
+            issue['issue'],
+            issue.get('project'),
+            issue.get('sprint') or None,
+            issue['status'],
+            categories.get(issue['status']),
+            issue.get('entered_at') or at,
+            user,
+            user,
+            at,
+            at
+        ) for issue in issues]
+    )
+
+
+def close_open_intervals(issue_names, at):
+    """Stamp left_at and duration on the open interval of each issue"""
+    if not issue_names:
+        return
+
+    frappe.db.sql("""
+        UPDATE `tabAgile Issue Status Interval`
+        SET left_at = %(at)s, duration = TIMESTAMPDIFF(SECOND, entered_at, %(at)s)
+        WHERE issue IN %(issues)s AND left_at IS NULL
+    """, {'at': at, 'issues': tuple(issue_names)})
+
+
+def get_status_categories(statuses):
+    from erpnext_agile.agile_metadata import get_status_category
+    return {status: get_status_category(status) for status in statuses}
+
+
+def on_doctype_update():
+    frappe.db.add_index('Agile Issue Status Interval', ['issue', 'status_category', 'entered_at'])
+    frappe.db.add_index('Agile Issue Status Interval', ['project', 'status_category', 'entered_at'])
+    frappe.db.add_index('Agile Issue Status Interval', ['sprint', 'status_category', 'entered_at'])
+    frappe.db.add_index('Agile Issue Status Interval', ['project', 'entered_at'])
+    frappe.db.add_index('Agile Issue Status Interval', ['project', 'left_at'])
+    frappe.db.add_index('Agile Issue Status Interval', ['sprint', 'entered_at'])
+    frappe.db.add_index('Agile Issue Status Interval', ['sprint', 'left_at'])
@@ -5,4 +5,16 @@ class AgileIssueType(Document):
     def validate(self):
         """Validate issue type configuration"""
         if not self.issue_type_name:
-            frappe.throw("Issue Type Name is mandatory")
\ No newline at end of file
+            frappe.throw("Issue Type Name is mandatory")
+
+    def on_update(self):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
+    
+    def on_trash(self):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
+    
+    def after_rename(self, old_name, new_name, merge=False):
+        from erpnext_agile.agile_metadata import clear_metadata_cache
+        clear_metadata_cache()
@@ -0,0 +1,163 @@
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import add_days, add_to_date, cint, escape_html, get_url, now_datetime
+
+# Minutes a recipient's first queued event waits for others before the digest goes out
+DEFAULT_DIGEST_WINDOW = 10
+QUEUE_FIELDS = ['name', 'recipient', 'project', 'event_type', 'reference_doctype', 'reference_name',
+    'subject', 'message', 'dedupe_key', 'status', 'owner', 'modified_by', 'creation', 'modified']
+
+
+class AgileNotification(Document):
+    pass
+
+
+def queue_notification(recipients, event_type, subject, message, project=None,
+        reference_doctype=None, reference_name=None, notify_self=False):
+    """Queue one event for several recipients; sent later as part of a digest
+
+    Rows are buffered for the transaction and written before commit. An
+    identical event (same document, type and message) already queued for a
+    recipient is not queued again.
+    """
+    recipients = {recipient for recipient in recipients or [] if recipient}
+    if not notify_self:
+        recipients.discard(frappe.session.user)
+    if not recipients:
+        return
+
+    dedupe_key = hashlib.md5(
+        '|'.join([reference_doctype or '', reference_name or '', event_type, message]).encode()
+    ).hexdigest()
+
+    buffer = getattr(frappe.local, 'agile_notification_buffer', None)
+    if buffer is None:
+        buffer = frappe.local.agile_notification_buffer = {}
+        frappe.db.before_commit.add(flush_notification_buffer)
+        frappe.db.after_rollback.add(discard_notification_buffer)
+
+    for recipient in recipients:
+        buffer.setdefault((recipient, dedupe_key), frappe._dict(
+            recipient=recipient,
+            project=project,
+            event_type=event_type,
+            reference_doctype=reference_doctype,
+            reference_name=reference_name,
+            subject=subject,
+            message=message,
+            dedupe_key=dedupe_key
+        ))
+
+
+def flush_notification_buffer():
+    buffer = getattr(frappe.local, 'agile_notification_buffer', None)
+    frappe.local.agile_notification_buffer = None
+    if not buffer:
+        return
+
+    already_queued = set(frappe.db.sql("""
+        SELECT recipient, dedupe_key FROM `tabAgile Notification`
+        WHERE status = 'Queued' AND dedupe_key IN %(keys)s
+    """, {'keys': tuple({key for recipient, key in buffer})}))
+
+    now = now_datetime()
+    user = frappe.session.user
+    rows = [row for key, row in buffer.items() if key not in already_queued]
+    if not rows:
+        return
+
+    frappe.db.bulk_insert('Agile Notification', fields=QUEUE_FIELDS, values=[(
+        frappe.generate_hash(length=10),
+        row.recipient,
+        row.project,
+        row.event_type,
+        row.reference_doctype,
+        row.reference_name,
+        row.subject,
+        row.message,
+        row.dedupe_key,
+        'Queued',
+        user,
+        user,
+        now,
+        now
+    ) for row in rows])
+
+
+def discard_notification_buffer():
+    frappe.local.agile_notification_buffer = None
+
+
+def send_notification_digests():
+    """Scheduler job: one email per recipient whose oldest queued event left the window"""
+    window = cint(frappe.conf.get('agile_notification_digest_minutes') or DEFAULT_DIGEST_WINDOW)
+    cutoff = add_to_date(now_datetime(), minutes=-window)
+
+    recipients = frappe.db.sql("""
+        SELECT recipient FROM `tabAgile Notification`
+        WHERE status = 'Queued'
+        GROUP BY recipient
+        HAVING MIN(creation) <= %(cutoff)s
+    """, {'cutoff': cutoff}, pluck=True)
+
+    for recipient in recipients:
+        send_digest(recipient)
+        frappe.db.commit()
+
+
+def send_digest(recipient):
+    events = frappe.get_all('Agile Notification',
+        filters={'recipient': recipient, 'status': 'Queued'},
+        fields=['name', 'project', 'subject', 'message'],
+        order_by='creation asc'
+    )
+    if not events:
+        return
+
+    status = 'Sent'
+    try:
+        frappe.sendmail(
+            recipients=[recipient],
+            subject=events[0].subject if len(events) == 1
+                else _("{0} agile updates").format(len(events)),
+            message=render_digest(events)
+        )
+    except Exception as e:
+        status = 'Failed'
+        frappe.log_error(f"Failed to send notification digest to {recipient}: {str(e)}")
+
+    frappe.db.sql("""
+        UPDATE `tabAgile Notification` SET status = %(status)s, sent_on = %(now)s, modified = %(now)s
+        WHERE name IN %(names)s
+    """, {'status': status, 'now': now_datetime(), 'names': tuple(event.name for event in events)})
+
+
+def render_digest(events):
+    """HTML body grouping the events by project, oldest first"""
+    by_project = {}
+    for event in events:
+        by_project.setdefault(event.project or '', []).append(event)
+
+    sections = []
+    for project, project_events in by_project.items():
+        heading = f"<h4>{escape_html(project)}</h4>" if project else ""
+        items = "".join(f"<li>{event.message}</li>" for event in project_events)
+        sections.append(f"{heading}<ul>{items}</ul>")
+
+    return "".join(sections) + f"<p><a href='{get_url()}/app/task'>{_('Open tasks')}</a></p>"
+
+
+def delete_old_notifications(days=30):
+    """Scheduler job: drop sent and failed notifications older than `days`"""
+    frappe.db.sql("""
+        DELETE FROM `tabAgile Notification`
+        WHERE status != 'Queued' AND creation < %(cutoff)s
+    """, {'cutoff': add_days(now_datetime(), -days)})
+
+
+def on_doctype_update():
+    frappe.db.add_index('Agile Notification', ['status', 'recipient', 'creation'])
+    frappe.db.add_index('Agile Notification', ['dedupe_key'])
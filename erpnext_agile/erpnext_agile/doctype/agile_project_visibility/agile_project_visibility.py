@@ -0,0 +1,101 @@
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, now_datetime
+
+from erpnext_agile.agile_permissions import clear_permission_context
+from erpnext_agile.erpnext_agile.doctype.agile_task_visibility.agile_task_visibility import (
+    get_visibility_name,
+)
+
+VISIBILITY_FIELDS = ['name', 'user', 'project', 'restricted', 'owner', 'modified_by', 'creation', 'modified']
+
+
+class AgileProjectVisibility(Document):
+    pass
+
+
+def update_project_visibility(doc, method=None):
+    """Project on_update: sync the project's users and its assignment based visibility flag"""
+    sync_project_visibility(doc.name, cint(doc.get('custom_enable_assignment_based_visibility')),
+        flag_changed=doc.has_value_changed('custom_enable_assignment_based_visibility'))
+
+
+def sync_project_visibility(project, restricted=None, flag_changed=None):
+    """Bring the (user, project) grants in line with the project's users"""
+    if restricted is None:
+        restricted = cint(frappe.db.get_value('Project', project, 'custom_enable_assignment_based_visibility'))
+
+    users = set(frappe.get_all('Project User',
+        filters={'parent': project, 'parenttype': 'Project'},
+        pluck='user'
+    )) - {None, ''}
+    existing = {row.user: row.restricted for row in frappe.get_all('Agile Project Visibility',
+        filters={'project': project},
+        fields=['user', 'restricted']
+    )}
+
+    if flag_changed is None:
+        flag_changed = bool(set(existing.values()) - {restricted})
+
+    if flag_changed:
+        # The flag also decides which task grants apply
+        for doctype in ('Agile Task Visibility', 'Agile Project Visibility'):
+            frappe.db.sql(f"""
+                UPDATE `tab{doctype}` SET restricted = %(restricted)s
+                WHERE project = %(project)s AND restricted != %(restricted)s
+            """, {'project': project, 'restricted': restricted})
+        existing = dict.fromkeys(existing, restricted)
+
+    removed = set(existing) - users
+    added = users - set(existing)
+    if flag_changed or removed or added:
+        clear_permission_context()
+
+    if removed:
+        frappe.db.delete('Agile Project Visibility', {'project': project, 'user': ['in', list(removed)]})
+
+    if added:
+        now = now_datetime()
+        frappe.db.bulk_insert('Agile Project Visibility', fields=VISIBILITY_FIELDS, values=[(
+            get_visibility_name(user, project),
+            user,
+            project,
+            restricted,
+            'Administrator',
+            'Administrator',
+            now,
+            now
+        ) for user in added], ignore_duplicates=True)
+
+
+def remove_project_visibility(doc, method=None):
+    """Project on_trash"""
+    frappe.db.delete('Agile Project Visibility', {'project': doc.name})
+
+
+def rename_project_visibility(doc, method=None, old=None, new=None, merge=False):
+    """Project after_rename: the rename rewrote tabTask.project, follow it in the grants"""
+    frappe.db.sql("""
+        UPDATE `tabAgile Task Visibility` SET project = %(new)s WHERE project = %(old)s
+    """, {'old': old, 'new': new})
+    frappe.db.delete('Agile Project Visibility', {'project': old})
+    sync_project_visibility(new)
+
+
+def rebuild_project_visibility():
+    """Recreate every project grant from the Project User tables"""
+    frappe.db.sql("DELETE FROM `tabAgile Project Visibility`")
+    frappe.db.sql("""
+        INSERT IGNORE INTO `tabAgile Project Visibility`
+            (name, user, project, restricted, owner, modified_by, creation, modified)
+        SELECT LEFT(SHA1(CONCAT(pu.user, '|', p.name)), 20), pu.user, p.name,
+            IFNULL(p.custom_enable_assignment_based_visibility, 0), 'Administrator', 'Administrator', NOW(), NOW()
+        FROM `tabProject User` pu
+        JOIN `tabProject` p ON p.name = pu.parent AND pu.parenttype = 'Project'
+        WHERE IFNULL(pu.user, '') != ''
+    """)
+
+
+def on_doctype_update():
+    frappe.db.add_index('Agile Project Visibility', ['user', 'project', 'restricted'])
+    frappe.db.add_index('Agile Project Visibility', ['project'])
@@ -16,6 +16,22 @@ class AgileSprint(Document):
         # Update sprint metrics
         if self.sprint_state == 'Active':
             self.calculate_metrics()
+        self.bump_report_versions()
+    
+    def on_trash(self):
+        from erpnext_agile.agile_sprint_report import delete_sprint_report
+        delete_sprint_report(self.name)
+    
+    def bump_report_versions(self):
+        """Mark this sprint's report stale; completing it changes the team velocity of the open ones"""
+        from erpnext_agile.agile_sprint_report import bump_sprint_versions
+        sprints = [self.name]
+        if self.has_value_changed('sprint_state') and self.sprint_state == 'Completed':
+            sprints += frappe.get_all('Agile Sprint',
+                filters={'project': self.project, 'sprint_state': ['!=', 'Completed']},
+                pluck='name'
+            )
+        bump_sprint_versions(sprints)
     
     def calculate_metrics(self):
         """Calculate and update sprint metrics"""
@@ -23,11 +39,13 @@ class AgileSprint(Document):
         manager = AgileSprintManager()
         metrics = manager.calculate_sprint_metrics(self)
         
-        # Update fields without triggering another save
-        self.db_set('total_points', metrics['total_points'], update_modified=False)
-        self.db_set('completed_points', metrics['completed_points'], update_modified=False)
-        self.db_set('progress_percentage', metrics['progress_percentage'], update_modified=False)
-        self.db_set('velocity', metrics['velocity'], update_modified=False)
+        # Update fields in one statement without triggering another save
+        self.db_set({
+            'total_points': metrics['total_points'],
+            'completed_points': metrics['completed_points'],
+            'progress_percentage': metrics['progress_percentage'],
+            'velocity': metrics['velocity']
+        }, update_modified=False)
         
 @frappe.whitelist()
 def check_active_sprint(project, name):
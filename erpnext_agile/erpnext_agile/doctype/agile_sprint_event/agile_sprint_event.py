@@ -0,0 +1,126 @@
+import frappe
+from frappe.model.document import Document
+from frappe.utils import flt, now_datetime
+
+EVENT_FIELDS = ['sprint', 'task', 'event_type', 'timestamp', 'scope_delta', 'completed_delta',
+    'owner', 'modified_by', 'creation', 'modified']
+
+
+class AgileSprintEvent(Document):
+    pass
+
+
+def get_contribution_events(task, old, new):
+    """
+    Events for a task whose sprint contribution moved from `old` to `new`.
+
+    Contributions are (sprint, points, completed points) tuples or None, as
+    returned by agile_sprint_metrics.get_task_contribution.
+    """
+    if old == new:
+        return []
+
+    if old and new and old[0] == new[0]:
+        scope_delta, completed_delta = new[1] - old[1], new[2] - old[2]
+        if scope_delta:
+            event_type = 'points_changed'
+        else:
+            event_type = 'completed' if completed_delta > 0 else 'reopened'
+        return [make_event(new[0], task, event_type, scope_delta, completed_delta)]
+
+    events = []
+    if old:
+        events.append(make_event(old[0], task, 'removed', -old[1], -old[2]))
+    if new:
+        events.append(make_event(new[0], task, 'added', new[1], new[2]))
+    return events
+
+
+def make_event(sprint, task, event_type, scope_delta=0, completed_delta=0):
+    return {
+        'sprint': sprint,
+        'task': task,
+        'event_type': event_type,
+        'scope_delta': flt(scope_delta),
+        'completed_delta': flt(completed_delta)
+    }
+
+
+def record_sprint_events(events, at=None):
+    """Append sprint events in one insert"""
+    events = [event for event in events if event['scope_delta'] or event['completed_delta']]
+    if not events:
+        return
+
+    at = at or now_datetime()
+    user = frappe.session.user
+    frappe.db.bulk_insert(
+        'Agile Sprint Event',
+        fields=EVENT_FIELDS,
+        values=[
+            (e['sprint'], e['task'], e['event_type'], e.get('timestamp') or at, e['scope_delta'],
+                e['completed_delta'], user, user, at, at)
+            for e in events
+        ]
+    )
+
+
+def get_logged_totals(sprints):
+    """{sprint: (scope, completed points)} summed over the whole event log"""
+    if not sprints:
+        return {}
+
+    return {row[0]: (flt(row[1]), flt(row[2])) for row in frappe.db.sql("""
+        SELECT sprint, SUM(scope_delta), SUM(completed_delta)
+        FROM `tabAgile Sprint Event`
+        WHERE sprint IN %(sprints)s
+        GROUP BY sprint
+    """, {'sprints': tuple(sprints)})}
+
+
+def backfill_sprint_events():
+    """
+    Seed the event log of sprints that have none from their current tasks.
+
+    Each task is logged as added when the sprint started (or when the task was
+    created, if later) and, if done, as completed on its completion date. This
+    approximates history that was never recorded; scope moved out of a sprint
+    before the log existed is not recoverable.
+    """
+    from erpnext_agile.agile_sprint_metrics import STORY_POINTS
+
+    sprints = frappe.db.sql_list("""
+        SELECT sp.name FROM `tabAgile Sprint` sp
+        WHERE NOT EXISTS (SELECT 1 FROM `tabAgile Sprint Event` e WHERE e.sprint = sp.name)
+    """)
+    if not sprints:
+        return
+
+    fields = ', '.join(f"`{field}`" for field in EVENT_FIELDS)
+    added_at = "GREATEST(TIMESTAMP(IFNULL(sp.actual_start_date, sp.start_date)), t.creation)"
+    source = f"""
+        FROM `tabTask` t
+        JOIN `tabAgile Sprint` sp ON sp.name = t.current_sprint
+        LEFT JOIN `tabAgile Issue Status` s ON s.name = t.issue_status
+        WHERE t.is_agile = 1 AND sp.name IN %(sprints)s AND {STORY_POINTS} != 0
+    """
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabAgile Sprint Event` ({fields})
+        SELECT sp.name, t.name, 'added', {added_at},
+            {STORY_POINTS}, 0, 'Administrator', 'Administrator', NOW(), NOW()
+        {source}
+    """, {'sprints': tuple(sprints)})
+    frappe.db.sql(f"""
+        INSERT INTO `tabAgile Sprint Event` ({fields})
+        SELECT sp.name, t.name, 'completed',
+            GREATEST(IFNULL(TIMESTAMP(t.completed_on), t.modified), {added_at}),
+            0, {STORY_POINTS}, 'Administrator', 'Administrator', NOW(), NOW()
+        {source}
+            AND s.status_category = 'Done'
+    """, {'sprints': tuple(sprints)})
+    frappe.db.commit()
+
+
+def on_doctype_update():
+    frappe.db.add_index('Agile Sprint Event', ['sprint', 'timestamp'])
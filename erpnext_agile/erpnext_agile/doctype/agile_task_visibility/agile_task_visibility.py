@@ -0,0 +1,119 @@
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, now_datetime
+
+from erpnext_agile.agile_permissions import clear_permission_context
+
+VISIBILITY_FIELDS = ['name', 'user', 'task', 'project', 'is_assignee', 'restricted',
+    'owner', 'modified_by', 'creation', 'modified']
+
+# (source, user column) of every task-level grant besides assignees
+GRANT_SOURCES = [
+    ("`tabAgile Issue Watcher` g JOIN `tabTask` t ON t.name = g.parent AND g.parenttype = 'Task'", 'g.user'),
+    ("`tabTask` t", 't.owner'),
+    ("`tabTask` t", 't.reporter'),
+    ("`tabTask` t", 't.custom_original_owner'),
+]
+
+
+class AgileTaskVisibility(Document):
+    pass
+
+
+def get_visibility_name(user, key):
+    """Deterministic name (SHA1 prefix, also computed in SQL), so a grant is stored once"""
+    return hashlib.sha1(f"{user}|{key}".encode()).hexdigest()[:20]
+
+
+def get_task_grants(doc):
+    """{user: is_assignee} of everyone who sees a task through its own fields"""
+    grants = {}
+    for user in (doc.get('owner'), doc.get('reporter'), doc.get('custom_original_owner')):
+        if user:
+            grants[user] = 0
+    for row in doc.get('watchers') or []:
+        if row.user:
+            grants[row.user] = 0
+    for row in doc.get('assigned_to_users') or []:
+        if row.user:
+            grants[row.user] = 1
+    return grants
+
+
+def is_restricted_project(project):
+    return cint(project and frappe.get_cached_value('Project', project,
+        'custom_enable_assignment_based_visibility'))
+
+
+def update_task_visibility(doc, method=None):
+    """Task on_update: bring the task's grants in line with its assignees, watchers and owners"""
+    project = doc.get('project') or None
+    restricted = is_restricted_project(project)
+    desired = {user: (project, is_assignee, restricted) for user, is_assignee in get_task_grants(doc).items()}
+
+    existing = {row.user: (row.project, row.is_assignee, row.restricted) for row in frappe.get_all(
+        'Agile Task Visibility',
+        filters={'task': doc.name},
+        fields=['user', 'project', 'is_assignee', 'restricted']
+    )}
+    if existing == desired:
+        return
+
+    frappe.db.delete('Agile Task Visibility', {'task': doc.name})
+    clear_permission_context()
+    if not desired:
+        return
+
+    now = now_datetime()
+    frappe.db.bulk_insert('Agile Task Visibility', fields=VISIBILITY_FIELDS, values=[(
+        get_visibility_name(user, doc.name),
+        user,
+        doc.name,
+        project,
+        is_assignee,
+        restricted,
+        'Administrator',
+        'Administrator',
+        now,
+        now
+    ) for user, (project, is_assignee, restricted) in desired.items()])
+
+
+def remove_task_visibility(doc, method=None):
+    """Task on_trash"""
+    frappe.db.delete('Agile Task Visibility', {'task': doc.name})
+
+
+def rename_task_visibility(doc, method=None, old=None, new=None, merge=False):
+    """Task after_rename: names are derived from the task, so re-create the grants"""
+    frappe.db.delete('Agile Task Visibility', {'task': old})
+    update_task_visibility(doc)
+
+
+def rebuild_task_visibility():
+    """Recreate every task grant from the tasks (install, patch and drift repair)"""
+    frappe.db.sql("DELETE FROM `tabAgile Task Visibility`")
+
+    # Assignees first: INSERT IGNORE then keeps their row when they also watch or own the task
+    sources = [("`tabAssigned To Users` g JOIN `tabTask` t ON t.name = g.parent AND g.parenttype = 'Task'",
+        'g.user', 1)] + [(source, user, 0) for source, user in GRANT_SOURCES]
+
+    for source, user, is_assignee in sources:
+        frappe.db.sql(f"""
+            INSERT IGNORE INTO `tabAgile Task Visibility`
+                (name, user, task, project, is_assignee, restricted, owner, modified_by, creation, modified)
+            SELECT LEFT(SHA1(CONCAT({user}, '|', t.name)), 20), {user}, t.name, t.project, {is_assignee},
+                IFNULL(p.custom_enable_assignment_based_visibility, 0), 'Administrator', 'Administrator', NOW(), NOW()
+            FROM {source}
+            LEFT JOIN `tabProject` p ON p.name = t.project
+            WHERE IFNULL({user}, '') != ''
+        """)
+
+
+def on_doctype_update():
+    # Covers the permission query's semi-join: all of a user's grants, read from the index
+    frappe.db.add_index('Agile Task Visibility', ['user', 'task', 'is_assignee', 'restricted'])
+    frappe.db.add_index('Agile Task Visibility', ['task'])
+    frappe.db.add_index('Agile Task Visibility', ['project'])
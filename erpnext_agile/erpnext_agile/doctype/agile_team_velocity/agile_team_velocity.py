@@ -0,0 +1,10 @@
+import frappe
+from frappe.model.document import Document
+
+
+class AgileTeamVelocity(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index('Agile Team Velocity', ['project', 'week_end'])
@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from frappe import _
 
+from erpnext_agile.agile_workflow_conditions import compile_condition, evaluate_condition
+
 class AgileWorkflowScheme(Document):
     """Jira-style workflow schemes with conditional transitions"""
     
@@ -19,20 +21,34 @@ class AgileWorkflowScheme(Document):
             if transition.condition:
                 self.validate_condition_syntax(transition.condition, transition.transition_name)
     
+    def on_update(self):
+        from erpnext_agile.agile_workflow_graph import clear_workflow_cache
+        clear_workflow_cache()
+    
+    def on_trash(self):
+        from erpnext_agile.agile_workflow_graph import clear_workflow_cache
+        clear_workflow_cache()
+    
     def validate_condition_syntax(self, condition, transition_name):
         """Validate Python condition syntax"""
         if not condition.strip():
             return
         
         try:
-            # Try to compile the condition to check syntax
-            compile(condition, '<string>', 'eval')
+            # Parse, check against the whitelist and cache the compiled condition
+            compile_condition(condition)
         except SyntaxError as e:
             frappe.throw(
                 _("Invalid Python syntax in transition '{0}': {1}").format(
                     transition_name, str(e)
                 )
             )
+        except ValueError as e:
+            frappe.throw(
+                _("Invalid condition in transition '{0}': {1}").format(
+                    transition_name, str(e)
+                )
+            )
     
     def get_transitions(self, from_status, doc=None):
         """
@@ -101,83 +117,7 @@ class AgileWorkflowScheme(Document):
     
     def evaluate_condition(self, condition, doc):
         """Evaluate Python condition against document"""
-        if not condition or not condition.strip():
-            return True
-        
-        def get_float(value):
-            try:
-                return float(value) if value else 0
-            except (ValueError, TypeError):
-                return 0
-        
-        def get_int(value):
-            try:
-                return int(float(value)) if value else 0
-            except (ValueError, TypeError):
-                return 0
-        
-        # Smart wrapper for doc that auto-casts numeric fields
-        class SmartDoc:
-            def __init__(self, original_doc):
-                self._doc = original_doc
-                self.numeric_fields = {
-                    'story_points', 'priority_value', 'estimated_hours',
-                    'actual_hours', 'progress', 'expected_time'
-                }
-            
-            def __getattr__(self, name):
-                value = getattr(self._doc, name, None)
-                if name in self.numeric_fields:
-                    return get_float(value)
-                return value
-            
-            def get(self, key, default=None):
-                value = self._doc.get(key, default)
-                if key in self.numeric_fields:
-                    return get_float(value)
-                return value
-            
-            # Forward other methods to original doc
-            def __getitem__(self, key):
-                return self._doc[key]
-            
-            @property
-            def name(self):
-                return self._doc.name
-        
-        try:
-            smart_doc = SmartDoc(doc)
-            
-            eval_context = {
-                'doc': smart_doc,  # Use smart doc here
-                'frappe': frappe,
-                '_': _,
-                'len': len,
-                'str': str,
-                'int': get_int,
-                'float': get_float,
-                'flt': get_float,
-                'cint': get_int,
-                'bool': bool,
-                'today': frappe.utils.today,
-                'now': frappe.utils.now,
-                'getdate': frappe.utils.getdate,
-                'get_value': frappe.db.get_value,
-                'exists': frappe.db.exists,
-            }
-            
-            result = eval(condition, {"__builtins__": {}}, eval_context)
-            return bool(result)
-            
-        except Exception as e:
-            frappe.log_error(
-                f"Workflow condition failed\nCondition: {condition}\nError: {str(e)}",
-                "Workflow Condition Error"
-            )
-            frappe.throw(
-                _("Workflow condition error: {0}\n\nCondition: {1}").format(str(e), condition)
-            )
-            return False
+        return evaluate_condition(condition, doc)
     
     def check_user_permission(self, user, required_permission):
         """Check if user has required permission"""
@@ -227,17 +167,18 @@ def get_available_transitions(workflow_scheme, from_status, task_name=None):
         from_status: Current status
         task_name: Task document name (optional)
     """
-    if not frappe.db.exists("Agile Workflow Scheme", workflow_scheme):
-        frappe.throw(_("Invalid Workflow Scheme"))
+    from erpnext_agile.agile_workflow_graph import get_workflow, has_required_role
     
-    scheme = frappe.get_doc("Agile Workflow Scheme", workflow_scheme)
+    workflow = get_workflow(workflow_scheme)
+    if not workflow:
+        frappe.throw(_("Invalid Workflow Scheme"))
     
     # Get task document if provided
     doc = None
     if task_name:
         doc = frappe.get_doc("Task", task_name)
     
-    transitions = scheme.get_transitions(from_status, doc)
+    transitions = workflow.get_transitions(from_status, doc)
     
     # Filter by user permissions
     user = frappe.session.user
@@ -245,7 +186,7 @@ def get_available_transitions(workflow_scheme, from_status, task_name=None):
     
     for t in transitions:
         if t['required_permission']:
-            if scheme.check_user_permission(user, t['required_permission']):
+            if has_required_role(user, t['required_permission']):
                 filtered_transitions.append(t)
         else:
             filtered_transitions.append(t)
@@ -264,14 +205,16 @@ def validate_transition(workflow_scheme, from_status, to_status, task_name):
         to_status: Target status
         task_name: Task document name
     """
-    if not frappe.db.exists("Agile Workflow Scheme", workflow_scheme):
+    from erpnext_agile.agile_workflow_graph import get_workflow
+    
+    workflow = get_workflow(workflow_scheme)
+    if not workflow:
         frappe.throw(_("Invalid Workflow Scheme"))
     
-    scheme = frappe.get_doc("Agile Workflow Scheme", workflow_scheme)
     doc = frappe.get_doc("Task", task_name)
     user = frappe.session.user
     
-    is_valid, error_message = scheme.validate_transition(
+    is_valid, error_message = workflow.validate_transition(
         from_status, to_status, doc, user
     )
     
@@ -310,13 +253,17 @@ def get_workflow_diagram(workflow_scheme, task_name=None):
             all_statuses.add(t['to_status'])
     
     # Get status details
+    from erpnext_agile.agile_metadata import get_status
+    
     status_details = {}
     for status in all_statuses:
-        status_doc = frappe.get_doc("Agile Issue Status", status)
+        status_row = get_status(status)
+        if not status_row:
+            frappe.throw(_("Agile Issue Status {0} not found").format(status))
         status_details[status] = {
-            'name': status_doc.status_name,
-            'category': status_doc.status_category,
-            'color': status_doc.color
+            'name': status_row.status_name,
+            'category': status_row.status_category,
+            'color': status_row.color
         }
     
     return {
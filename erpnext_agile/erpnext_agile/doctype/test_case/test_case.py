@@ -4,6 +4,7 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from erpnext_agile.agile_sequence import next_sequence_value
 from frappe.desk.form.assign_to import add, clear, remove
 
 class TestCase(Document):
@@ -14,21 +15,7 @@ class TestCase(Document):
     def autoname(self):
         """Auto-generate test case ID"""
         if not self.test_case_id:
-            # Get the last test case number
-            last_case = frappe.db.sql("""
-                SELECT test_case_id 
-                FROM `tabTest Case` 
-                WHERE test_case_id LIKE 'TC-%'
-                ORDER BY creation DESC 
-                LIMIT 1
-            """)
-            
-            if last_case:
-                last_num = int(last_case[0][0].split('-')[1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            
+            new_num = next_sequence_value("TC-", "Test Case", "test_case_id")
             self.test_case_id = f"TC-{new_num:05d}"
             self.name = self.test_case_id
             
@@ -3,26 +3,14 @@
 
 import frappe
 from frappe.model.document import Document
+from erpnext_agile.agile_sequence import next_sequence_value
 from frappe.utils import today
 
 class TestCycle(Document):
     def autoname(self):
         """Auto-generate cycle ID"""
         if not self.cycle_id:
-            last_cycle = frappe.db.sql("""
-                SELECT cycle_id 
-                FROM `tabTest Cycle` 
-                WHERE cycle_id LIKE 'TCYCLE-%'
-                ORDER BY creation DESC 
-                LIMIT 1
-            """)
-            
-            if last_cycle:
-                last_num = int(last_cycle[0][0].split('-')[1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            
+            new_num = next_sequence_value("TCYCLE-", "Test Cycle", "cycle_id")
             self.cycle_id = f"TCYCLE-{new_num:05d}"
             self.name = self.cycle_id
     
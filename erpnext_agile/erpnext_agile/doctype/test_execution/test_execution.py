@@ -3,26 +3,14 @@
 
 import frappe
 from frappe.model.document import Document
+from erpnext_agile.agile_sequence import next_sequence_value
 from frappe.utils import now_datetime
 
 class TestExecution(Document):
     def autoname(self):
         """Auto-generate execution ID"""
         if not self.execution_id:
-            last_exec = frappe.db.sql("""
-                SELECT execution_id 
-                FROM `tabTest Execution` 
-                WHERE execution_id LIKE 'TEXEC-%'
-                ORDER BY creation DESC 
-                LIMIT 1
-            """)
-            
-            if last_exec:
-                last_num = int(last_exec[0][0].split('-')[1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            
+            new_num = next_sequence_value("TEXEC-", "Test Execution", "execution_id")
             self.execution_id = f"TEXEC-{new_num:05d}"
             self.name = self.execution_id
     
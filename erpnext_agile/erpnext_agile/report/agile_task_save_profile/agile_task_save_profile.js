@@ -0,0 +1,16 @@
+// Copyright (c) 2026, Yanky and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Agile Task Save Profile"] = {
+	"filters": [],
+	onload: function(report) {
+		report.page.add_inner_button(__("Reset"), function() {
+			frappe.call({
+				method: "erpnext_agile.erpnext_agile.report.agile_task_save_profile.agile_task_save_profile.reset",
+				callback: function() {
+					report.refresh();
+				}
+			});
+		});
+	}
+};
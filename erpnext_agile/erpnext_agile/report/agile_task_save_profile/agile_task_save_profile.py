@@ -0,0 +1,34 @@
+# erpnext_agile/erpnext_agile/report/agile_task_save_profile/agile_task_save_profile.py
+#
+# Agile Task Save Profile
+# =======================
+# Time and SQL queries spent in each Task save hook, aggregated since the
+# last reset. Collected only while `agile_profile_task_saves` is set in site
+# config (see erpnext_agile/agile_save_profiler.py). Blocks nest, so
+# Task.save includes every hook below it.
+
+import frappe
+from frappe import _
+
+from erpnext_agile.agile_save_profiler import get_profile, reset_profile, summarize
+
+
+def execute(filters=None):
+    return get_columns(), summarize(get_profile())
+
+
+def get_columns():
+    return [
+        {"fieldname": "hook", "label": _("Hook"), "fieldtype": "Data", "width": 340},
+        {"fieldname": "calls", "label": _("Calls"), "fieldtype": "Int", "width": 90},
+        {"fieldname": "total_ms", "label": _("Total (ms)"), "fieldtype": "Float", "width": 120},
+        {"fieldname": "avg_ms", "label": _("Avg (ms)"), "fieldtype": "Float", "width": 110},
+        {"fieldname": "queries", "label": _("Queries"), "fieldtype": "Int", "width": 100},
+        {"fieldname": "avg_queries", "label": _("Avg Queries"), "fieldtype": "Float", "width": 110},
+    ]
+
+
+@frappe.whitelist()
+def reset():
+    frappe.only_for("System Manager")
+    reset_profile()
@@ -7,6 +7,15 @@ frappe.query_reports["Sprint Burndown"] = {
             options: "Agile Sprint",
             reqd: 1
         },
+        {
+            fieldname: "compare_with",
+            label: __("Compare With"),
+            fieldtype: "MultiSelectList",
+            get_data: function(txt) {
+                return frappe.db.get_link_options("Agile Sprint", txt);
+            },
+            reqd: 0
+        },
         {
             fieldname: "project",
             label: __("Project"),
@@ -38,6 +47,29 @@ frappe.query_reports["Sprint Burndown"] = {
         if (!result || !result.length) return null;
 
         let filters = frappe.query_report.get_filter_values();
+
+        if (filters.compare_with && filters.compare_with.length) {
+            // Remaining points of each sprint by sprint day
+            let by_sprint = {};
+            result.forEach(d => {
+                (by_sprint[d.sprint] = by_sprint[d.sprint] || []).push(d.remaining_points);
+            });
+            let days = Math.max(...Object.values(by_sprint).map(values => values.length));
+
+            return {
+                data: {
+                    labels: Array.from({length: days}, (_, i) => `${__("Day")} ${i + 1}`),
+                    datasets: Object.keys(by_sprint).map(sprint => ({
+                        name: sprint,
+                        values: by_sprint[sprint],
+                        chartType: "line"
+                    }))
+                },
+                type: "line",
+                height: 300,
+                title: __("Sprint Burndown Comparison")
+            };
+        }
         
         let chartTitle = "Sprint Burndown";
         if (filters.sprint) chartTitle += ` - ${filters.sprint}`;
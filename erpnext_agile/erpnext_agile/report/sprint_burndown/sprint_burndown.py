@@ -1,19 +1,22 @@
 import frappe
-from frappe.utils import flt, date_diff, getdate
+from frappe.utils import flt, date_diff, getdate, add_days
+from itertools import accumulate
+
+from erpnext_agile.agile_sprint_metrics import STORY_POINTS
 
 def execute(filters=None):
     """Generate sprint burndown chart data"""
     if not filters:
         filters = {}
 
-    columns = get_columns()
+    columns = get_columns(filters)
     data = get_data(filters)
     chart = get_chart_data(data, filters)
-    
+
     return columns, data, None, chart
 
-def get_columns():
-    return [
+def get_columns(filters=None):
+    columns = [
         {"fieldname": "date", "label": "Date", "fieldtype": "Date", "width": 130},
         {"fieldname": "total_tasks", "label": "Total Tasks", "fieldtype": "Int", "width": 150},
         {"fieldname": "total_points", "label": "Total Points", "fieldtype": "Float", "width": 150},
@@ -23,79 +26,112 @@ def get_columns():
         {"fieldname": "tasks_completed", "label": "Tasks Completed", "fieldtype": "Int", "width": 150},
         {"fieldname": "completed_today", "label": "Completed Points", "fieldtype": "Float", "width": 150}
     ]
+    if filters and filters.get("compare_with"):
+        columns[:0] = [
+            {"fieldname": "sprint", "label": "Sprint", "fieldtype": "Link", "options": "Agile Sprint", "width": 160},
+            {"fieldname": "day", "label": "Day", "fieldtype": "Int", "width": 70}
+        ]
+    return columns
 
 def get_data(filters):
     if not filters or not filters.get("sprint"):
         sprint_name = frappe.db.get_value("Agile Sprint", {"sprint_state": "Active"}, "name")
-        sprint = frappe.get_doc("Agile Sprint", sprint_name) if sprint_name else None
-        if not sprint:
+        if not sprint_name:
             frappe.throw("No active sprint found. Please select a sprint.")
     else:
-        sprint = frappe.get_doc("Agile Sprint", filters.get("sprint"))
-
-    project_filter = ""
-    project_value = None
-    if filters.get("project"):
-        project_filter = " AND project = %s"
-        project_value = filters.get("project")
-
-    # Total story points
-    total_points = frappe.db.sql(f"""
-        SELECT SUM(story_points) FROM `tabTask`
-        WHERE current_sprint = %s {project_filter}
-    """, (sprint.name,) + ((project_value,) if project_value else ()))[0][0] or 0
-
-    # Total number of tasks
-    total_tasks = frappe.db.sql(f"""
-        SELECT COUNT(*) FROM `tabTask`
-        WHERE current_sprint = %s {project_filter}
-    """, (sprint.name,) + ((project_value,) if project_value else ()))[0][0] or 0
-
-    # ... rest of your code remains unchanged, just pass project_filter to other queries as well
-    current_date = getdate(sprint.start_date)
-    end_date = getdate(sprint.end_date)
-    sprint_days = date_diff(end_date, current_date) + 1
-    daily_ideal = total_points / sprint_days if sprint_days else 0
+        sprint_name = filters.get("sprint")
+
+    sprints = [sprint_name] + [
+        sprint for sprint in frappe.parse_json(filters.get("compare_with") or []) if sprint != sprint_name
+    ]
+    series = get_burndown_series(sprints, filters.get("project"))
 
     data = []
-    remaining_points = total_points
-    remaining_tasks = total_tasks
-
-    while current_date <= end_date:
-        # Points completed today
-        completed_today = frappe.db.sql(f"""
-            SELECT SUM(story_points) FROM `tabTask`
-            WHERE current_sprint = %s AND status = 'Completed'
-            AND completed_on = %s {project_filter}
-        """, (sprint.name, current_date) + ((project_value,) if project_value else ()))[0][0] or 0
-
-        tasks_completed = frappe.db.sql(f"""
-            SELECT COUNT(*) FROM `tabTask`
-            WHERE current_sprint = %s AND status = 'Completed'
-            AND completed_on = %s {project_filter}
-        """, (sprint.name, current_date) + ((project_value,) if project_value else ()))[0][0] or 0
-
-        remaining_points -= completed_today
-        remaining_tasks -= tasks_completed
-        ideal_remaining = max(0, total_points - (daily_ideal * (date_diff(current_date, getdate(sprint.start_date)) + 1)))
-
-        data.append({
-            "date": current_date,
-            "total_points": total_points,
-            "remaining_points": remaining_points,
-            "ideal_remaining": ideal_remaining,
-            "completed_today": completed_today,
-            "total_tasks": total_tasks,
-            "remaining_tasks": remaining_tasks,
-            "tasks_completed": tasks_completed
-        })
-
-        current_date = frappe.utils.add_days(current_date, 1)
+    for sprint in sprints:
+        for row in series.get(sprint, []):
+            row["sprint"] = sprint
+            data.append(row)
 
     return data
 
+def get_burndown_series(sprints, project=None):
+    """
+    Daily burndown rows of each sprint, {sprint: [row, ...]}.
+
+    Totals and per-day completions of all sprints come from one grouped
+    query; the remaining and ideal lines are running sums over those days.
+    """
+    sprint_docs = frappe.get_all("Agile Sprint",
+        filters={"name": ["in", list(sprints)]},
+        fields=["name", "start_date", "end_date"]
+    )
+
+    conditions = ["t.current_sprint IN %(sprints)s"]
+    values = {"sprints": tuple(sprints)}
+    if project:
+        conditions.append("t.project = %(project)s")
+        values["project"] = project
+
+    # One row per (sprint, completion day); tasks not completed have a NULL day
+    aggregates = frappe.db.sql(f"""
+        SELECT t.current_sprint AS sprint,
+            CASE WHEN t.status = 'Completed' THEN t.completed_on END AS completed_day,
+            COUNT(*) AS tasks,
+            SUM({STORY_POINTS}) AS points
+        FROM `tabTask` t
+        WHERE {' AND '.join(conditions)}
+        GROUP BY t.current_sprint, completed_day
+    """, values, as_dict=True)
+
+    totals, completions = {}, {}
+    for row in aggregates:
+        total_tasks, total_points = totals.get(row.sprint, (0, 0))
+        totals[row.sprint] = (total_tasks + row.tasks, total_points + flt(row.points))
+        if row.completed_day:
+            completions[(row.sprint, getdate(row.completed_day))] = (row.tasks, flt(row.points))
+
+    series = {}
+    for sprint in sprint_docs:
+        if not (sprint.start_date and sprint.end_date):
+            continue
+
+        total_tasks, total_points = totals.get(sprint.name, (0, 0))
+        start_date = getdate(sprint.start_date)
+        sprint_days = date_diff(sprint.end_date, start_date) + 1
+        if sprint_days <= 0:
+            series[sprint.name] = []
+            continue
+
+        daily_ideal = total_points / sprint_days
+        dates = [add_days(start_date, day) for day in range(sprint_days)]
+        completed = [completions.get((sprint.name, date), (0, 0)) for date in dates]
+        tasks_completed = [tasks for tasks, points in completed]
+        points_completed = [points for tasks, points in completed]
+
+        series[sprint.name] = [
+            {
+                "day": day + 1,
+                "date": date,
+                "total_points": total_points,
+                "remaining_points": total_points - points_done,
+                "ideal_remaining": max(0, total_points - daily_ideal * (day + 1)),
+                "completed_today": points_completed[day],
+                "total_tasks": total_tasks,
+                "remaining_tasks": total_tasks - tasks_done,
+                "tasks_completed": tasks_completed[day]
+            }
+            for day, (date, points_done, tasks_done) in enumerate(zip(
+                dates, accumulate(points_completed), accumulate(tasks_completed)
+            ))
+        ]
+
+    return series
+
 def get_chart_data(data, filters):
     """Generate chart configuration"""
+    if filters and filters.get("compare_with"):
+        return get_comparison_chart_data(data)
+
     return {
         "data": {
             "labels": [d["date"] for d in data],
@@ -106,7 +142,7 @@ def get_chart_data(data, filters):
                     "chartType": "line"
                 },
                 {
-                    "name": "Ideal Burndown", 
+                    "name": "Ideal Burndown",
                     "values": [d["ideal_remaining"] for d in data],
                     "chartType": "line"
                 }
@@ -115,4 +151,23 @@ def get_chart_data(data, filters):
         "type": "line",
         "height": 300,
         "colors": ["#fc8d59", "#91bfdb"]
-    }
\ No newline at end of file
+    }
+
+def get_comparison_chart_data(data):
+    """Remaining points of each sprint by sprint day, so sprints of different dates line up"""
+    by_sprint = {}
+    for d in data:
+        by_sprint.setdefault(d["sprint"], []).append(d["remaining_points"])
+
+    days = max((len(values) for values in by_sprint.values()), default=0)
+    return {
+        "data": {
+            "labels": [f"Day {day}" for day in range(1, days + 1)],
+            "datasets": [
+                {"name": sprint, "values": values, "chartType": "line"}
+                for sprint, values in by_sprint.items()
+            ]
+        },
+        "type": "line",
+        "height": 300
+    }
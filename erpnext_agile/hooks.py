@@ -206,10 +206,20 @@ doc_events = {
         "on_update": [
             "erpnext_agile.agile_doctype_controllers.task_on_update",
             "erpnext_agile.project_time_tracking.update_project_user_time_on_task_update",
-            "erpnext_agile.test_management.events.task_check_test_coverage"
+            "erpnext_agile.test_management.events.task_check_test_coverage",
+            "erpnext_agile.erpnext_agile.doctype.agile_task_visibility.agile_task_visibility.update_task_visibility"
         ],
         "after_insert": "erpnext_agile.agile_doctype_controllers.task_after_insert",
-        "on_trash": "erpnext_agile.agile_doctype_controllers.task_on_trash"
+        "on_trash": [
+            "erpnext_agile.agile_doctype_controllers.task_on_trash",
+            "erpnext_agile.erpnext_agile.doctype.agile_task_visibility.agile_task_visibility.remove_task_visibility"
+        ],
+        "after_rename": "erpnext_agile.erpnext_agile.doctype.agile_task_visibility.agile_task_visibility.rename_task_visibility"
+    },
+    "Project": {
+        "on_update": "erpnext_agile.erpnext_agile.doctype.agile_project_visibility.agile_project_visibility.update_project_visibility",
+        "on_trash": "erpnext_agile.erpnext_agile.doctype.agile_project_visibility.agile_project_visibility.remove_project_visibility",
+        "after_rename": "erpnext_agile.erpnext_agile.doctype.agile_project_visibility.agile_project_visibility.rename_project_visibility"
     },
     "Agile Issue Work Log": {
         "after_insert": "erpnext_agile.project_time_tracking.update_project_user_time_on_work_log",
@@ -250,19 +260,25 @@ doc_events = {
 # }
 
 scheduler_events = {
+    "all": [
+        "erpnext_agile.erpnext_agile.doctype.agile_notification.agile_notification.send_notification_digests"
+    ],
     "hourly": [
         "erpnext_agile.scheduler_events.hourly.update_sprint_metrics",
-        "erpnext_agile.scheduler_events.hourly.create_burndown_entries",
         "erpnext_agile.test_management.scheduler.update_cycle_metrics",
         "erpnext_agile.project_time_tracking.recalculate_all_project_times_scheduled",
         "erpnext_agile.test_management.scheduler.send_test_reminders"
     ],
     "daily": [
+        "erpnext_agile.scheduler_events.daily.reconcile_sprint_metrics",
         "erpnext_agile.scheduler_events.daily.send_sprint_digest",
-        "erpnext_agile.scheduler_events.daily.cleanup_old_timers"
+        "erpnext_agile.scheduler_events.daily.snapshot_burndown_entries",
+        "erpnext_agile.scheduler_events.daily.cleanup_old_timers",
+        "erpnext_agile.erpnext_agile.doctype.agile_notification.agile_notification.delete_old_notifications"
     ],
     "weekly": [
         # "erpnext_agile.version_control.cleanup_all_old_versions",
+        "erpnext_agile.erpnext_agile.doctype.agile_issue_activity_archive.agile_issue_activity_archive.archive_old_activity",
         "erpnext_agile.scheduler_events.weekly.generate_team_velocity_report"
     ]
 }
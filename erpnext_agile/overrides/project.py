@@ -1,6 +1,10 @@
 import frappe
 from frappe import _
 from erpnext.projects.doctype.project.project import Project
+from erpnext_agile.erpnext_agile.doctype.agile_project_visibility.agile_project_visibility import (
+    sync_project_visibility,
+)
+from erpnext_agile.agile_permissions import get_permission_context
 
 
 class AgileProject(Project):
@@ -55,6 +59,9 @@ class AgileProject(Project):
                     'parentfield': 'users',     # <-- Added this
                     'user': self.custom_project_manager
                 }).insert(ignore_permissions=True)
+        
+        # Rows were inserted directly, so refresh the Task visibility grants
+        sync_project_visibility(self.name)
 
 
 # ============================================
@@ -80,21 +87,14 @@ def get_project_permission_query_conditions(user):
 
 def has_project_permission(doc, perm_type=None, user=None):
     """Permission validator for Project doctype"""
-    user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_admin or ctx.is_manager:
         return True
-    if doc.owner == user:
+    if doc.owner == ctx.user:
         return True
 
-    user_in_project = frappe.db.exists(
-        'Project User',
-        {'parent': doc.name, 'user': user}
-    )
-
-    return bool(user_in_project)
+    return ctx.in_project(doc.name)
 
 
 # ============================================
@@ -108,53 +108,45 @@ def get_task_permission_query_conditions(user):
     """
     
     roles = frappe.get_roles(user)
-    user_quoted = frappe.db.escape(user)
     
     # 1. System Admins get a free pass.
     if "Administrator" in roles:
         return ""
         
+    return get_task_visibility_conditions(user, "Projects Manager" in roles)
+
+
+def get_task_visibility_conditions(user, is_projects_manager=False):
+    """
+    Task conditions over the materialized grants, see Agile Task Visibility
+    (user, task) and Agile Project Visibility (user, project).
+    """
+    user_quoted = frappe.db.escape(user)
+
     # 2. Project Managers get standard visibility across their projects.
-    if "Projects Manager" in roles:
+    if is_projects_manager:
         return f"""
             (`tabTask`.name IN (
-                SELECT parent FROM `tabAssigned To Users` WHERE user = {user_quoted}
+                SELECT task FROM `tabAgile Task Visibility`
+                WHERE user = {user_quoted} AND is_assignee = 1
             )
             OR `tabTask`.project IN (
-                SELECT parent FROM `tabProject User` WHERE user = {user_quoted}
+                SELECT project FROM `tabAgile Project Visibility` WHERE user = {user_quoted}
             ))
         """
 
-    # 3. Standard Users: Let SQL do the thinking based on the Project Master.
-    # We use a combined OR statement to apply the right rule based on the project's flag.
+    # 3. Standard Users: task grants count on projects with assignment based
+    # visibility (restricted = 1), assignees everywhere; project membership
+    # only counts on projects without it.
     return f"""
         (
-            -- SCENARIO A: Project has strict assignment visibility enabled (= 1)
-            `tabTask`.project IN (
-                SELECT name FROM `tabProject` 
-                WHERE custom_enable_assignment_based_visibility = 1
-            )
-            AND (
-                `tabTask`.name IN (SELECT parent FROM `tabAssigned To Users` WHERE user = {user_quoted})
-                OR `tabTask`.owner = {user_quoted}
-                OR `tabTask`.reporter = {user_quoted}
-                OR `tabTask`.custom_original_owner = {user_quoted}
-                OR `tabTask`.name IN (SELECT parent FROM `tabAgile Issue Watcher` WHERE user = {user_quoted})
+            `tabTask`.name IN (
+                SELECT task FROM `tabAgile Task Visibility`
+                WHERE user = {user_quoted} AND (is_assignee = 1 OR restricted = 1)
             )
-        )
-        OR
-        (
-            -- SCENARIO B: Project has it disabled (= 0), OR the Task has no project at all
-            (
-                `tabTask`.project IS NULL 
-                OR `tabTask`.project IN (
-                    SELECT name FROM `tabProject` 
-                    WHERE IFNULL(custom_enable_assignment_based_visibility, 0) = 0
-                )
-            )
-            AND (
-                `tabTask`.name IN (SELECT parent FROM `tabAssigned To Users` WHERE user = {user_quoted})
-                OR `tabTask`.project IN (SELECT parent FROM `tabProject User` WHERE user = {user_quoted})
+            OR `tabTask`.project IN (
+                SELECT project FROM `tabAgile Project Visibility`
+                WHERE user = {user_quoted} AND restricted = 0
             )
         )
     """
@@ -165,29 +157,21 @@ def has_task_permission(doc, perm_type=None, user=None):
     Restrict access to only assigned users.
     Admins and Project Managers have full access.
     """
-    user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_admin or ctx.is_manager:
         return True
-    if "Projects User" in frappe.get_roles(user):
+    if "Projects User" in ctx.roles:
         return True
 
     # Allow creation if user is in the project
     if perm_type == "create":
         if doc.project:
-            return frappe.db.exists('Project User', {
-                'parent': doc.project, 
-                'user': user
-            })
+            return ctx.in_project(doc.project)
         return True  # Allow if no project specified
 
     # For existing tasks, check assignment
-    if frappe.db.exists('Assigned To Users', {'parent': doc.name, 'user': user}):
-        return True
-
-    return False
+    return doc.name in ctx.assigned_tasks
 
 
 # ============================================
@@ -224,22 +208,15 @@ def get_agile_sprint_permission_query_conditions(user):
 
 
 def has_agile_sprint_permission(doc, perm_type=None, user=None):
-    """Permission validator for Test Cycle doctype"""
-    user = user or frappe.session.user
+    """Permission validator for Agile Sprint doctype"""
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_admin or ctx.is_manager:
         return True
-    if doc.owner == user:
+    if doc.owner == ctx.user:
         return True
 
-    user_in_project_sprint = frappe.db.exists(
-        'Project User',
-        {'parent': doc.project, 'user': user}
-    )
-
-    return bool(user_in_project_sprint)
+    return ctx.in_project(doc.project)
 
 # ============================================
 # PERMISSION QUERY CONDITIONS FOR TEST CYCLE
@@ -268,21 +245,14 @@ def get_test_cycle_permission_query_conditions(user):
 
 def has_test_cycle_permission(doc, perm_type=None, user=None):
     """Permission validator for Test Cycle doctype"""
-    user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
+    if ctx.is_admin or ctx.is_manager:
         return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if doc.owner_user == ctx.user:
         return True
-    if doc.owner_user == user:
-        return True
-
-    user_in_project = frappe.db.exists(
-        'Project User',
-        {'parent': doc.project, 'user': user}
-    )
 
-    return bool(user_in_project)
+    return ctx.in_project(doc.project)
 
 
 # ============================================
@@ -311,21 +281,14 @@ def get_test_case_permission_query_conditions(user):
 
 def has_test_case_permission(doc, perm_type=None, user=None):
     """Permission validator for Test Case doctype"""
-    user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_admin or ctx.is_manager:
         return True
-    if doc.owner == user:
+    if doc.owner == ctx.user:
         return True
 
-    user_in_project = frappe.db.exists(
-        'Project User',
-        {'parent': doc.project, 'user': user}
-    )
-
-    return bool(user_in_project)
+    return ctx.in_project(doc.project)
 
 
 # =================================================
@@ -370,42 +333,28 @@ def has_test_exec_permission(doc, perm_type=None, user=None):
     Permission validator for Test Execution doctype.
     User must have access to the Test Case OR Test Cycle.
     """
-    user = user or frappe.session.user
+    ctx = get_permission_context(user)
 
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    if "Projects Manager" in frappe.get_roles(user):
+    if ctx.is_admin or ctx.is_manager:
         return True
     
-    if doc.owner == user:
+    if doc.owner == ctx.user:
         return True
 
     has_cycle_access = False
     if doc.test_cycle:
-        test_cycle = frappe.get_doc("Test Cycle", doc.test_cycle)
+        test_cycle = ctx.get_values("Test Cycle", doc.test_cycle, ["owner_user", "project"])
         
         # User is cycle owner or in the project
-        if test_cycle.owner_user == user:
-            has_cycle_access = True
-        elif test_cycle.project:
-            has_cycle_access = frappe.db.exists(
-                'Project User',
-                {'parent': test_cycle.project, 'user': user}
-            )
+        has_cycle_access = test_cycle.owner_user == ctx.user or ctx.in_project(test_cycle.project)
     
     # Check Test Case access
     has_case_access = False
     if doc.test_case:
-        test_case = frappe.get_doc("Test Case", doc.test_case)
+        test_case = ctx.get_values("Test Case", doc.test_case, ["owner", "project"])
         
         # User is case owner or in the project
-        if test_case.owner == user:
-            has_case_access = True
-        elif test_case.project:
-            has_case_access = frappe.db.exists(
-                'Project User',
-                {'parent': test_case.project, 'user': user}
-            )
+        has_case_access = test_case.owner == ctx.user or ctx.in_project(test_case.project)
     
     # User must have access to BOTH cycle and case (if they exist)
     if doc.test_cycle and not has_cycle_access:
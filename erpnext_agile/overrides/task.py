@@ -5,17 +5,44 @@ import re
 from frappe.desk.form.assign_to import add, clear, remove
 from erpnext.projects.doctype.task.task import Task
 from erpnext_agile.erpnext_agile.doctype.agile_issue_activity.agile_issue_activity import (
+    buffer_activity,
     log_issue_activity,
 )
+from erpnext_agile.erpnext_agile.doctype.agile_board_change.agile_board_change import (
+    record_task_board_changes,
+)
+from erpnext_agile.erpnext_agile.doctype.agile_issue_status_interval.agile_issue_status_interval import (
+    record_status_interval,
+)
 from frappe.utils import getdate
+from erpnext_agile.agile_workflow_graph import get_project_workflow, has_required_role
+from erpnext_agile.agile_save_profiler import profile_block, profiled
+from erpnext_agile.agile_sprint_metrics import apply_task_delta
+from erpnext_agile.agile_sprint_report import bump_task_sprints
+from erpnext_agile.agile_subtask_progress import apply_child_delta
+from erpnext_agile.agile_metadata import (
+    get_status_category,
+    get_statuses,
+    issue_type_exists,
+    priority_exists,
+)
 
 class AgileTask(Task):
+    def insert(self, *args, **kwargs):
+        with profile_block("Task.insert"):
+            return super().insert(*args, **kwargs)
+    
+    def save(self, *args, **kwargs):
+        with profile_block("Task.save"):
+            return super().save(*args, **kwargs)
+    
     def after_insert(self):
         """Log creation activity"""
         if self.is_agile:
             log_issue_activity(self.name, "created this issue")
             self.handle_assignment_for_new_tasks()
     
+    @profiled("AgileTask.validate")
     def validate(self):
         super().validate()
         if self.is_agile:
@@ -46,70 +73,42 @@ class AgileTask(Task):
         if self.remaining_estimate:
             self.custom_remaining_estimated_time = format_seconds(self.remaining_estimate)
     
+    @profiled("AgileTask.on_update")
     def on_update(self):
         """Track field changes after update"""
         super().on_update()
+        record_task_board_changes(self)
         if self.is_agile:
             self.handle_issue_activity_update()
-            
-            # Update parent task progress if this is a subtask
-            if self.parent_issue:
-                self.update_parent_progress()
-            
-            # Update sprint metrics if task is in a sprint
-            if self.current_sprint and self.has_value_changed("issue_status"):
-                self.update_sprint_metrics()
-            if self.current_sprint and self.has_value_changed("current_sprint"):
-                self.update_sprint_metrics()
-            elif self.story_points and self.has_value_changed("story_points"):
-                self.update_sprint_metrics()
+        
+        # Apply the change in parent/status to the parent's subtask counters
+        self.update_parent_progress()
+        # Apply the change in points/status/sprint to the sprint totals
+        self.update_sprint_metrics()
                 
     def on_trash(self):
         """Handle cleanup on deletion"""
+        record_task_board_changes(self, deleted=True)
+        if self.parent_issue:
+            apply_child_delta(self, deleted=True)
         if self.is_agile:
-            # Update sprint metrics if task is in a sprint
+            # Take this task's points out of its sprint
             if self.current_sprint:
-                self.db_set("story_points", 0)  # Set story points to 0 before deletion to adjust sprint metrics
-                self.update_sprint_metrics()
+                apply_task_delta(self, deleted=True)
+                bump_task_sprints(self, deleted=True)
                 
+    @profiled("AgileTask.update_parent_progress")
     def update_parent_progress(self):
-        """Update parent task's completion percentage"""
-        if not self.parent_issue:
-            return
-        
-        # Get all subtasks
-        subtasks = frappe.get_all(
-            "Task",
-            filters={"parent_issue": self.parent_issue},
-            fields=["name", "issue_status"]
-        )
-        
-        if not subtasks:
-            return
-        
-        # Count completed subtasks
-        completed = len([
-            t for t in subtasks 
-            if frappe.db.get_value("Agile Issue Status", t.issue_status, "status_category") == "Done"
-        ])
-        
-        total = len(subtasks)
-        progress = (completed / total * 100) if total > 0 else 0
-        
-        # Update parent
-        frappe.db.set_value("Task", self.parent_issue, "progress", progress, update_modified=False)
+        """Apply this save's change in parent or status to the parent's subtask counters"""
+        apply_child_delta(self)
     
+    @profiled("AgileTask.update_sprint_metrics")
     def update_sprint_metrics(self):
-        """Update sprint metrics when task status changes"""
-        if not self.current_sprint:
-            return
-        
-        try:
-            sprint = frappe.get_doc("Agile Sprint", self.current_sprint)
-            sprint.calculate_metrics()
-        except Exception as e:
-            frappe.log_error(f"Error updating sprint metrics: {str(e)}")
+        """Apply this save's change in points, status or sprint to the sprint totals"""
+        apply_task_delta(self)
+        bump_task_sprints(self)
             
+    @profiled("AgileTask.validate_workflow_transition")
     def validate_workflow_transition(self):
         """
         Validate status transitions based on workflow scheme
@@ -135,16 +134,14 @@ class AgileTask(Task):
         if not self.project:
             return
         
-        project = frappe.get_cached_doc("Project", self.project)
+        workflow = get_project_workflow(self.project)
         
         # If no workflow scheme, allow any transition
-        if not project.enable_agile or not project.workflow_scheme:
+        if not workflow:
             return
         
         # Validate the transition
-        scheme = frappe.get_doc("Agile Workflow Scheme", project.workflow_scheme)
-        
-        is_valid, error_message = scheme.validate_transition(
+        is_valid, error_message = workflow.validate_transition(
             from_status=old_status,
             to_status=new_status,
             doc=self,
@@ -176,6 +173,7 @@ class AgileTask(Task):
         elif self.is_group:
             self.story_points = 0
     
+    @profiled("AgileTask.handle_issue_activity_update")
     def handle_issue_activity_update(self):
         """Handle activity tracking for field changes"""
         # Field mapping for better display names
@@ -191,6 +189,10 @@ class AgileTask(Task):
             "remaining_estimate": "remaining estimate",
         }
         
+        # Keep the status interval table in step with status changes
+        if self.has_value_changed("issue_status") and self.issue_status:
+            record_status_interval(self)
+        
         # Track specific field changes
         for field in field_maps.keys():
             if self.has_value_changed(field):
@@ -332,6 +334,7 @@ class AgileTask(Task):
                 data={"assignees": user_id}
             )
 
+    @profiled("AgileTask.sync_parent_task")
     def sync_parent_task(self):
         """Keep parent_task and parent_issue in sync"""
         if self.parent_issue:
@@ -355,14 +358,14 @@ class AgileTask(Task):
     
     def validate_agile_fields(self):
         """Validate agile-specific fields"""
-        if self.issue_type and not frappe.db.exists("Agile Issue Type", self.issue_type):
+        if self.issue_type and not issue_type_exists(self.issue_type):
             frappe.throw(f"Invalid Issue Type: {self.issue_type}")
         
         # Validate issue type is allowed in project
         if self.issue_type and self.project:
             self.validate_issue_type_allowed()
         
-        if self.issue_priority and not frappe.db.exists("Agile Issue Priority", self.issue_priority):
+        if self.issue_priority and not priority_exists(self.issue_priority):
             frappe.throw(f"Invalid Priority: {self.issue_priority}")
 
     def update_status(self):
@@ -409,7 +412,7 @@ def map_agile_status_to_task_status(agile_status):
     if status_mapping.get(agile_status):
         return status_mapping.get(agile_status, "Open")
     else:
-        status_category = frappe.db.get_value("Agile Issue Status", agile_status, "status_category")
+        status_category = get_status_category(agile_status)
         if status_category:
             return status_mapping.get(status_category, "Open")
 
@@ -436,18 +439,13 @@ def get_allowed_status_changes(doc):
     
     # Get project's workflow scheme
     try:
-        project = frappe.get_doc("Project", doc.project)
-        if not project.enable_agile or not project.workflow_scheme:
+        workflow = get_project_workflow(doc.project)
+        if not workflow:
             # No workflow scheme, return all statuses
-            return frappe.get_all(
-                "Agile Issue Status",
-                pluck="name",
-                order_by="sort_order"
-            )
+            return [status.name for status in get_statuses()]
          
         # Get allowed transitions from workflow scheme
-        scheme = frappe.get_doc("Agile Workflow Scheme", project.workflow_scheme)
-        transitions = scheme.get_transitions(doc.issue_status, doc)
+        transitions = workflow.get_transitions(doc.issue_status, doc)
         
         # Filter by user permissions
         user = frappe.session.user
@@ -455,7 +453,7 @@ def get_allowed_status_changes(doc):
         
         for t in transitions:
             if t['required_permission']:
-                if scheme.check_user_permission(user, t['required_permission']):
+                if has_required_role(user, t['required_permission']):
                     allowed_statuses.append(t['to_status'])
             else:
                 allowed_statuses.append(t['to_status'])
@@ -465,11 +463,7 @@ def get_allowed_status_changes(doc):
     except Exception as e:
         frappe.log_error(f"Error getting allowed status changes: {str(e)}")
         # On error, return all statuses to not block user
-        return frappe.get_all(
-            "Agile Issue Status",
-            pluck="name",
-            order_by="sort_order"
-        )
+        return [status.name for status in get_statuses()]
 
 
 # Whitelisted method for client-side use
@@ -516,10 +510,9 @@ def transition_task_status(task_name, to_status, comment=None, completed_by=None
     
     # Validate transition
     if doc.project:
-        project = frappe.get_doc("Project", doc.project)
-        if project.enable_agile and project.workflow_scheme:
-            scheme = frappe.get_doc("Agile Workflow Scheme", project.workflow_scheme)
-            is_valid, error_message = scheme.validate_transition(
+        workflow = get_project_workflow(doc.project)
+        if workflow:
+            is_valid, error_message = workflow.validate_transition(
                 from_status=doc.issue_status,
                 to_status=to_status,
                 doc=doc,
@@ -553,17 +546,11 @@ def transition_task_status(task_name, to_status, comment=None, completed_by=None
         )
     
     # Log activity
-    frappe.get_doc({
-        "doctype": "Agile Issue Activity",
-        "issue": task_name,
-        "activity_type": "status_changed",
-        "user": frappe.session.user,
-        "data": frappe.as_json({
-            "old_status": old_status,
-            "new_status": to_status,
-            "comment": comment
-        })
-    }).insert(ignore_permissions=True)
+    buffer_activity(task_name, "status_changed", {
+        "old_status": old_status,
+        "new_status": to_status,
+        "comment": comment
+    })
     
     return {
         "success": True,
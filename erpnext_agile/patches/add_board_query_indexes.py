@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+    """Indexes backing the board query layer (scope filters and status grouping)"""
+    frappe.db.add_index('Task', ['project', 'current_sprint', 'issue_status'], 'agile_board_scope_index')
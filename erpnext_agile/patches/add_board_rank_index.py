@@ -0,0 +1,11 @@
+import frappe
+
+
+def execute():
+    """Keyset index for per-column board paging ordered by rank then name"""
+    if not frappe.db.has_column('Task', 'backlog_rank'):
+        from erpnext_agile.agile_backlog_manager import AgileBacklogManager
+        AgileBacklogManager().create_backlog_rank_field()
+
+    frappe.db.add_index('Task', ['project', 'current_sprint', 'issue_status', 'backlog_rank'],
+        'agile_board_rank_index')
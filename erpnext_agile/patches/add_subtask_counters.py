@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+    """Create the subtask counter fields and fill them from the existing hierarchy"""
+    from erpnext_agile.agile_subtask_progress import create_subtask_counter_fields, rebuild_subtask_counters
+
+    create_subtask_counter_fields()
+    rebuild_subtask_counters()
@@ -0,0 +1,11 @@
+import frappe
+
+
+def execute():
+    """Copy the issue's project onto existing activity for the project stream"""
+    frappe.db.sql("""
+        UPDATE `tabAgile Issue Activity` a
+        INNER JOIN `tabTask` t ON t.name = a.issue
+        SET a.project = t.project
+        WHERE a.project IS NULL
+    """)
@@ -0,0 +1,18 @@
+import frappe
+
+
+def execute():
+    """Give logged board changes their id as board version, so client cursors stay valid"""
+    frappe.db.sql("""
+        UPDATE `tabAgile Board Change` SET board_version = name
+        WHERE IFNULL(board_version, 0) = 0
+    """)
+
+    # Seed each project's counter with its latest version, as take_board_version does
+    frappe.db.sql("""
+        INSERT IGNORE INTO `tabSeries` (`name`, `current`)
+        SELECT CONCAT('agile:board_version:', project), MAX(board_version)
+        FROM `tabAgile Board Change`
+        WHERE IFNULL(project, '') != ''
+        GROUP BY project
+    """)
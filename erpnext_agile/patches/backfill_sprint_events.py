@@ -0,0 +1,10 @@
+import frappe
+
+
+def execute():
+    """Seed the sprint event log burndown is derived from with the current sprint contents"""
+    from erpnext_agile.erpnext_agile.doctype.agile_sprint_event.agile_sprint_event import (
+        backfill_sprint_events,
+    )
+
+    backfill_sprint_events()
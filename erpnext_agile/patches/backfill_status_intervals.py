@@ -0,0 +1,94 @@
+import json
+
+import frappe
+from frappe.utils import get_datetime
+
+from erpnext_agile.erpnext_agile.doctype.agile_issue_status_interval.agile_issue_status_interval import (
+    get_status_categories,
+)
+
+BATCH_SIZE = 1000
+
+
+def execute():
+    """Build status intervals once from the status changes in Agile Issue Activity"""
+    last_name = ''
+    while True:
+        tasks = frappe.db.sql("""
+            SELECT name, project, current_sprint, issue_status, creation
+            FROM `tabTask`
+            WHERE is_agile = 1 AND name > %(last_name)s
+            ORDER BY name
+            LIMIT %(limit)s
+        """, {'last_name': last_name, 'limit': BATCH_SIZE}, as_dict=True)
+
+        if not tasks:
+            break
+
+        last_name = tasks[-1].name
+        backfill_tasks(tasks)
+        frappe.db.commit()
+
+
+def backfill_tasks(tasks):
+    names = tuple(task.name for task in tasks)
+    done = {row[0] for row in frappe.db.sql("""
+        SELECT DISTINCT issue FROM `tabAgile Issue Status Interval` WHERE issue IN %(names)s
+    """, {'names': names})}
+
+    transitions = {}
+    for row in frappe.db.sql("""
+        SELECT issue, timestamp, data
+        FROM `tabAgile Issue Activity`
+        WHERE issue IN %(names)s AND activity_type = 'status_changed' AND data LIKE '%%to_status%%'
+        ORDER BY issue, timestamp, creation
+    """, {'names': names}, as_dict=True):
+        try:
+            data = json.loads(row.data)
+        except (TypeError, ValueError):
+            continue
+        if isinstance(data, dict) and data.get('to_status'):
+            transitions.setdefault(row.issue, []).append((row.timestamp, data))
+
+    intervals = []
+    for task in tasks:
+        if task.name in done:
+            continue
+
+        changes = transitions.get(task.name, [])
+        status = (changes[0][1].get('from_status') if changes else None) or task.issue_status
+        entered_at = get_datetime(task.creation)
+
+        for timestamp, data in changes:
+            timestamp = get_datetime(timestamp)
+            if status:
+                intervals.append((task, status, entered_at, timestamp))
+            status, entered_at = data['to_status'], timestamp
+
+        if status:
+            intervals.append((task, status, entered_at, None))
+
+    if not intervals:
+        return
+
+    categories = get_status_categories({interval[1] for interval in intervals})
+    frappe.db.bulk_insert(
+        'Agile Issue Status Interval',
+        fields=['name', 'issue', 'project', 'sprint', 'status', 'status_category',
+            'entered_at', 'left_at', 'duration', 'owner', 'modified_by', 'creation', 'modified'],
+        values=[(
+            frappe.generate_hash(length=10),
+            task.name,
+            task.project,
+            task.current_sprint or None,
+            status,
+            categories.get(status),
+            entered_at,
+            left_at,
+            int((left_at - entered_at).total_seconds()) if left_at else None,
+            'Administrator',
+            'Administrator',
+            entered_at,
+            entered_at
+        ) for task, status, entered_at, left_at in intervals]
+    )
@@ -0,0 +1,14 @@
+import frappe
+
+
+def execute():
+    """Fill the materialized visibility tables used by the Task permission query"""
+    from erpnext_agile.erpnext_agile.doctype.agile_project_visibility.agile_project_visibility import (
+        rebuild_project_visibility,
+    )
+    from erpnext_agile.erpnext_agile.doctype.agile_task_visibility.agile_task_visibility import (
+        rebuild_task_visibility,
+    )
+
+    rebuild_task_visibility()
+    rebuild_project_visibility()
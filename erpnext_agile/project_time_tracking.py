@@ -9,6 +9,8 @@ from frappe import _
 from frappe.utils import getdate, today
 import json
 from collections import defaultdict
+from erpnext_agile.agile_save_profiler import profiled
+from erpnext_agile.agile_side_effects import schedule as schedule_side_effect
 
 
 class ProjectTimeTracker:
@@ -225,6 +227,7 @@ class ProjectTimeTracker:
 # FRAPPE HOOKS & EVENT HANDLERS
 # ============================================
 
+@profiled('update_project_user_time_on_task_update')
 def update_project_user_time_on_task_update(doc, method):
     """
     Hook: Called when a Task is saved
@@ -241,11 +244,15 @@ def update_project_user_time_on_task_update(doc, method):
     except:
         return
     
-    # Update time data for all assigned users
+    # Recalculated for all assigned users by a background job after commit
+    if doc.get('assigned_to_users'):
+        schedule_side_effect(doc, 'project_user_time')
+
+
+def update_task_project_user_time(doc):
+    """Side effect: update time data for all users assigned to the task"""
     for assignee_row in doc.get('assigned_to_users', []):
-        user = assignee_row.user
-        frappe.logger().info(f"Updating metrics for {user} in project {doc.project}")
-        update_project_user_metrics(doc.project, user)
+        update_project_user_metrics(doc.project, assignee_row.user)
 
 
 def update_project_user_time_on_work_log(doc, method):
@@ -311,10 +318,8 @@ def update_project_user_metrics(project_name, user):
             user
         ))
         
-        frappe.db.commit()
-        
-        # Clear the cache so next read gets fresh data
-        frappe.clear_cache()
+        # Only the project's cached document holds these rows
+        frappe.clear_document_cache('Project', project_name)
             
     except Exception as e:
         frappe.log_error(f"Error updating project user metrics: {str(e)}")
@@ -339,6 +344,7 @@ def recalculate_all_project_times_scheduled():
             for pu in project_doc.get('users', []):
                 update_project_user_metrics(project_rec.name, pu.user)
             
+            frappe.db.commit()
         except Exception as e:
             frappe.log_error(f"Error recalculating project times for {project_rec.name}: {str(e)}")
 
@@ -612,15 +618,13 @@ def update_project_user_metrics(project_name, user):
             user
         ))
         
-        frappe.db.commit()
-        
         # Send alert if state changed
         if is_now_over and not was_over:
             # User just exceeded allocation
             send_time_overallocation_alert(project_name, user, time_data)
         
-        # Clear the cache
-        frappe.clear_cache()
+        # Only the project's cached document holds these rows
+        frappe.clear_document_cache('Project', project_name)
             
     except Exception as e:
         frappe.log_error(f"Error updating project user metrics: {str(e)}")
@@ -261,7 +261,7 @@ function render_board_column(status, column) {
                 <span class="text-uppercase" style="letter-spacing: 0.5px;">${status}</span>
                 <div>
                     ${column.total_points > 0 ? `<span class="badge badge-light ml-1" style="font-size: 11px;">${column.total_points} pts</span>` : ''}
-                    <span class="badge badge-secondary ml-1" style="border-radius: 12px;">${column.issues.length}</span>
+                    <span class="badge badge-secondary ml-1" style="border-radius: 12px;">${column.total_count ?? column.issues.length}</span>
                 </div>
             </div>
             <div class="column-issues" data-status="${status}" style="flex-grow: 1; overflow-y: auto; padding-right: 4px; min-height: 100px;">`;
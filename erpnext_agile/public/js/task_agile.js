@@ -340,15 +340,10 @@ function show_activity_dialog(frm) {
     
     // Load activity data
     frappe.call({
-        method: 'frappe.client.get_list',
+        method: 'erpnext_agile.api.get_issue_activity',
         args: {
-            doctype: 'Agile Issue Activity',
-            filters: {
-                issue: frm.doc.name
-            },
-            fields: ['name', 'activity_type', 'user', 'timestamp', 'data', 'comment'],
-            order_by: 'timestamp desc',
-            limit: 100  // Increased from 50
+            task_name: frm.doc.name,
+            limit: 100  // Includes archived activity
         },
         callback: function(r) {
             if (r.message) {
@@ -1,6 +1,11 @@
 # erpnext_agile/tasks/daily.py
 import frappe
-from frappe.utils import today, add_days, get_datetime
+from frappe.utils import today, add_days, get_datetime, getdate
+
+def reconcile_sprint_metrics():
+    """Verify the metrics of all open sprints, including changes the hourly dirty tracking never saw"""
+    from erpnext_agile.agile_sprint_metrics import reconcile_sprint_metrics
+    reconcile_sprint_metrics()
 
 def send_sprint_digest():
     """Send daily sprint digest to team members"""
@@ -9,17 +14,24 @@ def send_sprint_digest():
         fields=['name', 'project', 'sprint_name']
     )
     
-    from erpnext_agile.agile_sprint_manager import AgileSprintManager
-    manager = AgileSprintManager()
+    from erpnext_agile.agile_sprint_report import get_sprint_report
+    
+    notify_projects = set(frappe.get_all('Project',
+        filters={
+            'name': ['in', list({sprint.project for sprint in active_sprints})],
+            'enable_email_notifications': 1
+        },
+        pluck='name'
+    )) if active_sprints else set()
     
     for sprint in active_sprints:
         try:
             # Check if project has email notifications enabled
-            if not frappe.db.get_value('Project', sprint.project, 'enable_email_notifications'):
+            if sprint.project not in notify_projects:
                 continue
             
-            # Get sprint report
-            report = manager.get_sprint_report(sprint.name)
+            # Get sprint report; only sprints changed since their last snapshot are rebuilt
+            report = get_sprint_report(sprint.name)
             
             # Get team members
             team_members = frappe.get_all('Project User',
@@ -43,6 +55,44 @@ def send_sprint_digest():
         except Exception as e:
             frappe.log_error(f"Error sending sprint digest for {sprint.name}: {str(e)}")
 
+def snapshot_burndown_entries():
+    """
+    Store yesterday's burndown of active sprints in Agile Sprint Burndown.
+    
+    Burndown is derived from the sprint event log on demand; these rows are
+    only a snapshot for projects with burndown enabled, so a missed run
+    leaves nothing to repair.
+    """
+    active_sprints = frappe.get_all('Agile Sprint',
+        filters={'sprint_state': 'Active'},
+        fields=['name', 'project', 'start_date', 'actual_start_date']
+    )
+    if not active_sprints:
+        return
+    
+    burndown_projects = set(frappe.get_all('Project',
+        filters={
+            'name': ['in', list({sprint.project for sprint in active_sprints})],
+            'burndown_enabled': 1
+        },
+        pluck='name'
+    ))
+    
+    from erpnext_agile.agile_sprint_manager import AgileSprintManager
+    manager = AgileSprintManager()
+    yesterday = add_days(today(), -1)
+    
+    for sprint in active_sprints:
+        if sprint.project not in burndown_projects:
+            continue
+        if getdate(yesterday) < getdate(sprint.actual_start_date or sprint.start_date):
+            continue
+        try:
+            manager.update_burndown_entry(frappe.get_doc('Agile Sprint', sprint.name), date=yesterday)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.log_error(f"Error creating burndown entry for {sprint.name}: {str(e)}")
+
 def cleanup_old_timers():
     """Clean up stale work timers (running for more than 24 hours)"""
     threshold = add_days(today(), -1)
@@ -10,23 +10,35 @@ def generate_team_velocity_report():
         fields=['name', 'project_name']
     )
     
+    from erpnext_agile.agile_forecast import AgileDeliveryForecast
     from erpnext_agile.agile_sprint_manager import AgileSprintManager
     manager = AgileSprintManager()
     
     for project in projects:
         try:
             velocity_data = manager.calculate_team_velocity(project.name)
+            forecast = AgileDeliveryForecast(project.name).get_forecast()
             
-            # Store velocity data for trending
+            # Store velocity data and the forecast for trending
             frappe.get_doc({
                 'doctype': 'Agile Team Velocity',
                 'project': project.name,
                 'week_start': add_days(today(), -7),
                 'week_end': today(),
                 'average_velocity': velocity_data['average'],
-                'trend': velocity_data['trend']
-            }).insert()
+                'trend': velocity_data['trend'],
+                'sprints_analyzed': velocity_data['sprints_analyzed'],
+                'last_sprint_velocity': velocity_data.get('last_sprint_velocity', 0),
+                'remaining_points': forecast['remaining_points'],
+                'next_sprint_points': at_confidence(forecast['next_sprint'], 85).get('points'),
+                'forecast_completion_date': at_confidence(forecast['completion'], 85).get('date'),
+                'forecast': frappe.as_json(forecast)
+            }).insert(ignore_permissions=True)
             
             frappe.db.commit()
         except Exception as e:
-            frappe.log_error(f"Error generating velocity report for {project.name}: {str(e)}")
\ No newline at end of file
+            frappe.log_error(f"Error generating velocity report for {project.name}: {str(e)}")
+
+def at_confidence(rows, level):
+    """The forecast row of a confidence level, or an empty dict"""
+    return next((row for row in rows if row['confidence'] == level), {})
@@ -3,6 +3,8 @@
 
 import frappe
 from frappe import _
+from erpnext_agile.agile_save_profiler import profiled
+from erpnext_agile.agile_side_effects import schedule as schedule_side_effect
 
 # Test Execution Events
 def test_execution_on_submit(doc, method):
@@ -33,6 +35,7 @@ def test_cycle_validate(doc, method):
         )
 
 # Task Events
+@profiled('task_check_test_coverage')
 def task_check_test_coverage(doc, method):
     """Check if task has test coverage"""
     if doc.is_new():
@@ -42,6 +45,11 @@ def task_check_test_coverage(doc, method):
     if doc.type not in ["Task", "Feature"]:
         return
     
+    # Checked by a background job after commit
+    schedule_side_effect(doc, "test_coverage")
+
+def check_test_coverage(doc):
+    """Side effect: suggest adding test cases to a task without any"""
     # Check if task has linked test cases
     has_tests = frappe.db.exists("Test Case Link", {
         "link_doctype": "Task",
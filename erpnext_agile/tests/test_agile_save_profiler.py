@@ -0,0 +1,27 @@
+# Copyright (c) 2025, Yanky and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.agile_save_profiler import get_profile, profile_block, reset_profile
+
+
+class TestAgileSaveProfiler(FrappeTestCase):
+	def setUp(self):
+		reset_profile()
+		frappe.flags.agile_profile_saves = True
+
+	def tearDown(self):
+		frappe.flags.agile_profile_saves = False
+		reset_profile()
+
+	def test_recorded_block_is_read_back(self):
+		with profile_block("test_block"):
+			frappe.db.sql("SELECT 1")
+
+		entry = get_profile().get("test_block")
+		self.assertIsNotNone(entry)
+		self.assertEqual(entry["calls"], 1)
+		self.assertEqual(entry["queries"], 1)
+		self.assertGreaterEqual(entry["time_ms"], 0)
@@ -0,0 +1,22 @@
+# Copyright (c) 2025, Yanky and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_agile.agile_workflow_conditions import compile_condition
+
+
+class TestAgileWorkflowConditions(FrappeTestCase):
+	def test_allowed_frappe_utils(self):
+		compile_condition("frappe.utils.getdate(doc.due_date) >= frappe.utils.getdate(frappe.utils.today())")
+		compile_condition("frappe.utils.date_diff(frappe.utils.today(), doc.creation) > 3")
+
+	def test_unlisted_frappe_utils_rejected(self):
+		for condition in (
+			"frappe.utils.execute_in_shell('id')",
+			"frappe.utils.execute_in_shell",
+			"frappe.utils.get_url()",
+			"frappe.utils",
+		):
+			with self.assertRaises(ValueError):
+				compile_condition(condition)
@@ -50,19 +50,13 @@ def get_project_metrics(project):
 
 def get_done_statuses():
     """Get all status names in Done category"""
-    return [s.name for s in frappe.get_all(
-        'Agile Issue Status',
-        filters={'status_category': 'Done'},
-        fields=['name']
-    )]
+    from erpnext_agile.agile_metadata import get_done_statuses
+    return get_done_statuses()
 
 def get_in_progress_statuses():
     """Get all status names in In Progress category"""
-    return [s.name for s in frappe.get_all(
-        'Agile Issue Status',
-        filters={'status_category': 'In Progress'},
-        fields=['name']
-    )]
+    from erpnext_agile.agile_metadata import get_in_progress_statuses
+    return get_in_progress_statuses()
 
 def calculate_velocity(project, sprint_count=5):
     """Calculate team velocity based on recent sprints"""
@@ -156,14 +150,14 @@ def format_story_points(points):
 def get_available_transitions(task_name, current_status):
     """Get available transitions for an issue"""
     
-    task_doc = frappe.get_doc('Task', task_name)
-    project_doc = frappe.get_doc('Project', task_doc.project)
+    from erpnext_agile.agile_workflow_graph import get_workflow
     
-    workflow_scheme = project_doc.get('workflow_scheme')
+    project = frappe.db.get_value('Task', task_name, 'project')
+    workflow_scheme = frappe.get_cached_value('Project', project, 'workflow_scheme') if project else None
+    workflow = get_workflow(workflow_scheme)
     
-    if workflow_scheme:
-        scheme_doc = frappe.get_doc('Agile Workflow Scheme', workflow_scheme)
-        return scheme_doc.get_transitions(current_status)
+    if workflow:
+        return workflow.get_transitions(current_status)
     else:
         # Default transitions
         return [
@@ -175,18 +169,16 @@ def get_available_transitions(task_name, current_status):
 def check_issue_permission(task_name, permission_type, user=None):
     """Check if user has permission for an operation"""
     
-    if not user:
-        user = frappe.session.user
+    from erpnext_agile.agile_permissions import get_permission_context
+    ctx = get_permission_context(user)
     
-    task_doc = frappe.get_doc('Task', task_name)
-    project_doc = frappe.get_doc('Project', task_doc.project)
+    project = ctx.get_values('Task', task_name, ['project']).project
     
     # Check permission scheme
-    permission_scheme = project_doc.get('permission_scheme')
+    permission_scheme = project and frappe.get_cached_value('Project', project, 'permission_scheme')
     
     if permission_scheme:
-        scheme_doc = frappe.get_doc('Agile Permission Scheme', permission_scheme)
-        return scheme_doc.has_permission(permission_type, user)
+        return ctx.has_scheme_permission(permission_scheme, permission_type)
     
     # Default: allow all for now
     return True
@@ -268,11 +260,13 @@ def cleanup_completed_sprint(sprint_name):
             'current_sprint': sprint_name,
             'is_agile': 1,
             'issue_status': ['not in', get_done_statuses()]
-        }
+        },
+        fields=['name', 'issue_key', 'project', 'current_sprint', 'issue_status', 'status', 'is_agile',
+            'story_points']
     )
     
-    for issue in incomplete_issues:
-        frappe.db.set_value('Task', issue.name, 'current_sprint', '')
+    from erpnext_agile.agile_sprint_membership import AgileSprintMembership
+    AgileSprintMembership(ignore_permissions=True).apply(incomplete_issues, None)
     
     return len(incomplete_issues)
 